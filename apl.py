@@ -1,9 +1,97 @@
-from apl.lexer.lexer import Lexer, TokenMatchingError
+import argparse
+import asyncio
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from apl.lexer.lexer import TokenMatchingError
+from apl.lexer.stream import StreamLexer
 from apl.parser.parser import Parser, ParsingError
-from apl.interpreter.interpreter import Interpreter
+from apl.parser import parallel
+from apl.interpreter.arrays import json_default, load_vector, DEFAULT_RAW_DTYPE
+from apl.interpreter.interpreter import Interpreter, ENGINES, TREE_ENGINE
+from apl.interpreter.lazy import LazyInterpreter
+from apl.cache.disk import DiskCache
+from apl.cache.memory import ProgramCache, DEFAULT_MAXSIZE
+from apl import batch
+from apl import profiling
+from apl import server
 
 
-def main():
+def parse_args():
+    arg_parser = argparse.ArgumentParser(description='APL interpreter')
+    arg_parser.add_argument('--engine', choices=ENGINES, default=TREE_ENGINE,
+                            help='execution engine (default: %(default)s)')
+    arg_parser.add_argument('-O', '--optimize', action='store_true',
+                            help='fold constants, simplify identities and share common subexpressions')
+    arg_parser.add_argument('--cache-size', type=int, default=DEFAULT_MAXSIZE,
+                            help='number of compiled inputs kept in cache, 0 to disable (default: %(default)s)')
+    arg_parser.add_argument('--cache-bytes', type=int, default=None,
+                            help='approximate memory bound of the compiled inputs cache, in bytes')
+    arg_parser.add_argument('--cache-dir', default=None,
+                            help='directory of the compiled scripts cache of run and batch, so that scripts are '
+                                 'only lexed and parsed again once they changed')
+    arg_parser.add_argument('--array', action='append', default=[], metavar='NAME=PATH',
+                            help='bind NAME to the vector memory-mapped from PATH, a .npy or raw binary file, '
+                                 'in the interactive interpreter and in run or profiled scripts (repeatable)')
+    arg_parser.add_argument('--raw-dtype', default=DEFAULT_RAW_DTYPE,
+                            help='element type of raw binary --array files (default: %(default)s)')
+    commands = arg_parser.add_subparsers(dest='command', help='run the interactive interpreter if omitted')
+
+    batch_parser = commands.add_parser('batch', help='evaluate many scripts over a pool of workers, '
+                                                     'printing one JSON result per line')
+    batch_parser.add_argument('paths', nargs='+', help='script files or directories of *.apl scripts')
+    batch_parser.add_argument('--workers', type=int, default=None, help='number of workers (default: CPU count)')
+    batch_parser.add_argument('--chunk-size', type=int, default=batch.DEFAULT_CHUNK_SIZE,
+                              help='number of scripts sent to a worker at once (default: %(default)s)')
+    batch_parser.add_argument('--executor', choices=batch.EXECUTORS, default=batch.AUTO_EXECUTOR,
+                              help='worker pool type (default: %(default)s)')
+
+    run_parser = commands.add_parser('run', help='run a script, executing each instruction as soon as it is parsed')
+    run_parser.add_argument('path', help='script file')
+    run_parser.add_argument('--echo', action='store_true', help='print each assigned variable and its value')
+    run_parser.add_argument('--lazy', action='store_true',
+                            help='evaluate assigned variables only when read, by the script or by --echo '
+                                 '(tree engine only)')
+    run_parser.add_argument('--parse-workers', type=int, default=None,
+                            help='lex and parse the script over this number of processes (default: in-process)')
+    run_parser.add_argument('--parse-chunk-size', type=int, default=parallel.DEFAULT_CHUNK_SIZE,
+                            help='characters of script per parsing task (default: %(default)s)')
+
+    profile_parser = commands.add_parser('profile', help='run a script and print its per-phase profile as JSON')
+    profile_parser.add_argument('path', help='script file')
+
+    serve_parser = commands.add_parser('serve', help='serve line-delimited JSON evaluation requests')
+    serve_parser.add_argument('--host', default='127.0.0.1', help='TCP host (default: %(default)s)')
+    serve_parser.add_argument('--port', type=int, default=8765, help='TCP port (default: %(default)s)')
+    serve_parser.add_argument('--unix', default=None, help='listen on this Unix socket path instead of TCP')
+    serve_parser.add_argument('--workers', type=int, default=None, help='number of workers (default: CPU count)')
+    serve_parser.add_argument('--max-pending', type=int, default=server.DEFAULT_MAX_PENDING,
+                              help='maximum number of evaluations in flight (default: %(default)s)')
+    serve_parser.add_argument('--timeout', type=float, default=server.DEFAULT_TIMEOUT,
+                              help='request timeout in seconds (default: %(default)s)')
+    serve_parser.add_argument('--line-limit', type=int, default=server.DEFAULT_LINE_LIMIT,
+                              help='maximum request line size in bytes (default: %(default)s)')
+    serve_parser.add_argument('--executor', choices=batch.EXECUTORS, default=batch.AUTO_EXECUTOR,
+                              help='worker pool type (default: %(default)s)')
+    args = arg_parser.parse_args()
+    if args.command == 'run' and args.cache_dir is not None and (args.echo or args.parse_workers is not None):
+        arg_parser.error('run can\'t use --cache-dir with --echo or --parse-workers, which parse the script')
+    return args
+
+
+def load_arrays(args):
+    arrays = {}
+    for binding in args.array:
+        name, _, path = binding.partition('=')
+        arrays[name] = load_vector(path, args.raw_dtype)
+    return arrays
+
+
+def repl(args):
+    program_cache = ProgramCache(args.cache_size, args.cache_bytes)
+    apt_interpreter = Interpreter(None, engine=args.engine, optimize=args.optimize)
+    apt_interpreter.symbol_table.update(load_arrays(args))
     while True:
         try:
             text = input('apl> ')
@@ -15,10 +103,8 @@ def main():
         if text == "exit":
             break
         try:
-            apl_lexer = Lexer(text)
-            apl_parser = Parser(apl_lexer)
-            apt_interpreter = Interpreter(apl_parser)
-            result = apt_interpreter.interpret()
+            compiled = program_cache.get_compiled(text, args.engine, args.optimize)
+            result = apt_interpreter.execute(compiled)
             print(apt_interpreter.symbol_table)
             print(result)
         except TokenMatchingError as tk_match_err:
@@ -29,5 +115,99 @@ def main():
             print(ex)
 
 
+def run_batch(args):
+    kwargs = dict(
+        workers=args.workers, engine=args.engine, optimize=args.optimize, chunk_size=args.chunk_size,
+        executor=args.executor
+    )
+    if args.cache_dir is None:
+        results = batch.run_batch(batch.iter_script_sources(args.paths), **kwargs)
+    else:
+        results = batch.run_scripts(batch.iter_script_paths(args.paths), args.cache_dir, **kwargs)
+    for result in results:
+        print(json.dumps(result._asdict(), default=json_default), flush=True)
+
+
+def run_script(args):
+    interpreter_class = LazyInterpreter if args.lazy else Interpreter
+    apl_interpreter = interpreter_class(None, engine=args.engine, optimize=args.optimize)
+    apl_interpreter.symbol_table.update(load_arrays(args))
+    if args.cache_dir is not None:
+        success = run_cached(args, apl_interpreter)
+    elif args.parse_workers is None:
+        success = run_instructions(args, apl_interpreter, Parser(StreamLexer.from_path(args.path)).iter_instructions())
+    else:
+        with open(args.path, encoding='utf-8') as file:
+            source = file.read()
+        with ProcessPoolExecutor(args.parse_workers) as executor:
+            instructions = parallel.iter_instructions(source, executor, args.parse_chunk_size,
+                                                      args.parse_workers * parallel.DEFAULT_PREFETCH)
+            success = run_instructions(args, apl_interpreter, instructions)
+    print(apl_interpreter.symbol_table)
+    return success
+
+
+def run_cached(args, apl_interpreter):
+    try:
+        compiled = DiskCache(args.cache_dir).load(args.path, args.engine, args.optimize)
+    except (TokenMatchingError, ParsingError) as ex:
+        apl_interpreter.report_error(ex)
+        return False
+    return apl_interpreter.execute(compiled)
+
+
+def run_instructions(args, apl_interpreter, instructions):
+    if args.echo:
+        instructions = echo_instructions(instructions, apl_interpreter)
+    return apl_interpreter.run_stream(instructions)
+
+
+def echo_instructions(instructions, apl_interpreter):
+    for instruction in instructions:
+        yield instruction
+        # resumed once the instruction was executed, to get the next one
+        name = instruction.left_op.var_name
+        if isinstance(apl_interpreter, LazyInterpreter):
+            value = apl_interpreter.query(name)[name]
+        else:
+            value = apl_interpreter.symbol_table.get(name)
+        print('%s = %s' % (name, value), flush=True)
+
+
+def profile(args):
+    with open(args.path, encoding='utf-8') as file:
+        source = file.read()
+    apl_interpreter = Interpreter(None, engine=args.engine, optimize=args.optimize)
+    apl_interpreter.symbol_table.update(load_arrays(args))
+    program_profile = profiling.profile_source(source, interpreter=apl_interpreter)
+    print(program_profile.to_json(indent=2))
+
+
+def serve(args):
+    evaluation_server = server.EvaluationServer(
+        workers=args.workers, engine=args.engine, optimize=args.optimize, max_pending=args.max_pending,
+        timeout=args.timeout, executor=args.executor, line_limit=args.line_limit
+    )
+    try:
+        asyncio.run(evaluation_server.serve_forever(host=args.host, port=args.port, unix_path=args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    args = parse_args()
+    if args.command == 'batch':
+        run_batch(args)
+    elif args.command == 'run':
+        if not run_script(args):
+            sys.exit(1)
+    elif args.command == 'profile':
+        profile(args)
+    elif args.command == 'serve':
+        serve(args)
+    else:
+        repl(args)
+
+
 if __name__ == '__main__':
     main()
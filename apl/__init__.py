@@ -2,3 +2,4 @@ from . import tokens
 from . import lexer
 from . import parser
 from . import interpreter
+from . import cache
@@ -0,0 +1,364 @@
+"""
+Batch evaluation of many independent programs over a pool of workers
+
+Programs are sent to the workers by chunks and their results are generated in submission order, while
+a bounded number of chunks is in flight. Each worker process is started once, keeps a cache of the
+programs it compiled, and evaluates every program with a fresh symbol table: the error of a program
+(token matching, parsing or programming error) is reported in its result and does not affect the others.
+
+Script files can also be sent to the workers by path, each worker then compiling them through a
+DiskCache of compiled scripts (see apl.cache.disk) shared by the workers and by later batches, so that
+a script is only lexed and parsed again once it changed.
+
+A program image (see apl.parser.image) can also be evaluated against many symbol tables: each worker maps
+the image file once, so that the workers share its pages instead of each compiling their own program.
+
+Worker processes are used by default; threads are used on free-threaded Python builds.
+"""
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import os
+import sys
+
+from apl.lexer.lexer import Lexer
+from apl.parser.parser import Parser
+from apl.parser import image
+from apl.interpreter.interpreter import Interpreter, TREE_ENGINE
+from apl.cache.disk import DiskCache
+from apl.cache.memory import ProgramCache
+
+
+PROCESS_EXECUTOR = 'process'
+THREAD_EXECUTOR = 'thread'
+AUTO_EXECUTOR = 'auto'
+EXECUTORS = (AUTO_EXECUTOR, PROCESS_EXECUTOR, THREAD_EXECUTOR)
+
+DEFAULT_CHUNK_SIZE = 64
+# chunks in flight per worker
+DEFAULT_PREFETCH = 4
+
+SCRIPT_SUFFIX = '.apl'
+
+BatchResult = namedtuple('BatchResult', ('index', 'name', 'success', 'symbol_table', 'error'))
+
+
+class BatchInterpreter(Interpreter):
+    """
+    Interpreter keeping the error which stopped a program instead of printing it
+    """
+
+    def report_error(self, ex):
+        self.last_error = ex
+
+
+worker_cache = ProgramCache()
+# cache directory -> DiskCache of a worker
+worker_disk_caches = {}
+# image path -> (file mtime (ns), file size, ProgramImage) of the images mapped by a worker
+worker_images = {}
+
+
+def evaluate(source, engine=TREE_ENGINE, optimize=False, program_cache=None, disk_cache=None):
+    """
+    Evaluate a program with a fresh symbol table
+
+    :param source: program source text, or script path when 'disk_cache' is given
+    :param engine: interpreter engine
+    :param optimize: run the optimizer passes
+    :param program_cache: ProgramCache used to compile 'source', None to compile it directly
+    :param disk_cache: DiskCache loading the compiled script at path 'source'
+    :return: tuple (success, symbol_table, error message or None)
+    """
+    apl_interpreter = BatchInterpreter(None, engine=engine, optimize=optimize)
+    try:
+        if disk_cache is not None:
+            compiled = disk_cache.load(source, engine, optimize)
+        elif program_cache is not None:
+            compiled = program_cache.get_compiled(source, engine, optimize)
+        else:
+            compiled = apl_interpreter.compile(Parser(Lexer(source)).parse())
+        success = apl_interpreter.execute(compiled)
+    except Exception as ex:
+        return False, apl_interpreter.symbol_table, '%s: %s' % (type(ex).__name__, ex)
+    if success is False and apl_interpreter.last_error is not None:
+        ex = apl_interpreter.last_error
+        return False, apl_interpreter.symbol_table, '%s: %s' % (type(ex).__name__, ex)
+    return True, apl_interpreter.symbol_table, None
+
+
+def evaluate_in_worker(source, engine, optimize):
+    """
+    Worker task: evaluate a program, compiling it through the worker program cache
+
+    :param source: program source text
+    :return: `evaluate` result
+    """
+    return evaluate(source, engine, optimize, worker_cache)
+
+
+def evaluate_chunk(chunk, engine, optimize):
+    """
+    Worker task: evaluate a chunk of programs
+
+    :param chunk: list of program source texts
+    :return: list of `evaluate` results
+    """
+    return [evaluate_in_worker(source, engine, optimize) for source in chunk]
+
+
+def get_worker_disk_cache(directory):
+    """
+    :param directory: cache directory
+    :return: DiskCache of the directory, created once per worker
+    """
+    disk_cache = worker_disk_caches.get(directory)
+    if disk_cache is None:
+        disk_cache = worker_disk_caches[directory] = DiskCache(directory)
+    return disk_cache
+
+
+def evaluate_script_chunk(chunk, engine, optimize, cache_directory):
+    """
+    Worker task: evaluate a chunk of script files, compiled through the worker disk cache
+
+    :param chunk: list of script paths
+    :param cache_directory: directory of the compiled scripts cache
+    :return: list of `evaluate` results
+    """
+    disk_cache = get_worker_disk_cache(cache_directory)
+    return [evaluate(path, engine, optimize, disk_cache=disk_cache) for path in chunk]
+
+
+def get_worker_image(path):
+    """
+    :param path: image file path
+    :return: ProgramImage of the file, mapped again when the file was replaced
+    """
+    stat = os.stat(path)
+    entry = worker_images.get(path)
+    if entry is not None:
+        mtime_ns, size, program_image = entry
+        if (mtime_ns, size) == (stat.st_mtime_ns, stat.st_size):
+            return program_image
+        del worker_images[path]
+        program_image.close()
+    program_image = image.load(path)
+    worker_images[path] = (stat.st_mtime_ns, stat.st_size, program_image)
+    return program_image
+
+
+def evaluate_image(path, symbol_table=None):
+    """
+    Evaluate a program image with the tree engine
+
+    :param path: image file path
+    :param symbol_table: dict of the initial variable values, copied, None for an empty symbol table
+    :return: tuple (success, symbol_table, error message or None)
+    """
+    apl_interpreter = BatchInterpreter(None)
+    if symbol_table:
+        apl_interpreter.symbol_table.update(symbol_table)
+    try:
+        success = apl_interpreter.execute(get_worker_image(path).flat)
+    except Exception as ex:
+        return False, apl_interpreter.symbol_table, '%s: %s' % (type(ex).__name__, ex)
+    if success is False and apl_interpreter.last_error is not None:
+        ex = apl_interpreter.last_error
+        return False, apl_interpreter.symbol_table, '%s: %s' % (type(ex).__name__, ex)
+    return True, apl_interpreter.symbol_table, None
+
+
+def evaluate_image_chunk(path, chunk):
+    """
+    Worker task: evaluate a program image against a chunk of symbol tables
+
+    :param path: image file path
+    :param chunk: list of initial symbol tables
+    :return: list of `evaluate_image` results
+    """
+    return [evaluate_image(path, symbol_table) for symbol_table in chunk]
+
+
+def is_free_threaded():
+    """
+    :return: True if the running Python build does not use a global interpreter lock
+    """
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def create_executor(executor, workers):
+    """
+    :param executor: AUTO_EXECUTOR, PROCESS_EXECUTOR or THREAD_EXECUTOR
+    :param workers: number of workers
+    :return: concurrent.futures.Executor, using threads for AUTO_EXECUTOR on free-threaded builds
+    """
+    if executor not in EXECUTORS:
+        raise ValueError('Unknown executor \'%s\', expecting one of %s' % (executor, ', '.join(EXECUTORS)))
+    if executor == AUTO_EXECUTOR:
+        executor = THREAD_EXECUTOR if is_free_threaded() else PROCESS_EXECUTOR
+    if executor == THREAD_EXECUTOR:
+        return ThreadPoolExecutor(workers)
+    return ProcessPoolExecutor(workers)
+
+
+def iter_script_paths(paths):
+    """
+    :param paths: list of script paths or directories, scanned for *.apl files in name order
+    :return: generator of script paths
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for entry in sorted(os.listdir(path)):
+                script_path = os.path.join(path, entry)
+                if entry.endswith(SCRIPT_SUFFIX) and os.path.isfile(script_path):
+                    yield script_path
+        else:
+            yield path
+
+
+def iter_script_sources(paths):
+    """
+    Read APL scripts
+
+    :param paths: list of script paths or directories, scanned for *.apl files in name order
+    :return: generator of tuples (script path, script source text)
+    """
+    for path in iter_script_paths(paths):
+        with open(path, encoding='utf-8') as file:
+            yield path, file.read()
+
+
+class BatchRunner:
+    """
+    Pool of workers evaluating programs, reusable for several batches
+    """
+
+    def __init__(self, workers=None, engine=TREE_ENGINE, optimize=False, chunk_size=DEFAULT_CHUNK_SIZE,
+                 executor=AUTO_EXECUTOR, prefetch=DEFAULT_PREFETCH):
+        """
+        :param workers: number of workers, os.cpu_count() by default
+        :param engine: interpreter engine
+        :param optimize: run the optimizer passes
+        :param chunk_size: number of programs sent to a worker at once
+        :param executor: AUTO_EXECUTOR, PROCESS_EXECUTOR or THREAD_EXECUTOR
+        :param prefetch: number of chunks in flight per worker
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.engine = engine
+        self.optimize = optimize
+        self.chunk_size = chunk_size
+        self.max_pending = self.workers * prefetch
+        self.executor = create_executor(executor, self.workers)
+
+    def iter_chunks(self, programs):
+        chunk = []
+        for program in programs:
+            chunk.append(program)
+            if len(chunk) == self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def submit_chunks(self, chunks, submit):
+        """
+        :param chunks: iterable of lists of tuples (name, task argument)
+        :param submit: function submitting a list of task arguments, returning its future
+        :return: generator of BatchResult, in submission order
+        """
+        pending = deque()
+        index = 0
+        for chunk in chunks:
+            names = [name for name, _ in chunk]
+            pending.append((index, names, submit([argument for _, argument in chunk])))
+            index += len(chunk)
+            if len(pending) >= self.max_pending:
+                yield from self.collect(*pending.popleft())
+        while pending:
+            yield from self.collect(*pending.popleft())
+
+    def run(self, programs):
+        """
+        Evaluate programs
+
+        :param programs: iterable of source texts or of tuples (name, source text)
+        :return: generator of BatchResult, in submission order
+        """
+        programs = (program if isinstance(program, tuple) else (None, program) for program in programs)
+        return self.submit_chunks(
+            self.iter_chunks(programs),
+            lambda sources: self.executor.submit(evaluate_chunk, sources, self.engine, self.optimize)
+        )
+
+    def run_scripts(self, paths, cache_directory):
+        """
+        Evaluate script files, each worker loading their compiled form from a disk cache
+
+        :param paths: iterable of script paths
+        :param cache_directory: directory of the compiled scripts cache, created if needed
+        :return: generator of BatchResult, in submission order, named by script path
+        """
+        cache_directory = os.path.abspath(cache_directory)
+        paths = ((path, os.path.abspath(path)) for path in paths)
+        return self.submit_chunks(
+            self.iter_chunks(paths),
+            lambda chunk: self.executor.submit(
+                evaluate_script_chunk, chunk, self.engine, self.optimize, cache_directory
+            )
+        )
+
+    def run_image(self, path, symbol_tables):
+        """
+        Evaluate a program image against symbol tables, with the tree engine
+
+        :param path: image file path, written by apl.parser.image.dump
+        :param symbol_tables: iterable of dicts of initial variable values, or of tuples (name, dict)
+        :return: generator of BatchResult, in submission order
+        """
+        path = os.path.abspath(path)
+        symbol_tables = (table if isinstance(table, tuple) else (None, table) for table in symbol_tables)
+        return self.submit_chunks(
+            self.iter_chunks(symbol_tables),
+            lambda chunk: self.executor.submit(evaluate_image_chunk, path, chunk)
+        )
+
+    @staticmethod
+    def collect(index, names, future):
+        for offset, (name, (success, symbol_table, error)) in enumerate(zip(names, future.result())):
+            yield BatchResult(index + offset, name, success, symbol_table, error)
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def run_batch(programs, **kwargs):
+    """
+    Evaluate programs over a pool of workers shut down once they are all evaluated
+
+    :param programs: iterable of source texts or of tuples (name, source text)
+    :param kwargs: BatchRunner arguments
+    :return: generator of BatchResult, in submission order
+    """
+    with BatchRunner(**kwargs) as runner:
+        yield from runner.run(programs)
+
+
+def run_scripts(paths, cache_directory, **kwargs):
+    """
+    Evaluate script files over a pool of workers shut down once they are all evaluated, compiled
+    through a disk cache
+
+    :param paths: iterable of script paths
+    :param cache_directory: directory of the compiled scripts cache, created if needed
+    :param kwargs: BatchRunner arguments
+    :return: generator of BatchResult, in submission order
+    """
+    with BatchRunner(**kwargs) as runner:
+        yield from runner.run_scripts(paths, cache_directory)
@@ -0,0 +1,218 @@
+"""
+Persistent on-disk cache of compiled APL scripts
+
+Each script is stored in its own artifact file of the cache directory, made of a fixed size header
+followed by a marshal payload:
+    - header: magic, format version, engine, optimize flag, validation mode, python cache tag,
+              source mtime (ns), source size, source sha256 digest, payload size and crc32
+    - payload: the compiled form of the script (see Interpreter.compile) encoded for its engine
+
+An artifact is invalidated when its source mtime and size (MTIME_VALIDATION) or its source hash
+(HASH_VALIDATION) changed. Artifacts are written to a temporary file renamed over the previous one,
+so processes sharing a cache directory only ever read complete artifacts.
+"""
+from array import array
+from collections import namedtuple
+import hashlib
+import marshal
+import os
+import struct
+import sys
+import tempfile
+import zlib
+
+from apl.lexer.lexer import Lexer
+from apl.parser.parser import Parser
+from apl.parser import serialize
+from apl.interpreter.interpreter import (
+    Interpreter, decode_literals, ENGINES, TREE_ENGINE, VM_ENGINE, PYTHON_ENGINE,
+)
+from apl.interpreter.arrays import is_array, make_vector
+from apl.interpreter.bytecode import CodeObject
+from apl.interpreter.resolver import ResolvedTree
+from apl.interpreter.transpiler import CompiledProgram
+
+
+MAGIC = b'APLC'
+FORMAT_VERSION = 3
+ARTIFACT_SUFFIX = '.aplc'
+
+MTIME_VALIDATION = 0
+HASH_VALIDATION = 1
+
+HEADER = struct.Struct('<4sHBBB16sqQ32sQI')
+PYTHON_TAG = (sys.implementation.cache_tag or sys.implementation.name).encode('ascii')[:16]
+NO_DIGEST = bytes(32)
+# tag of the vector constants in VM payloads, encoded as (VECTOR_CONSTANT, list of values)
+VECTOR_CONSTANT = 'vector'
+
+DiskCacheStats = namedtuple('DiskCacheStats', ('hits', 'misses', 'writes', 'write_errors'))
+
+
+def dump_compiled(compiled, engine):
+    """
+    :param compiled: value returned by Interpreter.compile
+    :param engine: interpreter engine 'compiled' was compiled for
+    :return: bytes encoding of 'compiled'
+    """
+    if engine == VM_ENGINE:
+        return marshal.dumps((
+            compiled.ops.tobytes(), compiled.args.tobytes(),
+            [(VECTOR_CONSTANT, value.tolist()) if is_array(value) else value for value in compiled.constants],
+            compiled.names,
+            compiled.temp_count, compiled.is_program
+        ))
+    if engine == PYTHON_ENGINE:
+        return marshal.dumps((compiled.code, compiled.names, compiled.is_program))
+    return serialize.dumps(compiled.tree)
+
+
+def load_compiled(data, engine):
+    """
+    :param data: bytes returned by `dump_compiled`
+    :param engine: interpreter engine the data was compiled for
+    :return: compiled form, as returned by Interpreter.compile
+    """
+    if engine == VM_ENGINE:
+        ops, args, constants, names, temp_count, is_program = marshal.loads(data)
+        code_object = CodeObject()
+        code_object.ops = array('B', ops)
+        code_object.args = array('i')
+        code_object.args.frombytes(args)
+        code_object.constants = [make_vector(value[1]) if isinstance(value, tuple) else value for value in constants]
+        code_object.names = names
+        code_object.temp_count = temp_count
+        code_object.is_program = is_program
+        return code_object
+    if engine == PYTHON_ENGINE:
+        code, names, is_program = marshal.loads(data)
+        return CompiledProgram(code, names, is_program)
+    return ResolvedTree(decode_literals(serialize.loads(data)))
+
+
+class DiskCache:
+    """
+    Cache of compiled APL script files in a directory, shared by processes
+    """
+
+    def __init__(self, directory, validation=MTIME_VALIDATION):
+        """
+        :param directory: cache directory, created if needed
+        :param validation: MTIME_VALIDATION or HASH_VALIDATION
+        """
+        self.directory = directory
+        self.validation = validation
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.write_errors = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def artifact_path(self, path, engine, optimize):
+        """
+        :return: path of the artifact caching the script located at 'path'
+        """
+        digest = hashlib.sha256(os.fsencode(os.path.abspath(path))).hexdigest()[:32]
+        return os.path.join(self.directory, '%s.%s%s%s' % (digest, engine, '.O' if optimize else '', ARTIFACT_SUFFIX))
+
+    def read_artifact(self, artifact_path, engine, optimize, stat, get_source):
+        """
+        Read and validate an artifact
+
+        :return: compiled form, None if the artifact is missing, invalid or stale
+        """
+        try:
+            with open(artifact_path, 'rb') as file:
+                header = file.read(HEADER.size)
+                if len(header) != HEADER.size:
+                    return None
+                (magic, version, engine_code, optimized, validation, python_tag,
+                 mtime_ns, size, digest, payload_size, payload_crc) = HEADER.unpack(header)
+                if (magic, version, engine_code, bool(optimized), validation, python_tag.rstrip(b'\0')) != (
+                        MAGIC, FORMAT_VERSION, ENGINES.index(engine), optimize, self.validation, PYTHON_TAG):
+                    return None
+                if self.validation == MTIME_VALIDATION:
+                    if (mtime_ns, size) != (stat.st_mtime_ns, stat.st_size):
+                        return None
+                elif digest != hashlib.sha256(get_source()).digest():
+                    return None
+                payload = file.read(payload_size + 1)
+        except OSError:
+            return None
+        if len(payload) != payload_size or zlib.crc32(payload) != payload_crc:
+            return None
+        try:
+            return load_compiled(payload, engine)
+        except Exception:
+            return None
+
+    def write_artifact(self, artifact_path, engine, optimize, stat, source, compiled):
+        """
+        Write an artifact atomically, write errors are counted and ignored: a compiled form which can't be
+        serialized is left uncached
+
+        :return: None
+        """
+        try:
+            payload = dump_compiled(compiled, engine)
+        except Exception:
+            self.write_errors += 1
+            return
+        digest = hashlib.sha256(source).digest() if self.validation == HASH_VALIDATION else NO_DIGEST
+        header = HEADER.pack(
+            MAGIC, FORMAT_VERSION, ENGINES.index(engine), optimize, self.validation, PYTHON_TAG,
+            stat.st_mtime_ns, stat.st_size, digest, len(payload), zlib.crc32(payload)
+        )
+        try:
+            file_descriptor, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(file_descriptor, 'wb') as file:
+                    file.write(header)
+                    file.write(payload)
+                os.replace(temp_path, artifact_path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError:
+            self.write_errors += 1
+            return
+        self.writes += 1
+
+    def load(self, path, engine=TREE_ENGINE, optimize=False):
+        """
+        Get the compiled form of the script located at 'path', from its artifact if it is up to date,
+        lexing, parsing and compiling the script (and writing its artifact) otherwise
+
+        :param path: APL script path
+        :param engine: interpreter engine
+        :param optimize: run the optimizer passes
+        :return: value of Interpreter.compile for the script
+        :raise: OSError if the script can't be read, TokenMatchingError, ParsingError on invalid script
+        """
+        stat = os.stat(path)
+        artifact_path = self.artifact_path(path, engine, optimize)
+        source = None
+
+        def get_source():
+            nonlocal source
+            if source is None:
+                with open(path, 'rb') as file:
+                    source = file.read()
+            return source
+
+        compiled = self.read_artifact(artifact_path, engine, optimize, stat, get_source)
+        if compiled is not None:
+            self.hits += 1
+            return compiled
+
+        self.misses += 1
+        tree = Parser(Lexer(get_source().decode('utf-8'))).parse()
+        compiled = Interpreter(None, engine=engine, optimize=optimize).compile(tree)
+        self.write_artifact(artifact_path, engine, optimize, stat, source, compiled)
+        return compiled
+
+    def stats(self):
+        """
+        :return: DiskCacheStats(hits, misses, writes, write_errors)
+        """
+        return DiskCacheStats(self.hits, self.misses, self.writes, self.write_errors)
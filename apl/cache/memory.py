@@ -0,0 +1,129 @@
+"""
+In-process LRU cache of parsed and compiled programs, keyed by source text
+"""
+from collections import OrderedDict, namedtuple
+import sys
+import threading
+
+from apl.lexer.lexer import Lexer
+from apl.parser.parser import Parser
+from apl.interpreter.interpreter import Interpreter, TREE_ENGINE
+from apl.interpreter.optimizer import count_nodes
+
+
+DEFAULT_MAXSIZE = 1024
+
+# approximate memory used by an AST node with its token and value, in bytes
+AST_NODE_SIZE = 112
+
+CacheStats = namedtuple('CacheStats', ('hits', 'misses', 'evictions', 'size', 'nbytes'))
+
+
+def estimate_size(source, tree):
+    """
+    Estimate the memory used by a cache entry
+
+    :param source: program source text
+    :param tree: AST parsed from 'source'
+    :return: estimated size in bytes
+    """
+    return sys.getsizeof(source) + count_nodes(tree) * AST_NODE_SIZE
+
+
+class LRUCache:
+    """
+    Least recently used cache bounded by a number of entries and, optionally, a number of bytes.
+    The size of each entry is given when it is stored. Safe to use from several threads.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, max_bytes=None):
+        """
+        :param maxsize: maximum number of entries
+        :param max_bytes: maximum sum of the entry sizes, None for no bound
+        """
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """
+        :param key: entry key
+        :param default: value returned on cache miss
+        :return: value stored for 'key', marked as most recently used
+        """
+        with self.lock:
+            try:
+                value, _ = self.entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, size=0):
+        """
+        Store 'value' for 'key' and evict the least recently used entries exceeding the bounds
+
+        :param key: entry key
+        :param value: entry value
+        :param size: entry size in bytes
+        :return: None
+        """
+        with self.lock:
+            if key in self.entries:
+                self.nbytes -= self.entries.pop(key)[1]
+            if self.maxsize <= 0 or (self.max_bytes is not None and size > self.max_bytes):
+                return
+            self.entries[key] = (value, size)
+            self.nbytes += size
+            while len(self.entries) > self.maxsize or (self.max_bytes is not None and self.nbytes > self.max_bytes):
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.nbytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        """
+        :return: CacheStats(hits, misses, evictions, size, nbytes)
+        """
+        with self.lock:
+            return CacheStats(self.hits, self.misses, self.evictions, len(self.entries), self.nbytes)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class ProgramCache(LRUCache):
+    """
+    Cache of the compiled form (see Interpreter.compile) of programs, keyed by their source text and
+    the interpreter engine and optimization setting.
+    A cache hit skips lexing, parsing, optimizing and compiling.
+    """
+
+    def get_compiled(self, source, engine=TREE_ENGINE, optimize=False):
+        """
+        Get the compiled form of 'source', lexing, parsing and compiling it on cache miss
+
+        :param source: program source text
+        :param engine: interpreter engine
+        :param optimize: run the optimizer passes
+        :return: value of Interpreter.compile for 'source'
+        :raise: TokenMatchingError, ParsingError on invalid source (errors are not cached)
+        """
+        key = (engine, optimize, source)
+        compiled = self.get(key)
+        if compiled is None:
+            tree = Parser(Lexer(source)).parse()
+            compiled = Interpreter(None, engine=engine, optimize=optimize).compile(tree)
+            self.put(key, compiled, estimate_size(source, tree))
+        return compiled
@@ -0,0 +1,90 @@
+from unittest import TestCase
+from unittest.mock import patch
+import os
+import shutil
+import tempfile
+
+from apl.parser import parser
+from apl.interpreter import interpreter
+from apl.cache import disk
+
+
+CODE = 'var x = 10 - 5.67 * (3 / 2);\nvar y = (x + 1) * (x + 1);\nx = y / 2;\n'
+
+
+class TestDiskCache(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.script_path = os.path.join(self.directory, 'script.apl')
+        self.write_script(CODE)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_script(self, code, mtime_ns=None):
+        with open(self.script_path, 'w') as file:
+            file.write(code)
+        if mtime_ns is not None:
+            os.utime(self.script_path, ns=(mtime_ns, mtime_ns))
+
+    def execute(self, compiled, engine):
+        apl_interpreter = interpreter.Interpreter(None, engine=engine)
+        apl_interpreter.symbol_table = {}
+        apl_interpreter.execute(compiled)
+        return apl_interpreter.symbol_table
+
+    def test_load_from_artifact(self):
+        cache_directory = os.path.join(self.directory, 'cache')
+        for engine in interpreter.ENGINES:
+            for optimize in (False, True):
+                compiled = disk.DiskCache(cache_directory).load(self.script_path, engine, optimize)
+                expected = self.execute(compiled, engine)
+
+                cache = disk.DiskCache(cache_directory)
+                with patch.object(parser.Parser, 'parse') as parse:
+                    compiled = cache.load(self.script_path, engine, optimize)
+                    parse.assert_not_called()
+
+                self.assertEqual(cache.stats(), disk.DiskCacheStats(hits=1, misses=0, writes=0, write_errors=0))
+                self.assertEqual(self.execute(compiled, engine), expected)
+
+    def test_mtime_invalidation(self):
+        cache = disk.DiskCache(os.path.join(self.directory, 'cache'))
+        self.write_script(CODE, mtime_ns=10 ** 18)
+        cache.load(self.script_path)
+        self.write_script('var x = 1;', mtime_ns=10 ** 18 + 1)
+
+        self.assertEqual(self.execute(cache.load(self.script_path), interpreter.TREE_ENGINE), {'x': 1})
+        self.assertEqual(cache.stats().misses, 2)
+
+    def test_hash_invalidation(self):
+        cache = disk.DiskCache(os.path.join(self.directory, 'cache'), validation=disk.HASH_VALIDATION)
+        self.write_script(CODE, mtime_ns=10 ** 18)
+        cache.load(self.script_path)
+        cache.load(self.script_path)
+        self.write_script(CODE.replace('10', '11'), mtime_ns=10 ** 18)
+        cache.load(self.script_path)
+
+        self.assertEqual(cache.stats(), disk.DiskCacheStats(hits=1, misses=2, writes=2, write_errors=0))
+
+    def test_corrupted_artifact(self):
+        cache = disk.DiskCache(os.path.join(self.directory, 'cache'))
+        expected = self.execute(cache.load(self.script_path), interpreter.TREE_ENGINE)
+        artifact_path = cache.artifact_path(self.script_path, interpreter.TREE_ENGINE, False)
+        with open(artifact_path, 'r+b') as file:
+            file.seek(disk.HEADER.size + 3)
+            file.write(b'\xff\xff')
+
+        self.assertEqual(self.execute(cache.load(self.script_path), interpreter.TREE_ENGINE), expected)
+        self.assertEqual(cache.stats().misses, 2)
+        self.assertListEqual([name for name in os.listdir(cache.directory) if name.endswith('.tmp')], [])
+
+    def test_unserializable_compiled_form(self):
+        cache = disk.DiskCache(os.path.join(self.directory, 'cache'))
+        with patch.object(disk, 'dump_compiled', side_effect=ValueError('unmarshallable object')):
+            compiled = cache.load(self.script_path, interpreter.VM_ENGINE)
+
+        self.assertEqual(cache.stats(), disk.DiskCacheStats(hits=0, misses=1, writes=0, write_errors=1))
+        self.assertIn('x', self.execute(compiled, interpreter.VM_ENGINE))
+        self.assertListEqual(os.listdir(cache.directory), [])
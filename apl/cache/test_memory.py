@@ -0,0 +1,56 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from apl.parser import parser
+from apl.interpreter import interpreter
+from apl.cache import memory
+
+
+class TestLRUCache(TestCase):
+
+    def test_lru_eviction(self):
+        cache = memory.LRUCache(maxsize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats(), memory.CacheStats(hits=2, misses=1, evictions=1, size=2, nbytes=0))
+
+    def test_max_bytes(self):
+        cache = memory.LRUCache(maxsize=10, max_bytes=100)
+        cache.put('a', 1, 60)
+        cache.put('b', 2, 30)
+        cache.put('c', 3, 30)
+        cache.put('d', 4, 200)
+
+        self.assertListEqual(list(cache.entries), ['b', 'c'])
+        self.assertEqual(cache.stats().nbytes, 60)
+
+    def test_disabled(self):
+        cache = memory.LRUCache(maxsize=0)
+        cache.put('a', 1)
+
+        self.assertIsNone(cache.get('a'))
+
+
+class TestProgramCache(TestCase):
+
+    def test_hit_skips_parsing(self):
+        cache = memory.ProgramCache()
+        for engine in interpreter.ENGINES:
+            compiled = cache.get_compiled('var x = 1 + 2;', engine)
+            with patch.object(parser.Parser, 'parse') as parse:
+                self.assertIs(cache.get_compiled('var x = 1 + 2;', engine), compiled)
+                parse.assert_not_called()
+
+            apl_interpreter = interpreter.Interpreter(None, engine=engine)
+            apl_interpreter.symbol_table = {}
+            apl_interpreter.execute(compiled)
+            self.assertEqual(apl_interpreter.symbol_table, {'x': 3})
+
+        self.assertEqual(cache.stats().hits, len(interpreter.ENGINES))
+        self.assertEqual(cache.stats().misses, len(interpreter.ENGINES))
+        self.assertGreater(cache.stats().nbytes, 0)
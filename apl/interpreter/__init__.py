@@ -1 +1,11 @@
-from . import interpreter
\ No newline at end of file
+from . import errors
+from . import arrays
+from . import resolver
+from . import bytecode
+from . import optimizer
+from . import flat_evaluator
+from . import transpiler
+from . import vm
+from . import interpreter
+from . import incremental
+from . import lazy
@@ -0,0 +1,244 @@
+"""
+Array values
+
+Vector literals (space-separated numbers, e.g. `1 2 3.5`) evaluate to one-dimensional NumPy arrays,
+int64 if every element is an integer and float64 otherwise. Binary operators apply element-wise,
+scalars being broadcast to every element.
+
+Array arithmetic follows NumPy: dividing an element by zero gives an inf or nan element instead of
+raising, and operating on vectors of different lengths raises a ValueError.
+
+Reductions (`+/ x`) and scans (`+\\ x`) fold right like in APL, e.g. `-/ 1 2 3` is `1 - (2 - 3)`.
+They are computed with NumPy kernels over chunks of the vector, so that a vector memory-mapped from a
+file (see `load_vector`) is reduced with bounded memory. Only the operand vector is read by chunks:
+an element-wise operand such as `x * 2` in `+/ x * 2` is computed in full before being reduced, and
+a scan result is as large as its vector and is built in memory.
+Like NumPy sums, reductions and scans accumulate small integers as int64 and unsigned integers as
+uint64, and `-` accumulates unsigned integers as signed numbers.
+
+NumPy is an optional dependency, only required by programs using vector literals. It is imported by
+`get_numpy` the first time a vector is built, so that scalar programs don't pay for its import.
+"""
+import importlib.util
+import sys
+
+from .errors import ProgrammingError
+
+# numpy module, once imported by get_numpy
+numpy = None
+
+
+NUMPY_REQUIRED = 'Vector values require NumPy, which is not installed'
+NOT_A_VECTOR = '%s is not a vector, its shape is %s'
+
+FUNCTIONS = ('+', '-', '*', '/')
+# number of elements processed at once by reductions and scans
+DEFAULT_CHUNK_SIZE = 1 << 20
+# element type of the raw binary files read by load_vector
+DEFAULT_RAW_DTYPE = 'float64'
+
+
+def has_numpy():
+    """
+    :return: True if NumPy is installed, without importing it
+    """
+    return numpy is not None or importlib.util.find_spec('numpy') is not None
+
+
+def get_numpy():
+    """
+    Import NumPy on first call
+
+    :return: numpy module
+    :raise: ProgrammingError if NumPy is not installed
+    """
+    global numpy
+    if numpy is None:
+        try:
+            import numpy as module
+        except ImportError:
+            raise ProgrammingError(NUMPY_REQUIRED) from None
+        numpy = module
+    return numpy
+
+
+def require_numpy():
+    """
+    :raise: ProgrammingError if NumPy is not installed
+    """
+    get_numpy()
+
+
+def imported_numpy():
+    """
+    :return: numpy module if it was imported, by get_numpy or by the application, None otherwise
+    """
+    return numpy or sys.modules.get('numpy')
+
+
+def make_vector(values):
+    """
+    Build a read-only vector value
+
+    :param values: sequence of int or float values
+    :return: numpy.ndarray
+    :raise: ProgrammingError if NumPy is not installed
+    """
+    vector = get_numpy().array(values)
+    # vector constants are shared by every evaluation of their literal
+    vector.flags.writeable = False
+    return vector
+
+
+def is_array(value):
+    """
+    :param value: any value
+    :return: True if 'value' is a NumPy array
+    """
+    # no value can be an array while NumPy is not imported
+    module = imported_numpy()
+    return module is not None and isinstance(value, module.ndarray)
+
+
+def load_vector(path, dtype=DEFAULT_RAW_DTYPE, mmap=True):
+    """
+    Load a vector from a .npy file, or from a raw binary file of 'dtype' elements
+
+    :param path: file path
+    :param dtype: element type of raw binary files, ignored for .npy files
+    :param mmap: memory-map the file (read-only) instead of reading it
+    :return: numpy.ndarray or numpy.memmap
+    :raise: ProgrammingError if NumPy is not installed or the file does not hold a vector
+    """
+    numpy = get_numpy()
+    if str(path).endswith('.npy'):
+        vector = numpy.load(path, mmap_mode='r' if mmap else None)
+    elif mmap:
+        vector = numpy.memmap(path, dtype=dtype, mode='r')
+    else:
+        vector = numpy.fromfile(path, dtype=dtype)
+    if vector.ndim != 1:
+        raise ProgrammingError(NOT_A_VECTOR % (path, vector.shape))
+    return vector
+
+
+def iter_chunks(vector, chunk_size):
+    """
+    :param vector: numpy.ndarray
+    :param chunk_size: number of elements per chunk, rounded up to an even number
+    :return: generator of (start index, chunk view), every chunk starting at an even index
+    """
+    # an even chunk size keeps the sign of each element of -/ and // given by its index in the chunk
+    chunk_size = max(2, chunk_size + chunk_size % 2)
+    for start in range(0, len(vector), chunk_size):
+        yield start, vector[start:start + chunk_size]
+
+
+def get_accumulator_dtype(function, dtype):
+    """
+    :param function: one of FUNCTIONS
+    :param dtype: element type of a vector
+    :return: element type of the reductions and scans of the vector with 'function'
+    """
+    numpy = get_numpy()
+    if function == '/':
+        return numpy.dtype(numpy.float64)
+    # the type of numpy.sum and numpy.cumsum results: small integers are promoted to 64 bits
+    accumulator_dtype = numpy.add.reduce(numpy.zeros(1, dtype=dtype)).dtype
+    if function == '-' and accumulator_dtype.kind == 'u':
+        # alternating sums can be negative: uint64 elements don't fit int64 and are accumulated as float64
+        return numpy.dtype(numpy.float64 if numpy.dtype(dtype).itemsize == 8 else numpy.int64)
+    return accumulator_dtype
+
+
+def reduce_vector(function, value, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Reduce a vector with the given function, folding right: `f/ a b c` is `a f (b f c)`.
+    The reduction of an empty vector is the identity of the function, the reduction of a scalar is itself.
+
+    :param function: one of FUNCTIONS
+    :param value: vector or scalar
+    :param chunk_size: number of elements processed at once
+    :return: int or float value
+    """
+    if not is_array(value):
+        return value
+    numpy = get_numpy()
+    if function == '+':
+        total = 0
+        for _, chunk in iter_chunks(value, chunk_size):
+            total = total + chunk.sum()
+    elif function == '*':
+        total = 1
+        for _, chunk in iter_chunks(value, chunk_size):
+            total = total * chunk.prod()
+    elif function == '-':
+        # a - (b - (c - d)) = a - b + c - d
+        dtype = get_accumulator_dtype(function, value.dtype)
+        total = 0
+        for _, chunk in iter_chunks(value, chunk_size):
+            total = total + chunk[0::2].sum(dtype=dtype) - chunk[1::2].sum(dtype=dtype)
+    elif function == '/':
+        # a / (b / (c / d)) = (a * c) / (b * d)
+        numerator = denominator = numpy.float64(1)
+        for _, chunk in iter_chunks(value, chunk_size):
+            numerator = numerator * chunk[0::2].prod(dtype=numpy.float64)
+            denominator = denominator * chunk[1::2].prod(dtype=numpy.float64)
+        total = numerator / denominator
+    else:
+        raise ValueError('Unknown function \'%s\'' % function)
+    return total.item() if isinstance(total, numpy.generic) else total
+
+
+def scan_vector(function, value, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Scan a vector with the given function: element i of the result is the reduction of the i + 1
+    first elements.
+
+    :param function: one of FUNCTIONS
+    :param value: vector or scalar
+    :param chunk_size: number of elements processed at once
+    :return: numpy.ndarray, or 'value' if it is a scalar
+    """
+    if not is_array(value):
+        return value
+    if function not in FUNCTIONS:
+        raise ValueError('Unknown function \'%s\'' % function)
+    numpy = get_numpy()
+    result = numpy.empty(len(value), dtype=get_accumulator_dtype(function, value.dtype))
+    carry = None
+    for start, chunk in iter_chunks(value, chunk_size):
+        part = result[start:start + len(chunk)]
+        if function == '+':
+            numpy.cumsum(chunk, out=part)
+        elif function == '*':
+            numpy.cumprod(chunk, out=part)
+        elif function == '-':
+            part[:] = chunk
+            part[1::2] *= -1
+            numpy.cumsum(part, out=part)
+        else:
+            part[:] = chunk
+            part[1::2] = 1 / part[1::2]
+            numpy.cumprod(part, out=part)
+        if carry is not None:
+            if function in ('+', '-'):
+                part += carry
+            else:
+                part *= carry
+        carry = part[-1]
+    return result
+
+
+def json_default(value):
+    """
+    `default` function of json.dumps: arrays and NumPy scalars become lists and numbers,
+    other values their repr
+
+    :param value: value not serializable by json
+    :return: serializable value
+    """
+    numpy = imported_numpy()
+    if numpy is not None and isinstance(value, (numpy.ndarray, numpy.generic)):
+        return value.tolist()
+    return repr(value)
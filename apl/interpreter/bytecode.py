@@ -0,0 +1,215 @@
+"""
+Bytecode compiler
+
+Compile an AST into a CodeObject run by apl.interpreter.vm.VirtualMachine.
+Each instruction is an opcode and an integer argument (0 when unused), stored in two parallel arrays.
+Constants are stored in a constant pool and variables are addressed by slot index.
+REDUCE and SCAN arguments are indexes in apl.interpreter.arrays.FUNCTIONS.
+"""
+from array import array
+
+from apl.parser import ast
+from apl.tokens import token_type
+from .arrays import make_vector, FUNCTIONS
+from .resolver import resolve
+
+
+LOAD_CONST = 0
+LOAD_VAR = 1
+STORE_VAR = 2
+DECLARE_VAR = 3
+CHECK_DECLARED = 4
+BINARY_ADD = 5
+BINARY_SUB = 6
+BINARY_MUL = 7
+BINARY_DIV = 8
+RETURN_VALUE = 9
+STORE_TEMP = 10
+LOAD_TEMP = 11
+REDUCE = 12
+SCAN = 13
+
+OPNAMES = (
+    'LOAD_CONST', 'LOAD_VAR', 'STORE_VAR', 'DECLARE_VAR', 'CHECK_DECLARED',
+    'BINARY_ADD', 'BINARY_SUB', 'BINARY_MUL', 'BINARY_DIV', 'RETURN_VALUE',
+    'STORE_TEMP', 'LOAD_TEMP', 'REDUCE', 'SCAN'
+)
+
+BINARY_OPCODES = {
+    token_type.PLUS: BINARY_ADD,
+    token_type.MINUS: BINARY_SUB,
+    token_type.MULT: BINARY_MUL,
+    token_type.DIV: BINARY_DIV,
+}
+
+
+def decode_number(literal):
+    """
+    Decode a NUMBER literal like Interpreter.visit_number
+
+    :param literal: NUMBER token value
+    :return: int value if 'literal' is an integer, float value otherwise
+    """
+    try:
+        return int(literal)
+    except ValueError:
+        return float(literal)
+
+
+class CodeObject:
+    """
+    Compiled program.
+    A CodeObject instance is defined by:
+        - ops: array('B') of opcodes
+        - args: array('i') of opcode arguments
+        - constants: constant pool
+        - names: variable name of each slot
+        - temp_count: number of temporary slots, holding shared subexpression values
+        - is_program: True if compiled from an ast.Program
+    """
+    __slots__ = ('ops', 'args', 'constants', 'names', 'temp_count', 'is_program')
+
+    def __init__(self):
+        self.ops = array('B')
+        self.args = array('i')
+        self.constants = []
+        self.names = []
+        self.temp_count = 0
+        self.is_program = False
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __str__(self):
+        lines = []
+        for offset, (op, arg) in enumerate(zip(self.ops, self.args)):
+            if op == LOAD_CONST:
+                lines.append('%4d %-15s %d (%r)' % (offset, OPNAMES[op], arg, self.constants[arg]))
+            elif op in (LOAD_VAR, STORE_VAR, DECLARE_VAR, CHECK_DECLARED):
+                lines.append('%4d %-15s %d (%s)' % (offset, OPNAMES[op], arg, self.names[arg]))
+            elif op in (REDUCE, SCAN):
+                lines.append('%4d %-15s %d (%s)' % (offset, OPNAMES[op], arg, FUNCTIONS[arg]))
+            elif op in (STORE_TEMP, LOAD_TEMP):
+                lines.append('%4d %-15s %d' % (offset, OPNAMES[op], arg))
+            else:
+                lines.append('%4d %s' % (offset, OPNAMES[op]))
+        return '\n'.join(lines)
+
+
+class Compiler(ast.ASTNodeVisitor):
+    """
+    Compile an AST into a CodeObject
+    """
+
+    def __init__(self):
+        self.code = CodeObject()
+        self.constant_index = {}
+        self.temp_index = {}
+
+    def emit(self, op, arg=0):
+        self.code.ops.append(op)
+        self.code.args.append(arg)
+
+    def add_constant(self, value, key=None):
+        # type is part of the key so 1 and 1.0 keep distinct slots
+        if key is None:
+            key = (type(value), value)
+        if key not in self.constant_index:
+            self.constant_index[key] = len(self.code.constants)
+            self.code.constants.append(value)
+        return self.constant_index[key]
+
+    def visit_binary_operator(self, node):
+        self.compile_expr(node)
+
+    def visit_number(self, node):
+        self.emit(LOAD_CONST, self.add_constant(decode_number(node.value)))
+
+    def visit_vector(self, node):
+        vector = make_vector([decode_number(value) for value in node.values])
+        self.emit(LOAD_CONST, self.add_constant(vector, (ast.Vector, tuple(node.values))))
+
+    def visit_array_operator(self, node):
+        self.compile_expr(node)
+
+    def visit_var(self, node):
+        self.emit(CHECK_DECLARED, node.slot)
+        self.emit(LOAD_CONST, self.add_constant(node.var_name))
+
+    def visit_var_init(self, node):
+        self.emit(LOAD_CONST, self.add_constant(node.var_name))
+
+    def visit_var_eval(self, node):
+        self.emit(LOAD_VAR, node.slot)
+
+    def visit_shared_expr(self, node):
+        self.compile_expr(node)
+
+    def compile_expr(self, expr):
+        """
+        Emit the instructions of an expression in evaluation order, with an explicit stack instead of
+        recursively. The other nodes are visited.
+
+        :param expr: expression AST node
+        :return: None
+        """
+        stack = [(expr, False)]
+        while stack:
+            node, operands_done = stack.pop()
+            if isinstance(node, ast.BinaryOperator):
+                if operands_done:
+                    self.emit(BINARY_OPCODES[node.operator.typename])
+                else:
+                    stack.extend(((node, True), (node.right, False), (node.left, False)))
+            elif isinstance(node, ast.ArrayOperator):
+                if operands_done:
+                    self.emit(REDUCE if isinstance(node, ast.Reduce) else SCAN, FUNCTIONS.index(node.function))
+                else:
+                    stack.extend(((node, True), (node.expr, False)))
+            elif isinstance(node, ast.SharedExpr):
+                # the first occurrence is the first one evaluated, later ones reuse its value
+                if operands_done:
+                    temp = self.temp_index[node] = len(self.temp_index)
+                    self.code.temp_count = max(self.code.temp_count, temp + 1)
+                    self.emit(STORE_TEMP, temp)
+                elif node in self.temp_index:
+                    self.emit(LOAD_TEMP, self.temp_index[node])
+                else:
+                    stack.extend(((node, True), (node.expr, False)))
+            else:
+                self.visit(node)
+
+    def visit_assignation(self, node):
+        self.temp_index.clear()
+        self.compile_expr(node.right_op)
+        slot = node.left_op.slot
+        if isinstance(node.left_op, ast.VarInit):
+            self.emit(DECLARE_VAR, slot)
+        else:
+            self.emit(STORE_VAR, slot)
+
+    def visit_program(self, node):
+        for instr in node.instructions:
+            self.visit(instr)
+        self.code.is_program = True
+
+    def compile(self, tree):
+        """
+        Compile the given AST
+
+        :param tree: AST root node
+        :return: CodeObject
+        """
+        self.code.names = resolve(tree)
+        self.visit(tree)
+        if not isinstance(tree, (ast.Program, ast.Assignation)):
+            self.emit(RETURN_VALUE)
+        return self.code
+
+
+def compile_tree(tree):
+    """
+    :param tree: AST root node
+    :return: CodeObject compiled from 'tree'
+    """
+    return Compiler().compile(tree)
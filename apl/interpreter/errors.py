@@ -0,0 +1,11 @@
+"""
+Interpreter errors definitions, shared by every execution engine
+"""
+
+
+class ProgrammingError(Exception):
+    pass
+
+
+UNDECLARED_VARIABLE = 'Can\'t assign value to undeclared \'%s\' variable'
+UNKNOWN_VARIABLE = 'Variable %s doesn\'t exist'
@@ -0,0 +1,180 @@
+"""
+Evaluation of flat AST encodings
+
+A parser.flat.FlatTree, e.g. a program image mapped by parser.image.load, is evaluated from its arrays,
+without creating proxy nodes. Like Interpreter.evaluate, expressions are evaluated with an explicit
+stack instead of recursively, `pending` holding the nodes whose operands are being evaluated:
+    - index of a binary operator node: `value` is its left operand, its right operand is to be evaluated
+    - (index of a binary operator node, left operand value): `value` is its right operand
+    - index of a SharedExpr, Reduce or Scan node: `value` is its expression value
+Number and VarEval right operands are evaluated without going through the stack.
+
+Literals are decoded on first use into FlatTree.constants, so that each one is decoded once per tree.
+Shared expression values are kept in Interpreter.shared_values, keyed by node index.
+"""
+from apl.parser.flat import (
+    NUMBER, VAR_EVAL, VAR, PLUS, MINUS, MULT, DIV, ASSIGNATION, PROGRAM, SHARED_EXPR, VECTOR, REDUCE, SCAN,
+    FUNCTIONS, FlatEncodingError,
+)
+from . import arrays
+from .bytecode import decode_number
+from .resolver import UNBOUND
+from .errors import ProgrammingError, UNDECLARED_VARIABLE, UNKNOWN_VARIABLE
+
+
+def get_constants(flat):
+    """
+    :param flat: FlatTree
+    :return: list of the decoded literals of 'flat', None for the literals not decoded yet
+    """
+    if flat.constants is None:
+        flat.constants = [None] * len(flat.literals)
+    return flat.constants
+
+
+def decode_constant(flat, literal):
+    """
+    Decode a literal of the pool of a FlatTree into its constants
+
+    :param flat: FlatTree
+    :param literal: index in the literal pool
+    :return: int or float value of a number literal, vector value of a vector literal
+    """
+    value = flat.literals[literal]
+    if isinstance(value, tuple):
+        value = arrays.make_vector([decode_number(element) for element in value])
+    else:
+        value = decode_number(value)
+    get_constants(flat)[literal] = value
+    return value
+
+
+def run(interpreter, flat, index):
+    """
+    Run a node of a FlatTree like Interpreter.visit
+
+    :param interpreter: Interpreter instance, giving the frame and the shared values
+    :param flat: FlatTree
+    :param index: node index
+    :return: True/False for a program depending on its success, None for an assignation,
+             the expression value otherwise
+    """
+    opcode = flat.opcodes[index]
+    if opcode == PROGRAM:
+        start = flat.first[index]
+        try:
+            for instruction in flat.extra[start:start + flat.second[index]]:
+                assign(interpreter, flat, instruction)
+        except Exception as ex:
+            interpreter.report_error(ex)
+            return False
+        return True
+    if opcode == ASSIGNATION:
+        assign(interpreter, flat, index)
+        return None
+    return evaluate(interpreter, flat, index)
+
+
+def assign(interpreter, flat, index):
+    """
+    Run an assignation node of a FlatTree like Interpreter.visit_assignation
+
+    :return: None
+    """
+    interpreter.shared_values.clear()
+    value = evaluate(interpreter, flat, flat.second[index])
+    target = flat.first[index]
+    slot = flat.first[target]
+    if flat.opcodes[target] == VAR and interpreter.frame[slot] is UNBOUND:
+        raise ProgrammingError(UNDECLARED_VARIABLE % flat.names[slot])
+    interpreter.frame[slot] = value
+
+
+def evaluate(interpreter, flat, index):
+    """
+    Evaluate an expression node of a FlatTree without recursion
+
+    :param interpreter: Interpreter instance, giving the frame and the shared values
+    :param flat: FlatTree
+    :param index: expression node index
+    :return: expression value
+    :raise: FlatEncodingError if the expression holds a node which is not an expression
+    """
+    opcodes, first, second = flat.opcodes, flat.first, flat.second
+    frame = interpreter.frame
+    shared_values = interpreter.shared_values
+    constants = get_constants(flat)
+    pending = []
+    schedule = pending.append
+    while True:
+        # descend to the leftmost operand of the node at 'index'
+        while True:
+            opcode = opcodes[index]
+            if PLUS <= opcode <= DIV:
+                schedule(index)
+                index = first[index]
+            elif opcode == VAR_EVAL:
+                value = frame[first[index]]
+                if value is UNBOUND:
+                    raise ProgrammingError(UNKNOWN_VARIABLE % flat.names[first[index]])
+                break
+            elif opcode == NUMBER or opcode == VECTOR:
+                value = constants[first[index]]
+                if value is None:
+                    value = decode_constant(flat, first[index])
+                break
+            elif opcode == SHARED_EXPR:
+                if index in shared_values:
+                    value = shared_values[index]
+                    break
+                schedule(index)
+                index = first[index]
+            elif opcode == REDUCE or opcode == SCAN:
+                schedule(index)
+                index = first[index]
+            else:
+                raise FlatEncodingError('Node %s of opcode %s is not an expression' % (index, opcode))
+
+        # apply the pending operations, until a right operand needs to be evaluated
+        while pending:
+            operation = pending.pop()
+            if operation.__class__ is tuple:
+                operation, left = operation
+                right = value
+                opcode = opcodes[operation]
+            else:
+                opcode = opcodes[operation]
+                if opcode == SHARED_EXPR:
+                    shared_values[operation] = value
+                    continue
+                if opcode == REDUCE:
+                    value = arrays.reduce_vector(FUNCTIONS[second[operation]], value)
+                    continue
+                if opcode == SCAN:
+                    value = arrays.scan_vector(FUNCTIONS[second[operation]], value)
+                    continue
+                right_index = second[operation]
+                right_opcode = opcodes[right_index]
+                if right_opcode == VAR_EVAL:
+                    right = frame[first[right_index]]
+                    if right is UNBOUND:
+                        raise ProgrammingError(UNKNOWN_VARIABLE % flat.names[first[right_index]])
+                elif right_opcode == NUMBER:
+                    right = constants[first[right_index]]
+                    if right is None:
+                        right = decode_constant(flat, first[right_index])
+                else:
+                    schedule((operation, value))
+                    index = right_index
+                    break
+                left = value
+            if opcode == PLUS:
+                value = left + right
+            elif opcode == MINUS:
+                value = left - right
+            elif opcode == MULT:
+                value = left * right
+            else:
+                value = left / right
+        else:
+            return value
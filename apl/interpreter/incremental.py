@@ -0,0 +1,269 @@
+"""
+Incremental recomputation
+
+An IncrementalInterpreter keeps a program loaded together with the dependency graph of its assignations:
+an instruction depends on the instructions which last assigned, before it, the variables it reads, and
+on the session inputs for the variables read before any assignation. When an input changes, or when an
+assignation is replaced, only the instructions downstream of the change are evaluated again, like the
+cells of a spreadsheet, so that an update costs time proportional to what it changes.
+
+Instructions are recomputed in source order, which is a topological order of the graph. The propagation
+stops at instructions whose value is unchanged. Given an executor, independent instructions are
+evaluated concurrently, wave by wave.
+"""
+import bisect
+import heapq
+import threading
+
+from apl.parser import ast
+from . import arrays
+from . import resolver
+from .interpreter import Interpreter, TREE_ENGINE
+from .resolver import UNBOUND
+from .errors import ProgrammingError
+
+
+NOT_AN_ASSIGNATION = 'Incremental programs are made of assignations, found %s'
+NOT_ASSIGNED = 'No assignation of \'%s\' to replace'
+
+
+class Instruction:
+    """
+    Assignation of a loaded program, defined by:
+        - node: ast.Assignation, its variable nodes having a slot
+        - name: assigned variable name
+        - names: variable names of the assignation, indexed by slot
+        - sources: for each slot, index of the instruction assigning the value read, None for an input
+        - value: value assigned by the last evaluation, UNBOUND before it succeeds
+    """
+    __slots__ = ('node', 'name', 'names', 'sources', 'value')
+
+    def __init__(self, node):
+        if not isinstance(node, ast.Assignation):
+            raise ProgrammingError(NOT_AN_ASSIGNATION % type(node).__name__)
+        self.node = node
+        self.name = node.left_op.var_name
+        self.names = resolver.resolve(node)
+        self.sources = []
+        self.value = UNBOUND
+
+
+def has_changed(old, new):
+    """
+    :return: False if values 'old' and 'new' are known to be equal, True otherwise
+    """
+    if old is UNBOUND or old.__class__ is not new.__class__ or arrays.is_array(new):
+        return True
+    return old != new
+
+
+class IncrementalInterpreter(Interpreter):
+    """
+    Interpreter running a program once, then recomputing it incrementally.
+    `symbol_table` holds the value of every variable at the end of the program, `inputs` the values
+    of the variables read before being assigned.
+    Only the tree engine is supported: instructions are evaluated one by one.
+    """
+
+    def __init__(self, parser, engine=TREE_ENGINE, optimize=False):
+        if engine != TREE_ENGINE or optimize:
+            raise ValueError('Incremental recomputation only supports the unoptimized tree engine')
+        super().__init__(parser, engine)
+        self.inputs = {}
+        self.instructions = []
+        # variable name -> indexes of its assignations, in source order
+        self.writers = {}
+        # instruction index -> indexes of the instructions reading its value
+        self.readers = []
+        # input name -> indexes of the instructions reading it
+        self.input_readers = {}
+        self.dirty = set()
+        self.last_recomputed = []
+        self.local = threading.local()
+
+    def interpret(self):
+        return self.load(self.parser.parse())
+
+    def load(self, program):
+        """
+        Load a program and run it, the current symbol table being its inputs
+
+        :param program: ast.Program made of assignations
+        :return: True if every instruction succeeded, False otherwise
+        """
+        self.inputs = dict(self.symbol_table)
+        self.instructions = [Instruction(node) for node in program.instructions]
+        self.writers = {}
+        self.readers = [set() for _ in self.instructions]
+        self.input_readers = {}
+        for index, instruction in enumerate(self.instructions):
+            self.link(index)
+            self.writers.setdefault(instruction.name, []).append(index)
+        self.dirty = set(range(len(self.instructions)))
+        return self.recompute()
+
+    def link(self, index):
+        """
+        Find the sources of an instruction and register it as their reader
+
+        :param index: instruction index
+        :return: None
+        """
+        instruction = self.instructions[index]
+        instruction.sources = []
+        for name in instruction.names:
+            writers = self.writers.get(name, ())
+            position = bisect.bisect_left(writers, index)
+            source = writers[position - 1] if position else None
+            instruction.sources.append(source)
+            if source is None:
+                self.input_readers.setdefault(name, set()).add(index)
+            else:
+                self.readers[source].add(index)
+
+    def unlink(self, index):
+        """
+        Unregister an instruction from the readers of its sources
+
+        :param index: instruction index
+        :return: None
+        """
+        instruction = self.instructions[index]
+        for name, source in zip(instruction.names, instruction.sources):
+            if source is None:
+                self.input_readers[name].discard(index)
+            else:
+                self.readers[source].discard(index)
+
+    def set_inputs(self, values, executor=None):
+        """
+        Change input values and recompute the instructions depending on them
+
+        :param values: dict variable name -> value
+        :param executor: concurrent.futures.Executor evaluating independent instructions concurrently
+        :return: True if every recomputed instruction succeeded, False otherwise
+        """
+        for name, value in values.items():
+            self.inputs[name] = value
+            if name not in self.writers:
+                self.symbol_table[name] = value
+            self.dirty.update(self.input_readers.get(name, ()))
+        return self.recompute(executor)
+
+    def reassign(self, node, executor=None):
+        """
+        Replace the last assignation of a variable and recompute the instructions depending on it
+
+        :param node: new ast.Assignation of the variable
+        :param executor: concurrent.futures.Executor evaluating independent instructions concurrently
+        :return: True if every recomputed instruction succeeded, False otherwise
+        :raise: ProgrammingError if the program doesn't assign the variable
+        """
+        instruction = Instruction(node)
+        writers = self.writers.get(instruction.name)
+        if not writers:
+            raise ProgrammingError(NOT_ASSIGNED % instruction.name)
+        index = writers[-1]
+        self.unlink(index)
+        instruction.value = self.instructions[index].value
+        self.instructions[index] = instruction
+        self.link(index)
+        self.dirty.add(index)
+        return self.recompute(executor)
+
+    def recompute(self, executor=None):
+        """
+        Evaluate the dirty instructions and, when their value changes, the instructions reading it.
+        On error, the instructions left to evaluate stay dirty and the error is reported.
+
+        :param executor: concurrent.futures.Executor evaluating independent instructions concurrently
+        :return: True if every recomputed instruction succeeded, False otherwise
+        """
+        self.last_recomputed = []
+        self.last_error = None
+        try:
+            if executor is None:
+                self.recompute_in_order()
+            else:
+                self.recompute_by_waves(executor)
+        except Exception as ex:
+            self.report_error(ex)
+            return False
+        return True
+
+    def recompute_in_order(self):
+        pending = sorted(self.dirty)
+        while pending:
+            index = pending[0]
+            changed = self.update_value(index, self.evaluate_instruction(index))
+            heapq.heappop(pending)
+            self.dirty.discard(index)
+            for reader in self.readers[index] if changed else ():
+                if reader not in self.dirty:
+                    self.dirty.add(reader)
+                    heapq.heappush(pending, reader)
+
+    def recompute_by_waves(self, executor):
+        dirty = self.dirty
+        while dirty:
+            # instructions whose sources can't change any more: no ancestor is dirty
+            pending = self.get_downstream(dirty)
+            wave = sorted(index for index in dirty
+                          if not any(source in pending for source in self.instructions[index].sources))
+            values = [executor.submit(self.evaluate_instruction, index) for index in wave]
+            for index, value in zip(wave, values):
+                changed = self.update_value(index, value.result())
+                dirty.discard(index)
+                if changed:
+                    dirty.update(self.readers[index])
+
+    def get_downstream(self, indexes):
+        """
+        :param indexes: instruction indexes
+        :return: set of 'indexes' and of the instructions reading their values, directly or not
+        """
+        downstream = set(indexes)
+        stack = list(indexes)
+        while stack:
+            for reader in self.readers[stack.pop()]:
+                if reader not in downstream:
+                    downstream.add(reader)
+                    stack.append(reader)
+        return downstream
+
+    def update_value(self, index, value):
+        """
+        Store the new value of an instruction and record it in `last_recomputed`
+
+        :return: True if the value changed
+        """
+        instruction = self.instructions[index]
+        changed = has_changed(instruction.value, value)
+        instruction.value = value
+        if self.writers[instruction.name][-1] == index:
+            self.symbol_table[instruction.name] = value
+        self.last_recomputed.append(index)
+        return changed
+
+    def evaluate_instruction(self, index):
+        """
+        Evaluate an instruction against the values of its sources, without side effect.
+        Each thread uses its own evaluator, so that instructions can be evaluated concurrently.
+
+        :param index: instruction index
+        :return: instruction value
+        """
+        evaluator = getattr(self.local, 'evaluator', None)
+        if evaluator is None:
+            evaluator = self.local.evaluator = Interpreter(None)
+        instruction = self.instructions[index]
+        instructions = self.instructions
+        inputs = self.inputs
+        evaluator.frame = [
+            inputs.get(name, UNBOUND) if source is None else instructions[source].value
+            for name, source in zip(instruction.names, instruction.sources)
+        ]
+        evaluator.shared_values = {}
+        value = evaluator.evaluate(instruction.node.right_op)
+        evaluator.visit(instruction.node.left_op)
+        return value
@@ -1,17 +1,76 @@
 from apl.parser import ast
+from apl.parser.flat import FlatTree
 from apl.tokens import token_type
+from . import arrays
+from . import bytecode
+from . import flat_evaluator
+from . import optimizer
+from . import resolver
+from . import transpiler
+from . import vm
+from .resolver import UNBOUND
+from .errors import ProgrammingError, UNDECLARED_VARIABLE, UNKNOWN_VARIABLE
 
 
-class ProgrammingError(Exception):
-    pass
+TREE_ENGINE = 'tree'
+VM_ENGINE = 'vm'
+PYTHON_ENGINE = 'python'
+ENGINES = (TREE_ENGINE, VM_ENGINE, PYTHON_ENGINE)
 
+# operation codes of the BinaryOperator nodes
+ADD = 0
+SUBTRACT = 1
+MULTIPLY = 2
+DIVIDE = 3
+OPERATIONS = {token_type.PLUS: ADD, token_type.MINUS: SUBTRACT, token_type.MULT: MULTIPLY, token_type.DIV: DIVIDE}
 
-class Interpreter(ast.ASTNodeVisitor):
 
-    symbol_table = {}
+def decode_literals(tree):
+    """
+    Decode the literals and the operator codes of an AST once, into the `constant` attribute of its
+    Number and Vector nodes and the `code` attribute of its BinaryOperator nodes, so that the tree
+    engine doesn't decode them at every evaluation
+
+    :param tree: AST root node
+    :return: 'tree'
+    :raise: ProgrammingError if the AST holds vector literals and NumPy is not installed
+    """
+    for node in ast.walk(tree):
+        node_class = node.__class__
+        if node_class is ast.BinaryOperator:
+            node.code = OPERATIONS[node.operator.typename]
+        elif node_class is ast.Number:
+            node.constant = bytecode.decode_number(node.value)
+        elif node_class is ast.Vector and node.constant is None:
+            node.constant = arrays.make_vector([bytecode.decode_number(value) for value in node.values])
+    return tree
 
-    def __init__(self, parser):
+
+class Interpreter(ast.ASTNodeVisitor):
+    """
+    Interpreter instance running programs against its own symbol table.
+    While a program runs, variables are stored in a frame indexed by the slots resolved at compile time,
+    and `symbol_table` is updated from that frame once the program is over.
+    Expressions are evaluated by `evaluate` without recursion, the `visit_<node>` methods evaluating a
+    single node recursively.
+    """
+
+    def __init__(self, parser, engine=TREE_ENGINE, optimize=False):
+        """
+        :param parser: Parser instance generating the AST to interpret
+        :param engine: TREE_ENGINE to walk the AST, VM_ENGINE to compile it to bytecode run by a VM,
+                       PYTHON_ENGINE to transpile it to a Python function
+        :param optimize: run the optimizer.Optimizer passes over the AST before evaluating it
+        """
+        if engine not in ENGINES:
+            raise ValueError('Unknown engine \'%s\', expecting one of %s' % (engine, ', '.join(ENGINES)))
         self.parser = parser
+        self.engine = engine
+        self.optimizer = optimizer.Optimizer() if optimize else None
+        self.symbol_table = {}
+        self.frame = []
+        self.shared_values = {}
+        self.last_error = None
 
     def visit_binary_operator(self, node):
         op_type = node.operator.typename
@@ -30,22 +89,44 @@ class Interpreter(ast.ASTNodeVisitor):
         except:
             return float(node.value)
 
+    def visit_vector(self, node):
+        vector = node.constant
+        if vector is None:
+            vector = arrays.make_vector([bytecode.decode_number(value) for value in node.values])
+        return vector
+
+    def visit_reduce(self, node):
+        return arrays.reduce_vector(node.function, self.visit(node.expr))
+
+    def visit_scan(self, node):
+        return arrays.scan_vector(node.function, self.visit(node.expr))
+
     def visit_var(self, node):
-        if node.var_name in self.symbol_table:
+        if self.frame[node.slot] is not UNBOUND:
             return node.var_name
-        raise ProgrammingError('Can\'t assign value to undeclared \'%s\' variable' % node.var_name)
+        raise ProgrammingError(UNDECLARED_VARIABLE % node.var_name)
 
     def visit_var_init(self, node):
         return node.var_name
 
     def visit_var_eval(self, node):
+        value = self.frame[node.slot]
+        if value is UNBOUND:
+            raise ProgrammingError(UNKNOWN_VARIABLE % node.var_name)
+        return value
+
+    def visit_shared_expr(self, node):
         try:
-            return self.symbol_table[node.var_name]
+            return self.shared_values[node]
         except KeyError:
-            raise ProgrammingError('Variable %s doesn\'t exist' % node.var_name)
+            value = self.shared_values[node] = self.visit(node.expr)
+            return value
 
     def visit_assignation(self, node):
-        self.symbol_table[self.visit(node.left_op)] = self.visit(node.right_op)
+        self.shared_values.clear()
+        value = self.evaluate(node.right_op)
+        self.visit(node.left_op)
+        self.frame[node.left_op.slot] = value
 
     def visit_program(self, node):
         instruction_list = node.instructions
@@ -53,10 +134,195 @@ class Interpreter(ast.ASTNodeVisitor):
             for instr in instruction_list:
                 self.visit(instr)
         except Exception as ex:
-            print(ex)
+            self.report_error(ex)
+            return False
+        return True
+
+    def evaluate(self, node):
+        """
+        Evaluate an AST node like `visit`, expressions being evaluated with an explicit stack instead of
+        recursively, and the other nodes being visited.
+
+        The value of the node being evaluated is kept in `value` while `pending` holds what to do with it:
+            - BinaryOperator: `value` is its left operand, its right operand is to be evaluated
+            - (BinaryOperator, left operand value): `value` is its right operand
+            - SharedExpr, Reduce or Scan: `value` is its expression value
+        Number and VarEval right operands are evaluated without going through the stack.
+        The literals and operator codes decoded by `decode_literals` are used when they are set.
+
+        :param node: AST node
+        :return: node value
+        """
+        frame = self.frame
+        shared_values = self.shared_values
+        pending = []
+        schedule = pending.append
+        while True:
+            # descend to the leftmost operand of 'node'
+            while True:
+                node_class = node.__class__
+                if node_class is ast.BinaryOperator:
+                    schedule(node)
+                    node = node.left
+                elif node_class is ast.VarEval:
+                    value = frame[node.slot]
+                    if value is UNBOUND:
+                        raise ProgrammingError(UNKNOWN_VARIABLE % node.var_name)
+                    break
+                elif node_class is ast.Number:
+                    value = node.constant
+                    if value is None:
+                        try:
+                            value = int(node.token.value)
+                        except ValueError:
+                            value = float(node.token.value)
+                    break
+                elif node_class is ast.SharedExpr:
+                    if node in shared_values:
+                        value = shared_values[node]
+                        break
+                    schedule(node)
+                    node = node.expr
+                elif node_class is ast.Reduce or node_class is ast.Scan:
+                    schedule(node)
+                    node = node.expr
+                else:
+                    value = self.visit(node)
+                    break
+
+            # apply the pending operations, until a right operand needs to be evaluated
+            while pending:
+                operation = pending.pop()
+                operation_class = operation.__class__
+                if operation_class is ast.BinaryOperator:
+                    right_node = operation.right
+                    right_class = right_node.__class__
+                    if right_class is ast.VarEval:
+                        right = frame[right_node.slot]
+                        if right is UNBOUND:
+                            raise ProgrammingError(UNKNOWN_VARIABLE % right_node.var_name)
+                    elif right_class is ast.Number:
+                        right = right_node.constant
+                        if right is None:
+                            try:
+                                right = int(right_node.token.value)
+                            except ValueError:
+                                right = float(right_node.token.value)
+                    else:
+                        schedule((operation, value))
+                        node = right_node
+                        break
+                    left = value
+                elif operation_class is tuple:
+                    operation, left = operation
+                    right = value
+                elif operation_class is ast.SharedExpr:
+                    shared_values[operation] = value
+                    continue
+                elif operation_class is ast.Reduce:
+                    value = arrays.reduce_vector(operation.function, value)
+                    continue
+                else:
+                    value = arrays.scan_vector(operation.function, value)
+                    continue
+                code = operation.code
+                if code is None:
+                    code = OPERATIONS[operation.operator.typename]
+                if code == ADD:
+                    value = left + right
+                elif code == SUBTRACT:
+                    value = left - right
+                elif code == MULTIPLY:
+                    value = left * right
+                else:
+                    value = left / right
+            else:
+                return value
+
+    def run_stream(self, instructions):
+        """
+        Run a program instruction by instruction, each one being compiled and executed as soon as it is
+        generated, e.g. by Parser.iter_instructions, so that it can be discarded before the next one is
+        parsed. Like a program, the run stops at the first error, which is reported.
+
+        :param instructions: iterable of instruction AST nodes
+        :return: True if every instruction succeeded, False otherwise
+        """
+        try:
+            for instruction in instructions:
+                self.execute(self.compile(instruction))
+        except Exception as ex:
+            self.report_error(ex)
             return False
         return True
 
+    def report_error(self, ex):
+        """
+        Report the error which stopped a program
+
+        :param ex: exception raised by the program
+        :return: None
+        """
+        self.last_error = ex
+        print(ex)
+
+    def compile(self, tree):
+        """
+        Prepare the given AST for the interpreter engine
+
+        :param tree: AST root node
+        :return: resolver.ResolvedTree for TREE_ENGINE, bytecode.CodeObject for VM_ENGINE,
+                 transpiler.CompiledProgram for PYTHON_ENGINE
+        """
+        if self.optimizer is not None:
+            tree = self.optimizer.optimize(tree)
+        if self.engine == VM_ENGINE:
+            return bytecode.compile_tree(tree)
+        if self.engine == PYTHON_ENGINE:
+            return transpiler.compile_tree(tree)
+        return resolver.ResolvedTree(decode_literals(tree))
+
+    def execute(self, compiled):
+        """
+        Run a program prepared by `compile` against the interpreter symbol table
+
+        :param compiled: value returned by `compile`, or parser.flat.FlatTree with the tree engine
+        :return: True/False for a program depending on its success, the expression value otherwise
+        :raise: ValueError if 'compiled' is a FlatTree and the engine isn't the tree engine
+        """
+        self.last_error = None
+        if self.engine == VM_ENGINE or self.engine == PYTHON_ENGINE:
+            if compiled.__class__ is FlatTree:
+                raise ValueError(
+                    'Flat trees are executed by the tree engine, compile their `tree` for the %s engine' % self.engine
+                )
+            if not compiled.is_program:
+                return self.run_compiled(compiled)
+            try:
+                self.run_compiled(compiled)
+            except Exception as ex:
+                self.report_error(ex)
+                return False
+            return True
+        self.shared_values.clear()
+        self.frame = resolver.load_frame(compiled.names, self.symbol_table)
+        try:
+            if compiled.__class__ is FlatTree:
+                return flat_evaluator.run(self, compiled, compiled.root)
+            return self.evaluate(compiled.tree)
+        finally:
+            resolver.store_frame(compiled.names, self.frame, self.symbol_table)
+
+    def run_compiled(self, compiled):
+        """
+        Run a bytecode.CodeObject or a transpiler.CompiledProgram, errors being raised
+
+        :return: the expression value, None for a program
+        """
+        if self.engine == VM_ENGINE:
+            return vm.VirtualMachine().execute(compiled, self.symbol_table)
+        return compiled.execute(self.symbol_table)
+
     def interpret(self):
         tree = self.parser.parse()
-        return self.visit(tree)
+        return self.execute(self.compile(tree))
@@ -0,0 +1,129 @@
+"""
+Lazy evaluation
+
+A LazyInterpreter binds each assigned variable to a Thunk instead of its value: the right operand of the
+assignation is only evaluated when the variable is read, by a VarEval node or by a query, and its value
+is then memoized. Errors of a thunk surface where the variable is read.
+
+A thunk captures the values of the variables its expression reads at assignation time, thunks
+themselves, and releases them once it is forced: thunks which are never forced are reclaimed as soon as
+their variable is reassigned or their readers are forced.
+"""
+from apl.parser import ast
+from .interpreter import Interpreter, TREE_ENGINE
+from .resolver import UNBOUND
+from .errors import ProgrammingError, UNKNOWN_VARIABLE
+
+
+class Thunk:
+    """
+    Delayed evaluation of an expression, defined by:
+        - expr: expression AST node, None once forced
+        - captured: tuple of (slot, value or Thunk) of the variables read by 'expr', None once forced
+        - frame_size: size of the frame 'expr' is evaluated with
+        - value: expression value once forced, UNBOUND before
+    """
+    __slots__ = ('expr', 'captured', 'frame_size', 'value')
+
+    def __init__(self, expr, captured, frame_size):
+        self.expr = expr
+        self.captured = captured
+        self.frame_size = frame_size
+        self.value = UNBOUND
+
+    @property
+    def forced(self):
+        return self.expr is None
+
+    def __repr__(self):
+        return repr(self.value) if self.forced else '<thunk>'
+
+
+def read_slots(expr):
+    """
+    :param expr: expression AST node, its variable nodes having a slot
+    :return: set of the slots of the variables read by 'expr'
+    """
+    return {node.slot for node in ast.walk(expr) if isinstance(node, ast.VarEval)}
+
+
+class LazyInterpreter(Interpreter):
+    """
+    Interpreter evaluating assignations lazily: variables of the symbol table may hold Thunk instances,
+    forced by `query`. Expressions which are not assignations are evaluated eagerly.
+    Only the tree engine is supported.
+    """
+
+    def __init__(self, parser, engine=TREE_ENGINE, optimize=False):
+        if engine != TREE_ENGINE:
+            raise ValueError('Lazy evaluation only supports the tree engine')
+        super().__init__(parser, engine, optimize)
+
+    def visit_assignation(self, node):
+        frame = self.frame
+        captured = tuple((slot, frame[slot]) for slot in read_slots(node.right_op))
+        self.visit(node.left_op)
+        frame[node.left_op.slot] = Thunk(node.right_op, captured, len(frame))
+
+    def evaluate(self, node):
+        if isinstance(node, (ast.Program, ast.Assignation)):
+            return self.visit(node)
+        frame = self.frame
+        return self.force(Thunk(node, tuple((slot, frame[slot]) for slot in read_slots(node)), len(frame)))
+
+    def force(self, thunk):
+        """
+        Force a thunk, and first the thunks it reads, without recursion
+
+        :param thunk: Thunk instance
+        :return: thunk value
+        :raise: error of the first thunk failing, which is left unforced
+        """
+        stack = [thunk]
+        while stack:
+            current = stack[-1]
+            if current.forced:
+                stack.pop()
+                continue
+            unforced = [value for _, value in current.captured if value.__class__ is Thunk and not value.forced]
+            if unforced:
+                stack.extend(unforced)
+                continue
+            frame = [UNBOUND] * current.frame_size
+            for slot, value in current.captured:
+                frame[slot] = value.value if value.__class__ is Thunk else value
+            current.value = self.evaluate_with_frame(current.expr, frame)
+            current.expr = current.captured = None
+            stack.pop()
+        return thunk.value
+
+    def evaluate_with_frame(self, expr, frame):
+        """
+        :param expr: expression AST node
+        :param frame: frame of the variable values read by 'expr'
+        :return: expression value
+        """
+        saved = self.frame, self.shared_values
+        self.frame, self.shared_values = frame, {}
+        try:
+            return Interpreter.evaluate(self, expr)
+        finally:
+            self.frame, self.shared_values = saved
+
+    def query(self, *names):
+        """
+        Read variables of the symbol table, forcing their thunks
+
+        :param names: variable names
+        :return: dict variable name -> value
+        :raise: ProgrammingError for an unknown variable, the thunk error if forcing it fails
+        """
+        values = {}
+        for name in names:
+            value = self.symbol_table.get(name, UNBOUND)
+            if value is UNBOUND:
+                raise ProgrammingError(UNKNOWN_VARIABLE % name)
+            if value.__class__ is Thunk:
+                value = self.symbol_table[name] = self.force(value)
+            values[name] = value
+        return values
@@ -0,0 +1,337 @@
+"""
+AST optimizer
+
+Optional stage between Parser.parse() and evaluation, made of the following passes:
+    - constant folding: BinaryOperator nodes whose operands are Numbers are replaced by a Number
+    - algebraic simplification: x * 1, 1 * x, x + 0, 0 + x and x - 0 are replaced by x
+    - common subexpression elimination: BinaryOperator subtrees repeated inside an instruction are
+      replaced by a single SharedExpr node, evaluated once per instruction
+
+Passes never evaluate anything that could fail at runtime (e.g. division by zero is left in the tree)
+and never change a value type: identities only apply to int literals, so that x * 1.0 stays a float.
+"""
+from apl.parser import ast
+from apl.tokens import token_type
+from apl.tokens.tokens import Token
+from .bytecode import decode_number
+
+
+CONSTANT_FOLDING = 'constant_folding'
+ALGEBRAIC_SIMPLIFICATION = 'algebraic_simplification'
+COMMON_SUBEXPRESSION_ELIMINATION = 'common_subexpression_elimination'
+
+OPERATIONS = {
+    token_type.PLUS: lambda left, right: left + right,
+    token_type.MINUS: lambda left, right: left - right,
+    token_type.MULT: lambda left, right: left * right,
+    token_type.DIV: lambda left, right: left / right,
+}
+
+
+def count_nodes(node):
+    """
+    Count the nodes evaluated when visiting 'node', SharedExpr expressions being counted once
+
+    :param node: AST node
+    :return: number of nodes
+    """
+    count = 0
+    seen = set()
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ast.SharedExpr):
+            if node not in seen:
+                seen.add(node)
+                stack.append(node.expr)
+            continue
+        count += 1
+        if isinstance(node, ast.BinaryOperator):
+            stack.append(node.left)
+            stack.append(node.right)
+        elif isinstance(node, ast.Assignation):
+            stack.append(node.left_op)
+            stack.append(node.right_op)
+        elif isinstance(node, ast.Program):
+            stack.extend(node.instructions)
+        elif isinstance(node, ast.ArrayOperator):
+            stack.append(node.expr)
+    return count
+
+
+def encode_number(value, token):
+    """
+    Build a Number node decoded by Interpreter.visit_number as 'value'
+
+    :param value: int or float value
+    :param token: token the value was computed from, giving its position
+    :return: ast.Number
+    """
+    return ast.Number(Token(token_type.NUMBER, repr(value), token.line, token.column))
+
+
+def rebuild_array_operator(node, expr):
+    """
+    :param node: Reduce or Scan node, or one of their subclasses, e.g. flat proxy nodes
+    :param expr: new operand
+    :return: ast.Reduce or ast.Scan node of the operator of 'node' applied to 'expr'
+    """
+    return (ast.Reduce if isinstance(node, ast.Reduce) else ast.Scan)(node.operator, expr)
+
+
+class Transformer(ast.ASTNodeVisitor):
+    """
+    Base optimizer pass: rebuild Program and Assignation nodes from their transformed children,
+    leave leaf nodes unchanged. Expressions are transformed by `transform` without recursion, each
+    BinaryOperator, Reduce and Scan node being rebuilt from its transformed operands then given to
+    `transform_binary_operator` or `transform_array_operator`.
+    """
+
+    def visit_program(self, node):
+        return ast.Program([self.visit(instr) for instr in node.instructions])
+
+    def visit_assignation(self, node):
+        return ast.Assignation(node.left_op, self.transform(node.right_op))
+
+    def visit_binary_operator(self, node):
+        return self.transform(node)
+
+    def visit_array_operator(self, node):
+        return self.transform(node)
+
+    def visit_shared_expr(self, node):
+        return node
+
+    def default_visit(self, node):
+        return node
+
+    def transform(self, expr):
+        """
+        Transform an expression bottom-up, with an explicit stack
+
+        :param expr: expression AST node
+        :return: transformed expression, 'expr' itself if nothing changed
+        """
+        results = []
+        stack = [(expr, False)]
+        while stack:
+            node, operands_done = stack.pop()
+            if isinstance(node, ast.BinaryOperator):
+                if not operands_done:
+                    stack.extend(((node, True), (node.right, False), (node.left, False)))
+                    continue
+                right = results.pop()
+                left = results.pop()
+                if left is not node.left or right is not node.right:
+                    node = ast.BinaryOperator(node.operator, left, right)
+                node = self.transform_binary_operator(node)
+            elif isinstance(node, ast.ArrayOperator):
+                if not operands_done:
+                    stack.extend(((node, True), (node.expr, False)))
+                    continue
+                operand = results.pop()
+                if operand is not node.expr:
+                    node = rebuild_array_operator(node, operand)
+                node = self.transform_array_operator(node)
+            results.append(node)
+        return results.pop()
+
+    def transform_binary_operator(self, node):
+        """
+        :param node: BinaryOperator whose operands are transformed
+        :return: transformed node
+        """
+        return node
+
+    def transform_array_operator(self, node):
+        """
+        :param node: Reduce or Scan node whose operand is transformed
+        :return: transformed node
+        """
+        return node
+
+
+class ConstantFolder(Transformer):
+
+    def transform_binary_operator(self, node):
+        if not (isinstance(node.left, ast.Number) and isinstance(node.right, ast.Number)):
+            return node
+        try:
+            value = OPERATIONS[node.operator.typename](decode_number(node.left.value), decode_number(node.right.value))
+            return encode_number(value, node.operator)
+        except (ArithmeticError, ValueError):
+            # raised again at runtime, or value not representable as a literal
+            return node
+
+
+class AlgebraicSimplifier(Transformer):
+
+    @staticmethod
+    def is_int_literal(node, value):
+        if not isinstance(node, ast.Number):
+            return False
+        literal = decode_number(node.value)
+        return type(literal) is int and literal == value
+
+    def transform_binary_operator(self, node):
+        op_type = node.operator.typename
+        if op_type == token_type.MULT:
+            if self.is_int_literal(node.right, 1):
+                return node.left
+            if self.is_int_literal(node.left, 1):
+                return node.right
+        elif op_type == token_type.PLUS:
+            if self.is_int_literal(node.right, 0):
+                return node.left
+            if self.is_int_literal(node.left, 0):
+                return node.right
+        elif op_type == token_type.MINUS:
+            if self.is_int_literal(node.right, 0):
+                return node.left
+        return node
+
+
+class CommonSubexpressionEliminator(Transformer):
+    """
+    Replace BinaryOperator, Reduce and Scan subtrees repeated in an instruction by a single SharedExpr.
+    Expressions have no side effect and variables are only assigned once the right operand is
+    evaluated, so every occurrence of a subtree has the same value inside an instruction.
+
+    Equal subtrees get the same key: the number given to the tuple of their operator and of the keys of
+    their operands, so that keys stay flat however deep the subtrees are.
+    """
+
+    def __init__(self):
+        self.keys = {}
+        self.key_numbers = {}
+        self.counts = {}
+        self.shared = {}
+
+    def get_key(self, expr):
+        """
+        Compute the keys of the BinaryOperator, Reduce and Scan nodes of an expression, without recursion
+
+        :param expr: expression AST node
+        :return: key of 'expr'
+        """
+        keys = []
+        stack = [(expr, False)]
+        while stack:
+            node, operands_done = stack.pop()
+            if isinstance(node, ast.BinaryOperator):
+                if not operands_done:
+                    stack.extend(((node, True), (node.right, False), (node.left, False)))
+                    continue
+                right = keys.pop()
+                key = self.keys[node] = self.get_key_number((node.operator.typename, keys.pop(), right))
+            elif isinstance(node, ast.ArrayOperator):
+                if not operands_done:
+                    stack.extend(((node, True), (node.expr, False)))
+                    continue
+                key = self.keys[node] = self.get_key_number((node.operator.typename, node.function, keys.pop()))
+            elif isinstance(node, ast.Number):
+                key = token_type.NUMBER, node.value
+            elif isinstance(node, ast.Vector):
+                key = token_type.NUMBER, tuple(node.values)
+            elif isinstance(node, ast.VarEval):
+                key = token_type.IDENTIFIER, node.var_name
+            else:
+                key = node
+            keys.append(key)
+        return keys.pop()
+
+    def get_key_number(self, key):
+        try:
+            return self.key_numbers[key]
+        except KeyError:
+            number = self.key_numbers[key] = len(self.key_numbers)
+            return number
+
+    def count(self, expr):
+        # occurrences nested in an already repeated subtree are not counted again
+        stack = [expr]
+        while stack:
+            node = stack.pop()
+            if node in self.keys:
+                key = self.keys[node]
+                self.counts[key] = self.counts.get(key, 0) + 1
+                if self.counts[key] == 1:
+                    stack.extend(ast.iter_children(node))
+
+    def replace(self, expr):
+        """
+        Rebuild an expression, its repeated subtrees being replaced by a SharedExpr, without recursion.
+        Operands are replaced from left to right, so that the first occurrence of a repeated subtree, the
+        first one evaluated, holds its expression.
+
+        :param expr: expression AST node
+        :return: rebuilt expression
+        """
+        results = []
+        stack = [(expr, False)]
+        while stack:
+            node, operands_done = stack.pop()
+            if node not in self.keys:
+                results.append(node)
+                continue
+            key = self.keys[node]
+            if not operands_done:
+                if key in self.shared:
+                    results.append(self.shared[key])
+                elif isinstance(node, ast.ArrayOperator):
+                    stack.extend(((node, True), (node.expr, False)))
+                else:
+                    stack.extend(((node, True), (node.right, False), (node.left, False)))
+                continue
+            if isinstance(node, ast.ArrayOperator):
+                operand = results.pop()
+                if operand is not node.expr:
+                    node = rebuild_array_operator(node, operand)
+            else:
+                right = results.pop()
+                left = results.pop()
+                if left is not node.left or right is not node.right:
+                    node = ast.BinaryOperator(node.operator, left, right)
+            if self.counts.get(key, 0) > 1:
+                node = self.shared[key] = ast.SharedExpr(node)
+            results.append(node)
+        return results.pop()
+
+    def transform(self, expr):
+        self.keys = {}
+        self.key_numbers = {}
+        self.counts = {}
+        self.shared = {}
+        self.get_key(expr)
+        self.count(expr)
+        return self.replace(expr)
+
+
+class Optimizer:
+    """
+    Run the optimizer passes over an AST.
+    The number of nodes removed by each pass is accumulated in `stats`.
+    """
+
+    def __init__(self, constant_folding=True, algebraic_simplification=True, common_subexpression_elimination=True):
+        self.passes = []
+        if constant_folding:
+            self.passes.append((CONSTANT_FOLDING, ConstantFolder))
+        if algebraic_simplification:
+            self.passes.append((ALGEBRAIC_SIMPLIFICATION, AlgebraicSimplifier))
+        if common_subexpression_elimination:
+            self.passes.append((COMMON_SUBEXPRESSION_ELIMINATION, CommonSubexpressionEliminator))
+        self.stats = {name: 0 for name, _ in self.passes}
+
+    def optimize(self, tree):
+        """
+        Optimize the given AST, the given tree is left unchanged
+
+        :param tree: AST root node
+        :return: optimized AST root node
+        """
+        for name, pass_class in self.passes:
+            node_count = count_nodes(tree)
+            tree = pass_class().visit(tree)
+            self.stats[name] += node_count - count_nodes(tree)
+        return tree
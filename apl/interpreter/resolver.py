@@ -0,0 +1,68 @@
+"""
+Variable resolution
+
+Assign a slot index to every variable of an AST, so that engines store variable values in a flat frame
+(a list indexed by slot) instead of looking them up by name. The frame of a program is loaded from a
+symbol table before running the program and written back to it afterwards.
+"""
+from apl.parser import ast
+
+
+UNBOUND = object()
+
+
+def resolve(tree):
+    """
+    Set the `slot` attribute of the Var, VarInit and VarEval nodes of the given AST.
+    Slots are numbered by order of first occurrence, so resolving a tree again gives the same slots.
+
+    :param tree: AST root node
+    :return: list of the variable names, indexed by slot
+    """
+    slots = {}
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Var):
+            try:
+                node.slot = slots[node.var_name]
+            except KeyError:
+                node.slot = slots[node.var_name] = len(names)
+                names.append(node.var_name)
+    return names
+
+
+def load_frame(names, symbol_table):
+    """
+    :param names: variable names, indexed by slot
+    :param symbol_table: dict variable name -> value
+    :return: frame of the variable values, UNBOUND for variables missing from 'symbol_table'
+    """
+    return [symbol_table.get(name, UNBOUND) for name in names]
+
+
+def store_frame(names, frame, symbol_table):
+    """
+    Write the bound variables of a frame back to a symbol table
+
+    :param names: variable names, indexed by slot
+    :param frame: frame of the variable values
+    :param symbol_table: dict variable name -> value
+    :return: None
+    """
+    for name, value in zip(names, frame):
+        if value is not UNBOUND:
+            symbol_table[name] = value
+
+
+class ResolvedTree:
+    """
+    AST prepared for the tree-walking engine.
+    A ResolvedTree instance is defined by:
+        - tree: AST root node, its variable nodes having a slot
+        - names: variable names, indexed by slot
+    """
+    __slots__ = ('tree', 'names')
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.names = resolve(tree)
@@ -0,0 +1,174 @@
+from unittest import TestCase, skipIf
+from unittest.mock import patch
+import io
+import os
+import tempfile
+
+from apl.lexer import lexer
+from apl.parser import ast
+from apl.parser import parser
+from apl.parser import serialize
+from apl.interpreter import arrays
+from apl.interpreter import errors
+from apl.interpreter import interpreter
+
+
+numpy = arrays.get_numpy() if arrays.has_numpy() else None
+
+
+def run(code, engine):
+    apl_interpreter = interpreter.Interpreter(parser.Parser(lexer.Lexer(code)), engine=engine)
+    result = apl_interpreter.interpret()
+    return result, apl_interpreter.symbol_table
+
+
+@skipIf(numpy is None, 'NumPy is not installed')
+class TestArrays(TestCase):
+
+    def test_parse_vector(self):
+        expr = parser.Parser(lexer.Lexer('1 2 3.5 + 4')).expr()
+
+        self.assertIsInstance(expr.left, ast.Vector)
+        self.assertEqual(str(expr), "ast.binary.operator<ast.vector<1, 2, 3.5>, Token(PLUS, '+'), ast.number<4>>")
+
+    def test_element_wise(self):
+        for engine in interpreter.ENGINES:
+            with self.subTest(engine=engine):
+                result, symbol_table = run('var x = 1 2 3; var y = x * 2 - 10 20 30; var z = y / 4;', engine)
+
+                self.assertTrue(result)
+                self.assertEqual(symbol_table['y'].tolist(), [-8, -16, -24])
+                self.assertEqual(symbol_table['z'].tolist(), [-2.0, -4.0, -6.0])
+                self.assertEqual(str(symbol_table['x'].dtype), 'int64')
+                self.assertEqual(str(symbol_table['z'].dtype), 'float64')
+
+    def test_length_mismatch(self):
+        for engine in interpreter.ENGINES:
+            with self.subTest(engine=engine):
+                apl_interpreter = interpreter.Interpreter(
+                    parser.Parser(lexer.Lexer('var x = 1 2 3 + 1 2;')), engine=engine
+                )
+                with patch('sys.stdout', new_callable=io.StringIO):
+                    self.assertFalse(apl_interpreter.interpret())
+                self.assertIsInstance(apl_interpreter.last_error, ValueError)
+
+    def test_constants_are_read_only(self):
+        result, symbol_table = run('var x = 1 2 3;', interpreter.VM_ENGINE)
+
+        with self.assertRaises(ValueError):
+            symbol_table['x'][0] = 4
+
+    def test_tree_engine_decodes_vectors_once(self):
+        apl_interpreter = interpreter.Interpreter(None)
+        compiled = apl_interpreter.compile(parser.Parser(lexer.Lexer('var x = 1 2 3 * 2;')).parse())
+        with patch.object(arrays, 'make_vector') as make_vector:
+            apl_interpreter.execute(compiled)
+            apl_interpreter.execute(compiled)
+            make_vector.assert_not_called()
+
+        self.assertEqual(apl_interpreter.symbol_table['x'].tolist(), [2, 4, 6])
+
+    def test_serialize(self):
+        tree = parser.Parser(lexer.Lexer('var x = 1 2.5 + 3;')).parse()
+
+        self.assertEqual(str(serialize.loads(serialize.dumps(tree))), str(tree))
+
+    def test_json_default(self):
+        self.assertEqual(arrays.json_default(arrays.make_vector([1, 2])), [1, 2])
+        self.assertEqual(arrays.json_default(numpy.float64(1.5)), 1.5)
+
+
+@skipIf(numpy is None, 'NumPy is not installed')
+class TestReductions(TestCase):
+
+    @staticmethod
+    def fold_right(function, values):
+        operations = {
+            '+': lambda left, right: left + right, '-': lambda left, right: left - right,
+            '*': lambda left, right: left * right, '/': lambda left, right: left / right,
+        }
+        result = values[-1]
+        for value in reversed(values[:-1]):
+            result = operations[function](value, result)
+        return result
+
+    def test_parse(self):
+        expr = parser.Parser(lexer.Lexer('2 * +/ 1 2 - 1')).expr()
+
+        self.assertEqual(
+            str(expr),
+            "ast.binary.operator<ast.number<2>, Token(MULT, '*'), ast.reduce<+, ast.binary.operator<"
+            "ast.vector<1, 2>, Token(MINUS, '-'), ast.number<1>>>>"
+        )
+
+    def test_engines(self):
+        code = 'var x = 1 2 3 4; var s = +/ x * 2; var d = -/ x; var q = // x; var c = -\\ x; var p = *\\ x;'
+        for engine in interpreter.ENGINES:
+            with self.subTest(engine=engine):
+                result, symbol_table = run(code, engine)
+
+                self.assertTrue(result)
+                self.assertEqual(symbol_table['s'], 20)
+                self.assertEqual(symbol_table['d'], -2)
+                self.assertAlmostEqual(symbol_table['q'], 0.375)
+                self.assertEqual(symbol_table['c'].tolist(), [1, -1, 2, -2])
+                self.assertEqual(symbol_table['p'].tolist(), [1, 2, 6, 24])
+
+    def test_chunks(self):
+        values = [3, 5, 2, 7, 4, 9, 1]
+        vector = arrays.make_vector(values)
+        for function in arrays.FUNCTIONS:
+            for chunk_size in (1, 2, 3, 100):
+                with self.subTest(function=function, chunk_size=chunk_size):
+                    self.assertAlmostEqual(
+                        arrays.reduce_vector(function, vector, chunk_size), self.fold_right(function, values)
+                    )
+                    for expected, value in zip(
+                        [self.fold_right(function, values[:i + 1]) for i in range(len(values))],
+                        arrays.scan_vector(function, vector, chunk_size)
+                    ):
+                        self.assertAlmostEqual(value, expected)
+
+    def test_unsigned_vectors(self):
+        vector = numpy.array([1, 2, 3, 250], dtype='uint8')
+
+        self.assertEqual(arrays.reduce_vector('-', vector), -248)
+        self.assertEqual(arrays.scan_vector('-', vector, chunk_size=2).tolist(), [1, -1, 2, -248])
+        self.assertEqual(arrays.scan_vector('+', vector).tolist(), [1, 3, 6, 256])
+        self.assertEqual(arrays.scan_vector('-', vector.astype('uint64')).tolist(), [1.0, -1.0, 2.0, -248.0])
+
+    def test_empty_and_scalar(self):
+        empty = numpy.array([], dtype='int64')
+
+        self.assertEqual(arrays.reduce_vector('+', empty), 0)
+        self.assertEqual(arrays.reduce_vector('*', empty), 1)
+        self.assertEqual(arrays.scan_vector('+', empty).tolist(), [])
+        self.assertEqual(arrays.reduce_vector('-', 5), 5)
+
+    def test_load_vector(self):
+        with tempfile.TemporaryDirectory() as directory:
+            npy_path = os.path.join(directory, 'vector.npy')
+            raw_path = os.path.join(directory, 'vector.bin')
+            numpy.save(npy_path, numpy.arange(10, dtype='int32'))
+            numpy.arange(10, dtype='float32').tofile(raw_path)
+
+            npy_vector = arrays.load_vector(npy_path)
+            raw_vector = arrays.load_vector(raw_path, dtype='float32')
+
+            self.assertIsInstance(npy_vector, numpy.memmap)
+            self.assertEqual(arrays.reduce_vector('+', npy_vector, chunk_size=4), 45)
+            self.assertEqual(arrays.scan_vector('+', raw_vector, chunk_size=4)[-1], 45.0)
+            del npy_vector, raw_vector
+
+    def test_load_matrix(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'matrix.npy')
+            numpy.save(path, numpy.zeros((2, 2)))
+
+            with self.assertRaisesRegex(errors.ProgrammingError, 'is not a vector'):
+                arrays.load_vector(path, mmap=False)
+
+    def test_serialize(self):
+        tree = parser.Parser(lexer.Lexer('var x = +/ 1 2; var y = -\\ x;')).parse()
+
+        self.assertEqual(str(serialize.loads(serialize.dumps(tree))), str(tree))
@@ -0,0 +1,89 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from unittest.mock import patch
+
+from apl.lexer import lexer
+from apl.parser import parser
+from apl.interpreter import incremental
+from apl.interpreter.errors import ProgrammingError
+
+
+def parse(code):
+    return parser.Parser(lexer.Lexer(code)).parse()
+
+
+PROGRAM = parse(
+    'var a = rate * 2;\n'
+    'var b = base + 1;\n'
+    'var c = a + b;\n'
+    'a = a * 10;\n'
+    'var d = b * b;\n'
+    'var e = c - 1;'
+)
+
+
+class TestIncremental(TestCase):
+
+    def load(self, **inputs):
+        apl_interpreter = incremental.IncrementalInterpreter(None)
+        apl_interpreter.symbol_table.update(inputs)
+        self.assertTrue(apl_interpreter.load(PROGRAM))
+        return apl_interpreter
+
+    def test_set_inputs(self):
+        apl_interpreter = self.load(rate=1, base=2)
+        self.assertEqual(apl_interpreter.symbol_table, {'rate': 1, 'base': 2, 'a': 20, 'b': 3, 'c': 5, 'd': 9, 'e': 4})
+        self.assertEqual(apl_interpreter.last_recomputed, [0, 1, 2, 3, 4, 5])
+
+        self.assertTrue(apl_interpreter.set_inputs({'rate': 3}))
+        self.assertEqual(apl_interpreter.last_recomputed, [0, 2, 3, 5])
+        self.assertEqual(apl_interpreter.symbol_table, {'rate': 3, 'base': 2, 'a': 60, 'b': 3, 'c': 9, 'd': 9, 'e': 8})
+
+        # unchanged values stop the propagation
+        self.assertTrue(apl_interpreter.set_inputs({'rate': 3, 'base': 2}))
+        self.assertEqual(apl_interpreter.last_recomputed, [0, 1])
+
+    def test_reassign(self):
+        apl_interpreter = self.load(rate=1, base=2)
+
+        self.assertTrue(apl_interpreter.reassign(parse('var b = base - 1;').instructions[0]))
+        self.assertEqual(apl_interpreter.last_recomputed, [1, 2, 4, 5])
+        self.assertEqual(apl_interpreter.symbol_table['e'], 2)
+        self.assertTrue(apl_interpreter.reassign(parse('a = 1;').instructions[0]))
+        self.assertEqual(apl_interpreter.last_recomputed, [3])
+        self.assertEqual(apl_interpreter.symbol_table['a'], 1)
+        self.assertEqual(apl_interpreter.symbol_table['c'], 3)
+        with self.assertRaises(ProgrammingError):
+            apl_interpreter.reassign(parse('rate = 1;').instructions[0])
+
+    def test_errors(self):
+        with patch('builtins.print'):
+            apl_interpreter = incremental.IncrementalInterpreter(None)
+            apl_interpreter.symbol_table['rate'] = 1
+            self.assertFalse(apl_interpreter.load(PROGRAM))
+        self.assertIsInstance(apl_interpreter.last_error, ProgrammingError)
+        self.assertEqual(apl_interpreter.dirty, {1, 2, 3, 4, 5})
+
+        # instructions left dirty by the error are recomputed by the next update
+        self.assertTrue(apl_interpreter.set_inputs({'base': 2}))
+        self.assertEqual(apl_interpreter.last_recomputed, [1, 2, 3, 4, 5])
+        self.assertEqual(apl_interpreter.symbol_table['e'], 4)
+        self.assertEqual(apl_interpreter.dirty, set())
+
+    def test_parallel(self):
+        apl_interpreter = self.load(rate=1, base=2)
+
+        with ThreadPoolExecutor(2) as executor:
+            self.assertTrue(apl_interpreter.set_inputs({'rate': 2, 'base': 3}, executor))
+        self.assertEqual(sorted(apl_interpreter.last_recomputed), [0, 1, 2, 3, 4, 5])
+        self.assertEqual(apl_interpreter.symbol_table, {'rate': 2, 'base': 3, 'a': 40, 'b': 4, 'c': 8, 'd': 16, 'e': 7})
+
+    def test_parallel_transitive_dependencies(self):
+        apl_interpreter = incremental.IncrementalInterpreter(None)
+        apl_interpreter.symbol_table.update(a=1, d=0)
+        self.assertTrue(apl_interpreter.load(parse('var y = a + 0; var w = y + 0; var z = 1 / (w - d);')))
+
+        # z reads a and d through w: it is evaluated once w is up to date
+        with ThreadPoolExecutor(2) as executor:
+            self.assertTrue(apl_interpreter.set_inputs({'a': 5, 'd': 1}, executor))
+        self.assertEqual(apl_interpreter.symbol_table, {'a': 5, 'd': 1, 'y': 5, 'w': 5, 'z': 0.25})
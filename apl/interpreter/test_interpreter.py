@@ -4,9 +4,11 @@ import logging as log
 
 from apl.tokens.tokens import Token
 from apl.tokens.token_type import *
+from apl.lexer import lexer
 from apl.parser import parser
 from apl.parser import ast
 from apl.interpreter import interpreter
+from apl.interpreter import resolver
 
 
 log.basicConfig(
@@ -153,3 +155,78 @@ class TestInterpreter(TestCase):
         apl_interpreter.interpret()
 
         self.assertDictEqual(apl_interpreter.symbol_table, expected)
+
+    def test_symbol_table_per_instance(self):
+        log.info('Starting test...')
+        next_token_val = Token(EOF, '')
+        ast_result = ast.Program([
+            ast.Assignation(
+                ast.VarInit(Token(IDENTIFIER, 'var_name')),
+                ast.Number(Token(NUMBER, '1'))
+            )
+        ])
+
+        first_interpreter = interpreter.Interpreter(self.get_mock_parser(next_token_val, ast_result))
+        second_interpreter = interpreter.Interpreter(self.get_mock_parser(next_token_val, ast_result))
+        first_interpreter.interpret()
+
+        self.assertDictEqual(first_interpreter.symbol_table, {'var_name': 1})
+        self.assertDictEqual(second_interpreter.symbol_table, {})
+
+    def test_resolved_slots(self):
+        log.info('Starting test...')
+        tree = ast.Program([
+            ast.Assignation(
+                ast.VarInit(Token(IDENTIFIER, 'a')),
+                ast.VarEval(Token(IDENTIFIER, 'b'))
+            ),
+            ast.Assignation(
+                ast.Var(Token(IDENTIFIER, 'b')),
+                ast.VarEval(Token(IDENTIFIER, 'a'))
+            )
+        ])
+        names = resolver.resolve(tree)
+
+        self.assertListEqual(names, ['b', 'a'])
+        self.assertEqual(tree.instructions[1].left_op.slot, 0)
+        self.assertEqual(tree.instructions[1].right_op.slot, 1)
+
+    def test_deep_expressions(self):
+        log.info('Starting test...')
+        depth = 20000
+        code = 'var x = 2; var y = %sx%s; var z = %s;' % ('(1 + ' * depth, ')' * depth, ' - '.join(['1'] * depth))
+        apl_interpreter = interpreter.Interpreter(parser.Parser(lexer.Lexer(code)))
+
+        self.assertTrue(apl_interpreter.interpret())
+        self.assertDictEqual(apl_interpreter.symbol_table, {'x': 2, 'y': depth + 2, 'z': 2 - depth})
+
+    def test_decode_literals(self):
+        log.info('Starting test...')
+        tree = parser.Parser(lexer.Lexer('var y = x * 2 + 0.5 - x / 4;')).parse()
+        apl_interpreter = interpreter.Interpreter(None)
+        compiled = apl_interpreter.compile(tree)
+
+        self.assertEqual([node.constant for node in ast.walk(tree) if isinstance(node, ast.Number)], [2, 0.5, 4])
+        self.assertEqual([node.code for node in ast.walk(tree) if isinstance(node, ast.BinaryOperator)],
+                         [interpreter.SUBTRACT, interpreter.ADD, interpreter.MULTIPLY, interpreter.DIVIDE])
+        for x, y in ((3, 6.5 - 0.75), (1.5, 3.5 - 0.375)):
+            apl_interpreter.symbol_table['x'] = x
+            self.assertTrue(apl_interpreter.execute(compiled))
+            self.assertEqual(apl_interpreter.symbol_table['y'], y)
+
+    def test_run_stream(self):
+        log.info('Starting test...')
+        code = 'var x = 1; var y = x + 2; x = y * 3; z = 1; var w = 5;'
+        for engine in interpreter.ENGINES:
+            apl_interpreter = interpreter.Interpreter(None, engine=engine)
+            apl_interpreter.report_error = MagicMock()
+            executed = []
+
+            def iter_instructions():
+                for instruction in parser.Parser(lexer.Lexer(code)).iter_instructions():
+                    yield instruction
+                    executed.append(dict(apl_interpreter.symbol_table))
+
+            self.assertFalse(apl_interpreter.run_stream(iter_instructions()))
+            self.assertListEqual(executed, [{'x': 1}, {'x': 1, 'y': 3}, {'x': 9, 'y': 3}])
+            apl_interpreter.report_error.assert_called_once()
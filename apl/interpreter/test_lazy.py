@@ -0,0 +1,64 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from apl.lexer import lexer
+from apl.parser import parser
+from apl.interpreter import lazy
+from apl.interpreter.errors import ProgrammingError
+
+
+def run(apl_interpreter, code):
+    return apl_interpreter.execute(apl_interpreter.compile(parser.Parser(lexer.Lexer(code)).parse()))
+
+
+class TestLazy(TestCase):
+
+    def test_forced_on_demand(self):
+        apl_interpreter = lazy.LazyInterpreter(None)
+
+        with patch.object(apl_interpreter, 'evaluate_with_frame', wraps=apl_interpreter.evaluate_with_frame) as spy:
+            self.assertTrue(run(apl_interpreter, 'var a = 2; var b = a * 3; var c = 1 / 0; a = a + b;'))
+            self.assertEqual(spy.call_count, 0)
+            self.assertEqual(apl_interpreter.query('a'), {'a': 8})
+            self.assertEqual(spy.call_count, 3)
+            # memoized values, b being forced by a
+            self.assertEqual(apl_interpreter.query('a', 'b'), {'a': 8, 'b': 6})
+            self.assertEqual(spy.call_count, 3)
+        self.assertIsInstance(apl_interpreter.symbol_table['c'], lazy.Thunk)
+        self.assertEqual(repr(apl_interpreter.symbol_table['c']), '<thunk>')
+
+    def test_errors_at_point_of_use(self):
+        apl_interpreter = lazy.LazyInterpreter(None)
+
+        self.assertTrue(run(apl_interpreter, 'var a = 1 / 0; var b = a + unknown; var c = a + 1;'))
+        with self.assertRaises(ZeroDivisionError):
+            apl_interpreter.query('c')
+        with self.assertRaises(ZeroDivisionError):
+            apl_interpreter.query('b')
+        with self.assertRaises(ProgrammingError):
+            apl_interpreter.query('d')
+        with patch('builtins.print'):
+            self.assertFalse(run(apl_interpreter, 'd = 1;'))
+        self.assertTrue(run(apl_interpreter, 'a = 2; var e = a * 2;'))
+        self.assertEqual(apl_interpreter.query('e'), {'e': 4})
+
+    def test_reclaimed(self):
+        apl_interpreter = lazy.LazyInterpreter(None)
+
+        run(apl_interpreter, 'var a = 1; var b = a + 1;')
+        first = apl_interpreter.symbol_table['a']
+        b = apl_interpreter.symbol_table['b']
+        run(apl_interpreter, 'a = 5;')
+        self.assertEqual(b.captured, ((0, first),))
+        self.assertEqual(apl_interpreter.query('b'), {'b': 2})
+        # forced thunks release the thunks they read
+        self.assertIsNone(b.captured)
+        self.assertIsNone(b.expr)
+        self.assertTrue(first.forced)
+
+    def test_deep_chain(self):
+        apl_interpreter = lazy.LazyInterpreter(None)
+        code = 'var v0 = 1;' + ''.join('var v%d = v%d + 1;' % (index, index - 1) for index in range(1, 20000))
+
+        self.assertTrue(run(apl_interpreter, code))
+        self.assertEqual(apl_interpreter.query('v19999'), {'v19999': 20000})
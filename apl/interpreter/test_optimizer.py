@@ -0,0 +1,87 @@
+from unittest import TestCase
+from unittest.mock import patch
+import io
+
+from apl.lexer import lexer
+from apl.parser import ast
+from apl.parser import parser
+from apl.interpreter import interpreter
+from apl.interpreter import optimizer
+
+
+def parse(code):
+    return parser.Parser(lexer.Lexer(code)).parse()
+
+
+class TestOptimizer(TestCase):
+
+    def optimize(self, code):
+        apl_optimizer = optimizer.Optimizer()
+        return apl_optimizer.optimize(parse(code)), apl_optimizer.stats
+
+    def run_engine(self, code, engine, optimize):
+        apl_interpreter = interpreter.Interpreter(parser.Parser(lexer.Lexer(code)), engine=engine, optimize=optimize)
+        apl_interpreter.symbol_table = {}
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            result = apl_interpreter.interpret()
+        return result, apl_interpreter.symbol_table, stdout.getvalue()
+
+    def test_constant_folding(self):
+        tree, stats = self.optimize('var x = 1; x = (2 * 3) + x * (1 / 2);')
+
+        self.assertEqual(str(tree.instructions[1].right_op),
+                         'ast.binary.operator<ast.number<6>, Token(PLUS, \'+\'), '
+                         'ast.binary.operator<ast.var.eval<x>, Token(MULT, \'*\'), ast.number<0.5>>>')
+        self.assertEqual(stats[optimizer.CONSTANT_FOLDING], 4)
+
+    def test_division_by_zero_not_folded(self):
+        tree, stats = self.optimize('var x = 1 / 0;')
+
+        self.assertIsInstance(tree.instructions[0].right_op, ast.BinaryOperator)
+        self.assertEqual(stats[optimizer.CONSTANT_FOLDING], 0)
+
+    def test_algebraic_simplification(self):
+        tree, stats = self.optimize('var x = 1; x = (0 + x * 1) - 0; x = x * 1.0;')
+
+        self.assertEqual(str(tree.instructions[1].right_op), 'ast.var.eval<x>')
+        self.assertIsInstance(tree.instructions[2].right_op, ast.BinaryOperator)
+        self.assertEqual(stats[optimizer.ALGEBRAIC_SIMPLIFICATION], 6)
+
+    def test_common_subexpression_elimination(self):
+        tree, stats = self.optimize('var x = 1; var y = (x + 2) * (x + 2) - (x + 2);')
+        right_op = tree.instructions[1].right_op
+
+        self.assertIsInstance(right_op.left.left, ast.SharedExpr)
+        self.assertIs(right_op.left.left, right_op.left.right)
+        self.assertIs(right_op.left.left, right_op.right)
+        self.assertEqual(stats[optimizer.COMMON_SUBEXPRESSION_ELIMINATION], 6)
+
+    def test_same_results(self):
+        code = ('var x = 2; var y = (2 * 3) + x * 1 - 0; x = (x + y) * (x + y) / (x + y + 0); '
+                'var z = 3 / 2 + 2 * 1.5; y = y / (x - x);')
+        for engine in interpreter.ENGINES:
+            expected = self.run_engine(code, interpreter.TREE_ENGINE, False)
+            result = self.run_engine(code, engine, True)
+
+            self.assertEqual(result, expected)
+            self.assertEqual(result[2], 'float division by zero\n')
+            for name, value in expected[1].items():
+                self.assertIs(type(result[1][name]), type(value))
+
+    def test_input_tree_unchanged(self):
+        tree = parse('var x = 1; x = (x + 1) * (x + 1) + 2 * 3;')
+        expected = str(tree)
+        optimizer.Optimizer().optimize(tree)
+
+        self.assertEqual(str(tree), expected)
+
+    def test_deep_expressions(self):
+        depth = 20000
+        code = 'var x = 2; var y = %sx * 1%s; var z = %s;' % (
+            '((x + 1) + ' * depth, ')' * depth, ' - '.join(['(x + 0)'] * depth)
+        )
+        for engine in (interpreter.TREE_ENGINE, interpreter.VM_ENGINE):
+            with self.subTest(engine=engine):
+                result = self.run_engine(code, engine, True)
+
+                self.assertEqual(result, (True, {'x': 2, 'y': 3 * depth + 2, 'z': 4 - 2 * depth}, ''))
@@ -0,0 +1,96 @@
+from unittest import TestCase
+from unittest.mock import patch
+import io
+
+from apl.tokens.tokens import Token
+from apl.tokens.token_type import *
+from apl.lexer import lexer
+from apl.parser import ast
+from apl.parser import parser
+from apl.interpreter import errors
+from apl.interpreter import interpreter
+from apl.interpreter import optimizer
+from apl.interpreter import transpiler
+
+
+def parse(code):
+    return parser.Parser(lexer.Lexer(code)).parse()
+
+
+class TestTranspiler(TestCase):
+
+    def run_program(self, compiled_program, symbol_table):
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            result = compiled_program.run(symbol_table)
+        return result, stdout.getvalue()
+
+    def assert_same_as_tree(self, code, symbol_table=None):
+        tree = parse(code)
+        expected_table = dict(symbol_table or {})
+        tree_interpreter = interpreter.Interpreter(None)
+        tree_interpreter.symbol_table = expected_table
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            expected = tree_interpreter.execute(tree_interpreter.compile(tree)), stdout.getvalue()
+
+        result_table = dict(symbol_table or {})
+        result = self.run_program(transpiler.compile_tree(tree), result_table)
+
+        self.assertEqual(result, expected)
+        self.assertEqual(result_table, expected_table)
+        for var_name, value in expected_table.items():
+            self.assertIs(type(result_table[var_name]), type(value))
+        return result, result_table
+
+    def test_program(self):
+        (result, _), symbol_table = self.assert_same_as_tree(
+            'var test = 10 - 5.67 * (3 / 2); var n = 7 * 2; test = (test + n) / 4 - 1; var b = 1.0 + 2;'
+        )
+
+        self.assertTrue(result)
+        self.assertIs(type(symbol_table['n']), int)
+
+    def test_errors(self):
+        (_, output), _ = self.assert_same_as_tree('var a = 1; b = a + 1;')
+        self.assertEqual(output, 'Can\'t assign value to undeclared \'b\' variable\n')
+
+        (_, output), _ = self.assert_same_as_tree('var a = 1; b = x + 1;')
+        self.assertEqual(output, 'Variable x doesn\'t exist\n')
+
+        (_, output), _ = self.assert_same_as_tree('var a = 1; a = a / (a - 1);')
+        self.assertEqual(output, 'division by zero\n')
+
+    def test_run_many_times(self):
+        compiled_program = transpiler.compile_tree(parse('x = x * 2 + 1;'))
+        symbol_table = {'x': 0}
+        for _ in range(10):
+            self.run_program(compiled_program, symbol_table)
+
+        self.assertEqual(symbol_table, {'x': 1023})
+
+    def test_shared_expr(self):
+        tree = optimizer.Optimizer().optimize(parse('var x = 3; var y = (x + 1) * (x + 1) - (x + 1);'))
+        symbol_table = {}
+        self.run_program(transpiler.compile_tree(tree), symbol_table)
+
+        self.assertEqual(symbol_table, {'x': 3, 'y': 12})
+
+    def test_expression_roots(self):
+        symbol_table = {'a': 2}
+        self.assertEqual(transpiler.compile_tree(parser.Parser(lexer.Lexer('a * 3')).expr()).run(symbol_table), 6)
+        self.assertEqual(transpiler.compile_tree(ast.Var(Token(IDENTIFIER, 'a'))).run(symbol_table), 'a')
+        with self.assertRaises(errors.ProgrammingError):
+            transpiler.compile_tree(ast.VarEval(Token(IDENTIFIER, 'b'))).run(symbol_table)
+
+    def test_too_deep_expression(self):
+        tree = parse('var x = %s;' % ' + '.join(['1'] * 20000))
+
+        with self.assertRaisesRegex(errors.ProgrammingError, 'too deep for the python engine'):
+            transpiler.compile_tree(tree)
+
+    def test_interpreter_engine(self):
+        apl_interpreter = interpreter.Interpreter(parser.Parser(lexer.Lexer('var x = 2; x = x / 4;')),
+                                                  engine=interpreter.PYTHON_ENGINE)
+        apl_interpreter.symbol_table = {}
+
+        self.assertTrue(apl_interpreter.interpret())
+        self.assertEqual(apl_interpreter.symbol_table, {'x': 0.5})
@@ -0,0 +1,72 @@
+from unittest import TestCase
+from unittest.mock import patch
+import io
+
+from apl.lexer import lexer
+from apl.parser import parser
+from apl.interpreter import bytecode
+from apl.interpreter import interpreter
+from apl.interpreter import vm
+
+
+class TestVirtualMachine(TestCase):
+
+    def run_engine(self, code, engine, symbol_table=None):
+        apl_interpreter = interpreter.Interpreter(parser.Parser(lexer.Lexer(code)), engine=engine)
+        apl_interpreter.symbol_table = dict(symbol_table or {})
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            result = apl_interpreter.interpret()
+        return result, apl_interpreter.symbol_table, stdout.getvalue()
+
+    def assert_same_as_tree(self, code, symbol_table=None):
+        expected = self.run_engine(code, interpreter.TREE_ENGINE, symbol_table)
+        result = self.run_engine(code, interpreter.VM_ENGINE, symbol_table)
+
+        self.assertEqual(result, expected)
+        for name, value in expected[1].items():
+            self.assertIs(type(result[1][name]), type(value))
+        return result
+
+    def test_program(self):
+        result = self.assert_same_as_tree(
+            'var test = 10 - 5.67 * (3 / 2); var n = 7 * 2; test = (test + n) / 4 - 1; var b = 1.0 + 2;'
+        )
+
+        self.assertTrue(result[0])
+
+    def test_undeclared_variable(self):
+        result = self.assert_same_as_tree('var a = 1; b = a + 1; var c = 3;')
+
+        self.assertEqual(result[1], {'a': 1})
+        self.assertEqual(result[2], 'Can\'t assign value to undeclared \'b\' variable\n')
+
+    def test_unknown_variable(self):
+        result = self.assert_same_as_tree('var a = 1; var c = a + x;')
+
+        self.assertEqual(result[2], 'Variable x doesn\'t exist\n')
+
+    def test_division_by_zero(self):
+        result = self.assert_same_as_tree('var a = 1; a = a / 0;', {'z': 3})
+
+        self.assertFalse(result[0])
+        self.assertEqual(result[1], {'z': 3, 'a': 1})
+
+    def test_expression(self):
+        code_object = bytecode.compile_tree(parser.Parser(lexer.Lexer('x + 2 * 3;')).expr())
+
+        self.assertEqual(vm.VirtualMachine().run(code_object, {'x': 1}), 7)
+        self.assertListEqual(list(code_object.ops), [
+            bytecode.LOAD_VAR, bytecode.LOAD_CONST, bytecode.LOAD_CONST, bytecode.BINARY_MUL,
+            bytecode.BINARY_ADD, bytecode.RETURN_VALUE
+        ])
+
+    def test_deep_expressions(self):
+        depth = 20000
+        code = 'var x = 2; var y = %sx%s; var z = %s;' % ('(1 + ' * depth, ')' * depth, ' - '.join(['x'] * depth))
+        result = self.run_engine(code, interpreter.VM_ENGINE)
+
+        self.assertEqual(result, (True, {'x': 2, 'y': depth + 2, 'z': 4 - 2 * depth}, ''))
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            interpreter.Interpreter(None, engine='unknown')
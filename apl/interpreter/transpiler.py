@@ -0,0 +1,290 @@
+"""
+Python transpiler
+
+Lower an AST to a Python `ast.Module` defining a single function, compile it with `compile()` and wrap
+the resulting function in a CompiledProgram which can be run many times against a symbol table.
+Variables are read from and written to the frame of the program (see resolver); values and errors are
+those of the Interpreter tree walk.
+
+Expressions are lowered without recursion, but Python ASTs are compiled recursively by CPython: an
+expression nested more deeply than the Python compiler allows (about a thousand levels, depending on the
+Python version and its recursion limit) can't be transpiled and raises a ProgrammingError.
+
+A variable only needs to be checked when it is not already known to be bound: once a variable has been
+assigned or successfully read, it stays bound for the rest of the program, since any error stops it.
+"""
+import ast as py_ast
+
+from apl.parser import ast
+from apl.tokens import token_type
+from .bytecode import decode_number
+from .arrays import make_vector, reduce_vector, scan_vector
+from .errors import ProgrammingError, UNDECLARED_VARIABLE, UNKNOWN_VARIABLE
+from .resolver import resolve, load_frame, store_frame, UNBOUND
+
+
+FUNCTION_NAME = 'apl_program'
+FRAME = 'frame'
+SHARED_NAME = 'shared_%d'
+FILENAME = '<apl>'
+TOO_DEEP = 'Expression too deep for the python engine, use the tree or vm engine'
+
+BINARY_OPERATORS = {
+    token_type.PLUS: py_ast.Add,
+    token_type.MINUS: py_ast.Sub,
+    token_type.MULT: py_ast.Mult,
+    token_type.DIV: py_ast.Div,
+}
+
+
+def name(identifier, ctx=py_ast.Load):
+    return py_ast.Name(id=identifier, ctx=ctx())
+
+
+def slot(index, ctx=py_ast.Load):
+    """
+    :return: Python AST of `frame[index]`
+    """
+    return py_ast.Subscript(value=name(FRAME), slice=py_ast.Constant(value=index), ctx=ctx())
+
+
+def is_unbound(index):
+    """
+    :return: Python AST of `frame[index] is UNBOUND`
+    """
+    return py_ast.Compare(left=slot(index), ops=[py_ast.Is()], comparators=[name('UNBOUND')])
+
+
+def raise_error(message, var_name):
+    """
+    :return: Python AST of `raise ProgrammingError(message % var_name)`
+    """
+    return py_ast.Raise(exc=error(message, var_name))
+
+
+def error(message, var_name):
+    """
+    :return: Python AST of `ProgrammingError(message % var_name)`
+    """
+    return py_ast.Call(func=name('ProgrammingError'), args=[py_ast.Constant(value=message % var_name)], keywords=[])
+
+
+def check_declared(node):
+    """
+    :return: Python AST of `if frame[node.slot] is UNBOUND: raise ProgrammingError(...)`
+    """
+    return py_ast.If(test=is_unbound(node.slot), body=[raise_error(UNDECLARED_VARIABLE, node.var_name)], orelse=[])
+
+
+class PythonCodeGenerator(ast.ASTNodeVisitor):
+    """
+    Generate the Python AST statements (for instructions) or expression (for expressions) of AST nodes
+    """
+
+    def __init__(self):
+        self.shared_names = {}
+        self.bound_slots = set()
+
+    def visit_binary_operator(self, node):
+        return self.generate_expr(node)
+
+    def visit_number(self, node):
+        return py_ast.Constant(value=decode_number(node.value))
+
+    def visit_vector(self, node):
+        return py_ast.Call(
+            func=name('make_vector'),
+            args=[py_ast.Constant(value=tuple(decode_number(value) for value in node.values))],
+            keywords=[]
+        )
+
+    def visit_array_operator(self, node):
+        return self.generate_expr(node)
+
+    def visit_var_eval(self, node):
+        if node.slot in self.bound_slots:
+            return slot(node.slot)
+        # frame[slot] if not frame[slot] is UNBOUND else raise_exception(ProgrammingError(...))
+        self.bound_slots.add(node.slot)
+        return py_ast.IfExp(
+            test=py_ast.UnaryOp(op=py_ast.Not(), operand=is_unbound(node.slot)),
+            body=slot(node.slot),
+            orelse=py_ast.Call(
+                func=name('raise_exception'),
+                args=[error(UNKNOWN_VARIABLE, node.var_name)],
+                keywords=[]
+            )
+        )
+
+    def visit_shared_expr(self, node):
+        return self.generate_expr(node)
+
+    def generate_expr(self, expr):
+        """
+        Generate the Python expression of an expression in evaluation order, with an explicit stack
+        instead of recursively. The other nodes are visited.
+
+        :param expr: expression AST node
+        :return: Python AST expression
+        """
+        results = []
+        stack = [(expr, False)]
+        while stack:
+            node, operands_done = stack.pop()
+            if isinstance(node, ast.BinaryOperator):
+                if not operands_done:
+                    stack.extend(((node, True), (node.right, False), (node.left, False)))
+                    continue
+                right = results.pop()
+                value = py_ast.BinOp(left=results.pop(), op=BINARY_OPERATORS[node.operator.typename](), right=right)
+            elif isinstance(node, ast.ArrayOperator):
+                if not operands_done:
+                    stack.extend(((node, True), (node.expr, False)))
+                    continue
+                value = py_ast.Call(
+                    func=name('reduce_vector' if isinstance(node, ast.Reduce) else 'scan_vector'),
+                    args=[py_ast.Constant(value=node.function), results.pop()],
+                    keywords=[]
+                )
+            elif isinstance(node, ast.SharedExpr):
+                # the first occurrence is the first one evaluated, later ones reuse its value
+                if operands_done:
+                    value = py_ast.NamedExpr(target=name(self.shared_names[node], py_ast.Store), value=results.pop())
+                elif node in self.shared_names:
+                    value = name(self.shared_names[node])
+                else:
+                    self.shared_names[node] = SHARED_NAME % len(self.shared_names)
+                    stack.extend(((node, True), (node.expr, False)))
+                    continue
+            else:
+                value = self.visit(node)
+            results.append(value)
+        return results.pop()
+
+    def visit_assignation(self, node):
+        self.shared_names.clear()
+        left_op = node.left_op
+        value = self.generate_expr(node.right_op)
+        if isinstance(left_op, ast.VarInit) or left_op.slot in self.bound_slots:
+            self.bound_slots.add(left_op.slot)
+            return [py_ast.Assign(targets=[slot(left_op.slot, py_ast.Store)], value=value)]
+        # the right operand is evaluated before the variable declaration is checked
+        self.bound_slots.add(left_op.slot)
+        return [
+            py_ast.Assign(targets=[name('value', py_ast.Store)], value=value),
+            check_declared(left_op),
+            py_ast.Assign(targets=[slot(left_op.slot, py_ast.Store)], value=name('value')),
+        ]
+
+    def visit_program(self, node):
+        statements = []
+        for instr in node.instructions:
+            statements.extend(self.visit(instr))
+        return statements
+
+    def generate(self, tree):
+        """
+        Generate the Python function body of the given AST
+
+        :param tree: AST root node
+        :return: list of Python AST statements
+        """
+        if isinstance(tree, (ast.Program, ast.Assignation)):
+            return self.visit(tree)
+        if isinstance(tree, ast.VarInit):
+            return [py_ast.Return(value=py_ast.Constant(value=tree.var_name))]
+        if isinstance(tree, ast.Var) and not isinstance(tree, ast.VarEval):
+            return [check_declared(tree), py_ast.Return(value=py_ast.Constant(value=tree.var_name))]
+        return [py_ast.Return(value=self.generate_expr(tree))]
+
+
+def build_module(tree):
+    """
+    Build the Python module defining the function running the given AST, its variables being resolved:
+
+    def apl_program(frame):
+        <instructions>
+
+    :param tree: AST root node
+    :return: Python ast.Module
+    """
+    function = py_ast.FunctionDef(
+        name=FUNCTION_NAME,
+        args=py_ast.arguments(
+            posonlyargs=[], args=[py_ast.arg(arg=FRAME)], kwonlyargs=[], kw_defaults=[], defaults=[]
+        ),
+        body=PythonCodeGenerator().generate(tree) or [py_ast.Pass()],
+        decorator_list=[]
+    )
+    module = py_ast.Module(body=[function], type_ignores=[])
+    return py_ast.fix_missing_locations(module)
+
+
+def raise_exception(exception):
+    raise exception
+
+
+class CompiledProgram:
+    """
+    Python function compiled from an AST, reusable without re-lexing nor re-parsing.
+    A CompiledProgram instance is defined by:
+        - code: Python code object of the module defining the function
+        - function: Python function taking the program frame as argument
+        - names: variable names, indexed by slot
+        - is_program: True if compiled from an ast.Program
+    """
+
+    def __init__(self, code, names, is_program):
+        self.code = code
+        self.names = names
+        self.is_program = is_program
+        namespace = {
+            'ProgrammingError': ProgrammingError, 'UNBOUND': UNBOUND, 'raise_exception': raise_exception,
+            'make_vector': make_vector, 'reduce_vector': reduce_vector, 'scan_vector': scan_vector
+        }
+        exec(code, namespace)
+        self.function = namespace[FUNCTION_NAME]
+
+    def run(self, symbol_table):
+        """
+        Run the program like the Interpreter would visit the AST it was compiled from
+
+        :param symbol_table: dict variable name -> value
+        :return: True/False for a program depending on its success, the expression value otherwise
+        """
+        if not self.is_program:
+            return self.execute(symbol_table)
+        try:
+            self.execute(symbol_table)
+        except Exception as ex:
+            print(ex)
+            return False
+        return True
+
+    def execute(self, symbol_table):
+        """
+        Execute the program
+
+        :param symbol_table: dict variable name -> value
+        :return: the expression value, None for a program
+        :raise: ProgrammingError on undeclared or unknown variable
+        """
+        frame = load_frame(self.names, symbol_table)
+        try:
+            return self.function(frame)
+        finally:
+            store_frame(self.names, frame, symbol_table)
+
+
+def compile_tree(tree):
+    """
+    :param tree: AST root node
+    :return: CompiledProgram running 'tree'
+    :raise: ProgrammingError if 'tree' holds expressions too deep for the Python compiler
+    """
+    names = resolve(tree)
+    try:
+        code = compile(build_module(tree), FILENAME, 'exec')
+    except RecursionError:
+        raise ProgrammingError(TOO_DEEP) from None
+    return CompiledProgram(code, names, isinstance(tree, ast.Program))
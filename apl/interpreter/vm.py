@@ -0,0 +1,95 @@
+"""
+Stack-based virtual machine running apl.interpreter.bytecode CodeObjects
+"""
+from .bytecode import (
+    LOAD_CONST, LOAD_VAR, STORE_VAR, DECLARE_VAR, CHECK_DECLARED,
+    BINARY_ADD, BINARY_SUB, BINARY_MUL, BINARY_DIV, RETURN_VALUE, STORE_TEMP, LOAD_TEMP, REDUCE, SCAN
+)
+from .arrays import FUNCTIONS, reduce_vector, scan_vector
+from .errors import ProgrammingError, UNDECLARED_VARIABLE, UNKNOWN_VARIABLE
+from .resolver import UNBOUND, load_frame, store_frame
+
+
+class VirtualMachine:
+    """
+    Run CodeObjects against a symbol table.
+    Variables used by the code are loaded in a frame, indexed by slot, before running it and the
+    frame is written back to the symbol table afterwards, even if an error occurred.
+    """
+
+    def run(self, code_object, symbol_table):
+        """
+        Run the given code like the Interpreter would visit the AST it was compiled from
+
+        :param code_object: CodeObject to run
+        :param symbol_table: dict variable name -> value
+        :return: True/False for a program depending on its success, the expression value otherwise
+        """
+        if not code_object.is_program:
+            return self.execute(code_object, symbol_table)
+        try:
+            self.execute(code_object, symbol_table)
+        except Exception as ex:
+            print(ex)
+            return False
+        return True
+
+    def execute(self, code_object, symbol_table):
+        """
+        Execute the given code
+
+        :param code_object: CodeObject to execute
+        :param symbol_table: dict variable name -> value
+        :return: value on top of the stack for RETURN_VALUE, None otherwise
+        :raise: ProgrammingError on undeclared or unknown variable
+        """
+        names = code_object.names
+        constants = code_object.constants
+        frame = load_frame(names, symbol_table)
+        temps = [None] * code_object.temp_count
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        try:
+            for op, arg in zip(code_object.ops, code_object.args):
+                if op == LOAD_CONST:
+                    push(constants[arg])
+                elif op == LOAD_VAR:
+                    value = frame[arg]
+                    if value is UNBOUND:
+                        raise ProgrammingError(UNKNOWN_VARIABLE % names[arg])
+                    push(value)
+                elif op == BINARY_ADD:
+                    right = pop()
+                    stack[-1] = stack[-1] + right
+                elif op == BINARY_MUL:
+                    right = pop()
+                    stack[-1] = stack[-1] * right
+                elif op == BINARY_SUB:
+                    right = pop()
+                    stack[-1] = stack[-1] - right
+                elif op == BINARY_DIV:
+                    right = pop()
+                    stack[-1] = stack[-1] / right
+                elif op == STORE_VAR:
+                    if frame[arg] is UNBOUND:
+                        raise ProgrammingError(UNDECLARED_VARIABLE % names[arg])
+                    frame[arg] = pop()
+                elif op == DECLARE_VAR:
+                    frame[arg] = pop()
+                elif op == CHECK_DECLARED:
+                    if frame[arg] is UNBOUND:
+                        raise ProgrammingError(UNDECLARED_VARIABLE % names[arg])
+                elif op == STORE_TEMP:
+                    temps[arg] = stack[-1]
+                elif op == LOAD_TEMP:
+                    push(temps[arg])
+                elif op == REDUCE:
+                    stack[-1] = reduce_vector(FUNCTIONS[arg], stack[-1])
+                elif op == SCAN:
+                    stack[-1] = scan_vector(FUNCTIONS[arg], stack[-1])
+                elif op == RETURN_VALUE:
+                    return pop()
+        finally:
+            store_frame(names, frame, symbol_table)
+        return None
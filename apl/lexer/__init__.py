@@ -1 +1,2 @@
 from . import lexer
+from . import stream
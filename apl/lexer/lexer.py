@@ -7,72 +7,71 @@ from apl.tokens import token_type
 from apl.tokens import regex_type
 from apl.tokens import tokens
 from apl.tokens.tokens import Token
+from apl.tokens.buffer import TokenBuffer, SHARED_TOKENS, EOF_TOKEN
 
 
-def is_skip_char(char, input_str, current):
+def build_master_regex(token_regex):
     """
-    Check if the given char is at the given current position in the given input_str
-
-    :param char: character to skip
-    :param input_str: input string to check
-    :param current: input string index to check
-    :return: tuple (char_to_eat, None)
-    """
-    return 1 if input_str[current] == char else 0, None
+    Build a single compiled alternation matching every token of 'token_regex'
 
+    Each entry becomes a named group so the matched token typename is given by `match.lastgroup`.
+    Entries are tried in 'token_regex' order, like the former per-token matching functions.
 
-def is_single_char_token(typename, value, input_str, current):
+    :param token_regex: list of (typename, match_type, regex) tuples
+    :return: compiled regex
     """
-    Check if 'value' is located at 'current' position in 'input_str'
+    alternatives = []
+    for typename, match_type, regex in token_regex:
+        if match_type == regex_type.PATTERN:
+            alternatives.append('(?P<%s>%s)' % (typename, regex))
+        else:
+            alternatives.append('(?P<%s>%s)' % (typename, re.escape(regex)))
+    return re.compile('|'.join(alternatives))
 
-    :param typename: Token type generate
-    :param value: Value to check
-    :param input_str: input string checked
-    :param current: index in input_str
-    :return: (1, Token(typename, value)) if input_str[current] == value
-             (0, None) otherwise
+
+def build_fallback_regex(token_regex):
     """
-    if value == input_str[current]:
-        return 1, Token(typename, value)
-    else:
-        return 0, None
+    Build for each token typename the alternation of the entries following it in 'token_regex'
 
+    A PATTERN entry may match an empty string (e.g. IDENTIFIER), which is not a token: matching then
+    resumes with the next entries, as the former per-token matching functions did.
 
-def is_pattern_token(typename, pattern, input_str, current):
+    :param token_regex: list of (typename, match_type, regex) tuples
+    :return: dict typename -> compiled regex (None for the last entry)
     """
-    Check if 'pattern' is found at 'current' in 'input_str' and create Token of type 'typename'
+    fallback = {}
+    for position, (typename, _, _) in enumerate(token_regex):
+        remaining = token_regex[position + 1:]
+        fallback[typename] = build_master_regex(remaining) if remaining else None
+    return fallback
 
-    :param typename: token typename
-    :param pattern: regex pattern to match
-    :param input_str: input string to check
-    :param current: index to check regex
-    :return: (char_to_eat, Token(typename, pattern matched) if the given pattern is found
-             (0, None)
-    """
-    sub_str = input_str[current:]
-    match = re.match(pattern, sub_str)
-    if match:
-        val = match.group()
-        return len(val), Token(typename, val)
-    else:
-        return 0, None
 
+MASTER_REGEX = build_master_regex(tokens.TOKEN_REGEX)
+FALLBACK_REGEX = build_fallback_regex(tokens.TOKEN_REGEX)
+SKIP_TYPES = frozenset(typename for typename, match_type, _ in tokens.TOKEN_REGEX
+                       if match_type == regex_type.SKIP)
+SKIP_KIND = -1
+MATCH_KIND = {typename: SKIP_KIND if typename in SKIP_TYPES else token_type.KIND_CODE[typename]
+              for typename, _, _ in tokens.TOKEN_REGEX}
 
-def get_matching_func_list():
+
+def match_token(input_str, current):
     """
-    Build token detection function list based on apl.tokens module
+    Find the token located at 'current' position in 'input_str'
 
-    :return: List of token matching lambda functions
+    :param input_str: input string to check
+    :param current: index in input_str
+    :return: (typename, end index) of the matched token
+             (None, current) if no token is matching
     """
-    func_list = []
-    for typename, match_type, regex in tokens.TOKEN_REGEX:
-        if match_type == regex_type.SKIP:
-            func_list.append(lambda s, c, r=regex: is_skip_char(r, s, c))
-        elif match_type == regex_type.SINGLE_CHAR:
-            func_list.append(lambda s, c, r=regex, t=typename: is_single_char_token(t, r, s, c))
-        elif match_type == regex_type.PATTERN:
-            func_list.append(lambda s, c, r=regex, t=typename: is_pattern_token(t, r, s, c))
-    return func_list
+    match = MASTER_REGEX.match(input_str, current)
+    while match is not None:
+        end = match.end()
+        if end > current:
+            return match.lastgroup, end
+        regex = FALLBACK_REGEX[match.lastgroup]
+        match = regex.match(input_str, current) if regex is not None else None
+    return None, current
 
 
 class TokenMatchingError(Exception):
@@ -86,7 +85,6 @@ class Lexer:
 
     text = str()
     index = int()
-    matching_func_list = []
 
     def __init__(self, text):
         """
@@ -96,7 +94,6 @@ class Lexer:
         """
         self.text = text
         self.index = 0
-        self.matching_func_list = get_matching_func_list()
 
     def error(self):
         """
@@ -110,17 +107,22 @@ class Lexer:
         """
         Get next token from input string
 
-        :return: Next Token from string
+        :return: Next Token from string, shared by the tokens of the same kind when its value is known
+                 from its kind
         """
-        if self.index == len(self.text):
-            return Token(token_type.EOF, '')
-        for f in self.matching_func_list:
-            consumed, token = f(self.text, self.index)
-            if consumed > 0:
-                self.index += consumed
-                if token:
-                    return token
-        self.error()
+        text = self.text
+        length = len(text)
+        while self.index < length:
+            typename, end = match_token(text, self.index)
+            if typename is None:
+                self.error()
+            start = self.index
+            self.index = end
+            kind = MATCH_KIND[typename]
+            if kind != SKIP_KIND:
+                token = SHARED_TOKENS[kind]
+                return token if token is not None else Token(typename, text[start:end])
+        return EOF_TOKEN
 
     @staticmethod
     def tokenize(input_str):
@@ -130,33 +132,49 @@ class Lexer:
         :param input_str: string to tokenize
         :return: list of Token matching with input string
         """
-        func_list = get_matching_func_list()
         token_list = []
-
-        index = 0
-        end = False
-        error = False
         error_messages = []
 
-        while not (end or error):
-            match = False
-            for f in func_list:
-                consumed, token = f(input_str, index)
-                if consumed > 0:
-                    match = True
-                    index += consumed
-                    if token is not None:
-                        token_list.append(token)
-                    break
-            error = not match
-            end = index == len(input_str)
-        if error:
-            error_messages.append("No matching token @ index:" + str(index))
-            error_messages.append("\t" + input_str)
-            error_messages.append("\t" + index * " " + "^")
-        else:
-            token_list.append(tokens.Token(token_type.EOF, ''))
+        index = 0
+        length = len(input_str)
+        while index < length:
+            typename, end = match_token(input_str, index)
+            if typename is None:
+                error_messages.append("No matching token @ index:" + str(index))
+                error_messages.append("\t" + input_str)
+                error_messages.append("\t" + index * " " + "^")
+                return token_list, error_messages
+            if typename not in SKIP_TYPES:
+                token_list.append(Token(typename, input_str[index:end]))
+            index = end
+        token_list.append(Token(token_type.EOF, ''))
         return token_list, error_messages
 
+    @staticmethod
+    def tokenize_buffer(input_str):
+        """
+        Convert input string to a compact TokenBuffer
 
+        :param input_str: string to tokenize
+        :return: TokenBuffer matching with input string, ended by an EOF token
+        :raise: TokenMatchingError if no token is matching at some index
+        """
+        token_buffer = TokenBuffer(input_str)
+        append_kind = token_buffer.kinds.append
+        append_start = token_buffer.starts.append
+        append_end = token_buffer.ends.append
 
+        index = 0
+        length = len(input_str)
+        while index < length:
+            typename, end = match_token(input_str, index)
+            if typename is None:
+                raise TokenMatchingError('No matching token at index %s' % index)
+            kind = MATCH_KIND[typename]
+            if kind != SKIP_KIND:
+                append_kind(kind)
+                append_start(index)
+                append_end(end)
+            index = end
+        token_buffer.append(token_type.KIND_CODE[token_type.EOF], length, length)
+        return token_buffer
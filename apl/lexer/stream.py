@@ -0,0 +1,223 @@
+"""
+Streaming lexer definition
+
+Tokenize a program read by chunks from a file object, a memory-mapped file or a bytes-like buffer,
+keeping only the chunks read since the last point where the text can be split in memory, up to
+`max_buffer_size` characters.
+"""
+import codecs
+import mmap
+
+from apl.tokens import token_type
+from apl.tokens.tokens import Token
+from .lexer import match_token, SKIP_TYPES, TokenMatchingError
+
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+DEFAULT_MAX_BUFFER_SIZE = 16 * 1024 * 1024
+
+LINE_BREAK = '\n'
+TERMINATOR = ';'
+STRING_DELIMITER = '"'
+
+
+def iter_text_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE, encoding='utf-8'):
+    """
+    Read the given source by chunks of text
+
+    :param source: str, bytes, bytearray, memoryview, mmap.mmap or file object (text or binary)
+    :param chunk_size: maximum number of characters (or bytes) read at once
+    :param encoding: encoding used to decode binary sources
+    :return: generator of str chunks
+    """
+    if isinstance(source, str):
+        for start in range(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+        return
+
+    decoder = codecs.getincrementaldecoder(encoding)()
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        view = memoryview(source)
+        for start in range(0, len(view), chunk_size):
+            yield decoder.decode(view[start:start + chunk_size])
+    else:
+        chunk = source.read(chunk_size)
+        while chunk:
+            yield chunk if isinstance(chunk, str) else decoder.decode(chunk)
+            chunk = source.read(chunk_size)
+    yield decoder.decode(b'', final=True)
+
+
+def find_safe_limit(text, quoted=False):
+    """
+    Find the index up to which 'text' can be tokenized whatever the text following it
+
+    No token can contain a line break, and only a STRING token can contain a terminator.
+
+    :param text: text following the previous safe limit, or the part of it following 'quoted'
+    :param quoted: a string delimiter precedes 'text' since the previous safe limit
+    :return: index following the last line break, or the last terminator when no string
+             delimiter precedes it, 0 otherwise
+    """
+    index = text.rfind(LINE_BREAK)
+    if index >= 0:
+        return index + 1
+    if quoted:
+        return 0
+    index = text.rfind(TERMINATOR)
+    if index >= 0 and text.find(STRING_DELIMITER, 0, index) < 0:
+        return index + 1
+    return 0
+
+
+class StreamLexer:
+    """
+    Lexer tokenizing a program read by chunks, with bounded memory.
+
+    Tokens are generated with their line and column, and the instance can be given to a Parser
+    like a Lexer.
+    """
+
+    def __init__(self, source, chunk_size=DEFAULT_CHUNK_SIZE, encoding='utf-8', index=0, line=1, line_start=0,
+                 max_buffer_size=DEFAULT_MAX_BUFFER_SIZE):
+        """
+        Construct a streaming lexer for the given source
+
+        When the source is a part of a larger text, its position in that text can be given so that
+        token and error positions are those of the larger text.
+
+        :param source: str, bytes, bytearray, memoryview, mmap.mmap or file object (text or binary)
+        :param chunk_size: maximum number of characters (or bytes) read at once
+        :param encoding: encoding used to decode binary sources
+        :param index: index of the source start
+        :param line: line number of the source start
+        :param line_start: index of the start of that line
+        :param max_buffer_size: maximum number of characters buffered before the text can be split,
+                                None for no limit
+        """
+        self.source = source
+        self.chunk_size = chunk_size
+        self.encoding = encoding
+        self.index = index
+        self.line = line
+        self.line_start = line_start
+        self.max_buffer_size = max_buffer_size
+        self.token_stream = None
+
+    @classmethod
+    def from_path(cls, path, use_mmap=True, **kwargs):
+        """
+        Construct a streaming lexer reading the file located at 'path'
+
+        The file is memory-mapped when 'use_mmap' is set, read by chunks otherwise.
+        The file is closed once the token stream is exhausted.
+
+        :param path: file path
+        :param use_mmap: memory-map the file instead of reading it
+        :return: StreamLexer instance
+        """
+        lexer = cls(None, **kwargs)
+        lexer.token_stream = lexer.tokens_from_path(path, use_mmap)
+        return lexer
+
+    def tokens_from_path(self, path, use_mmap):
+        """
+        Tokenize the file located at 'path'
+
+        :param path: file path
+        :param use_mmap: memory-map the file instead of reading it
+        :return: generator of Token, ended by an EOF Token
+        """
+        with open(path, 'rb') as file:
+            if use_mmap and file.seek(0, 2) > 0:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    self.source = mapped
+                    yield from self.tokens()
+            else:
+                file.seek(0)
+                self.source = file
+                yield from self.tokens()
+
+    def error(self):
+        """
+        Raise token matching error
+
+        :return: None
+        """
+        raise TokenMatchingError('No matching token at index %s (line %s, column %s)' % (
+            self.index, self.line, self.index - self.line_start + 1
+        ))
+
+    def scan(self, buffer, limit):
+        """
+        Tokenize 'buffer' up to 'limit'
+
+        :param buffer: buffered text, starting at self.index in the source
+        :param limit: index in buffer where the tokenization stops
+        :return: generator of Token
+        """
+        offset = self.index
+        position = 0
+        while position < limit:
+            typename, end = match_token(buffer, position)
+            if typename is None:
+                self.index = offset + position
+                self.error()
+            if typename == token_type.NEWLINE:
+                self.line += 1
+                self.line_start = offset + end
+            elif typename not in SKIP_TYPES:
+                yield Token(typename, buffer[position:end], self.line, offset + position - self.line_start + 1)
+            position = end
+        self.index = offset + position
+
+    def tokens(self):
+        """
+        Tokenize the whole source
+
+        :return: generator of Token, ended by an EOF Token
+        :raise: TokenMatchingError when more than `max_buffer_size` characters follow a safe limit
+        """
+        # chunks read since the last safe limit, each of them being searched once
+        pending = []
+        pending_size = 0
+        quoted = False
+        for chunk in iter_text_chunks(self.source, self.chunk_size, self.encoding):
+            limit = find_safe_limit(chunk, quoted)
+            if not limit:
+                pending.append(chunk)
+                pending_size += len(chunk)
+                quoted = quoted or STRING_DELIMITER in chunk
+                if self.max_buffer_size is not None and pending_size > self.max_buffer_size:
+                    raise TokenMatchingError(
+                        'No line break or terminator outside of a string within %s characters at index %s '
+                        '(line %s, column %s)' % (self.max_buffer_size, self.index, self.line,
+                                                  self.index - self.line_start + 1)
+                    )
+                continue
+            pending.append(chunk[:limit])
+            buffer = ''.join(pending)
+            yield from self.scan(buffer, len(buffer))
+            tail = chunk[limit:]
+            pending = [tail]
+            pending_size = len(tail)
+            quoted = STRING_DELIMITER in tail
+        buffer = ''.join(pending)
+        yield from self.scan(buffer, len(buffer))
+        yield Token(token_type.EOF, '', self.line, self.index - self.line_start + 1)
+
+    def __iter__(self):
+        if self.token_stream is None:
+            self.token_stream = self.tokens()
+        return self.token_stream
+
+    def get_next_token(self):
+        """
+        Get next token from the source
+
+        :return: Next Token from the source, EOF Token once the source is exhausted
+        """
+        try:
+            return next(iter(self))
+        except StopIteration:
+            return Token(token_type.EOF, '', self.line, self.index - self.line_start + 1)
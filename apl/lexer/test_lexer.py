@@ -0,0 +1,84 @@
+from unittest import TestCase
+
+from apl.tokens.token_type import *
+from apl.lexer import lexer
+from apl.parser import parser
+
+
+class TestLexer(TestCase):
+
+    def get_token_list(self, text):
+        apl_lexer = lexer.Lexer(text)
+        token_list = [apl_lexer.get_next_token()]
+        while token_list[-1].typename != EOF:
+            token_list.append(apl_lexer.get_next_token())
+        return [(token.typename, token.value) for token in token_list]
+
+    def test_tokenize(self):
+        token_list, error_messages = lexer.Lexer.tokenize('var test = 10 - 5.67 * (3 / 2);')
+        expected = [
+            (WORD_VAR, 'var'), (IDENTIFIER, 'test'), (EQUAL, '='), (NUMBER, '10'), (MINUS, '-'),
+            (NUMBER, '5.67'), (MULT, '*'), (OPEN_PAR, '('), (NUMBER, '3'), (DIV, '/'),
+            (NUMBER, '2'), (CLOSING_PAR, ')'), (TERMINATOR, ';'), (EOF, '')
+        ]
+
+        self.assertListEqual(error_messages, [])
+        self.assertListEqual([(token.typename, token.value) for token in token_list], expected)
+
+    def test_tokenize_error(self):
+        token_list, error_messages = lexer.Lexer.tokenize('x = 1 ?')
+
+        self.assertEqual(error_messages[0], 'No matching token @ index:6')
+        self.assertEqual(error_messages[2], '\t' + 6 * ' ' + '^')
+
+    def test_get_next_token(self):
+        text = 'var  x =\t"str" ;'
+
+        self.assertListEqual(self.get_token_list(text), [
+            (WORD_VAR, 'var'), (IDENTIFIER, 'x'), (EQUAL, '='), (STRING, '"str"'), (TERMINATOR, ';'), (EOF, '')
+        ])
+
+    def test_get_next_token_error(self):
+        apl_lexer = lexer.Lexer('x ?')
+        apl_lexer.get_next_token()
+
+        with self.assertRaisesRegex(lexer.TokenMatchingError, 'at index 2'):
+            apl_lexer.get_next_token()
+
+    def test_empty_identifier_match_falls_through(self):
+        token_list, _ = lexer.Lexer.tokenize('"a b"')
+
+        self.assertEqual((token_list[0].typename, token_list[0].value), (STRING, '"a b"'))
+
+    def test_tokenize_buffer(self):
+        text = 'var test = 10 - 5.67 * (3 / 2);\ntest = (test + 4);'
+        token_list, _ = lexer.Lexer.tokenize(text)
+        token_buffer = lexer.Lexer.tokenize_buffer(text)
+
+        self.assertEqual(len(token_buffer), len(token_list))
+        self.assertListEqual(
+            [(token.typename, token.value) for token in token_buffer],
+            [(token.typename, token.value) for token in token_list]
+        )
+        self.assertEqual((token_buffer.typename(3), token_buffer.value(3)), (NUMBER, '10'))
+        self.assertEqual(token_buffer.kinds[3], KIND_CODE[NUMBER])
+
+    def test_tokenize_buffer_error(self):
+        with self.assertRaisesRegex(lexer.TokenMatchingError, 'at index 6'):
+            lexer.Lexer.tokenize_buffer('x = 1 ?')
+
+    def test_cursor_kinds(self):
+        cursor = lexer.Lexer.tokenize_buffer('x = y + 2 + +/1;').cursor()
+        token_list = [cursor.get_next_token() for _ in range(10)]
+
+        self.assertListEqual([token.kind for token in token_list],
+                             [KIND_CODE[token.typename] for token in token_list])
+        self.assertIs(token_list[3], token_list[5])
+        self.assertEqual((token_list[6].typename, token_list[6].value), (REDUCE, '+/'))
+        self.assertEqual(token_list[9].kind, KIND_CODE[EOF])
+
+    def test_parse_token_buffer(self):
+        text = 'var test = 10 - 5.67 * (3 / 2);\ntest = (test + 4);'
+        buffer_tree = parser.Parser(lexer.Lexer.tokenize_buffer(text).cursor()).parse()
+
+        self.assertEqual(str(buffer_tree), str(parser.Parser(lexer.Lexer(text)).parse()))
@@ -0,0 +1,79 @@
+from unittest import TestCase
+import io
+import os
+import tempfile
+
+from apl.tokens.token_type import *
+from apl.lexer import lexer
+from apl.lexer import stream
+from apl.parser import parser
+
+
+CODE = 'var test = 10 - 5.67 * (3 / 2);\ntest = (test + 4);\nvar s = "a; b";\n'
+
+
+class TestStreamLexer(TestCase):
+
+    def get_expected(self, text):
+        token_list, _ = lexer.Lexer.tokenize(text)
+        return [(token.typename, token.value) for token in token_list]
+
+    def test_chunk_boundaries(self):
+        expected = self.get_expected(CODE)
+        for chunk_size in (1, 2, 3, 7, 64):
+            token_list = list(stream.StreamLexer(CODE, chunk_size=chunk_size))
+
+            self.assertListEqual([(token.typename, token.value) for token in token_list], expected)
+
+    def test_binary_sources(self):
+        expected = self.get_expected(CODE)
+        data = CODE.encode('utf-8')
+        for source in (data, memoryview(data), io.BytesIO(data), io.StringIO(CODE)):
+            token_list = list(stream.StreamLexer(source, chunk_size=5))
+
+            self.assertListEqual([(token.typename, token.value) for token in token_list], expected)
+
+    def test_multibyte_character_across_chunks(self):
+        token_list = list(stream.StreamLexer('x = "é";'.encode('utf-8'), chunk_size=6))
+
+        self.assertEqual(token_list[2].value, '"é"')
+
+    def test_line_and_column(self):
+        token_list = list(stream.StreamLexer(CODE, chunk_size=4))
+
+        self.assertEqual((token_list[0].line, token_list[0].column), (1, 1))
+        self.assertEqual((token_list[13].typename, token_list[13].line, token_list[13].column), (IDENTIFIER, 2, 1))
+        self.assertEqual((token_list[16].typename, token_list[16].line, token_list[16].column), (IDENTIFIER, 2, 9))
+
+    def test_error(self):
+        with self.assertRaisesRegex(lexer.TokenMatchingError, r'line 2, column 5'):
+            list(stream.StreamLexer('x = 1;\nx = ?;', chunk_size=3))
+
+    def test_buffer_limit(self):
+        code = 'var s = "a; b; c; d; e; f; g; h"; var x = 1;'
+        token_list = list(stream.StreamLexer(code, chunk_size=3, max_buffer_size=len(code)))
+        self.assertListEqual([(token.typename, token.value) for token in token_list], self.get_expected(code))
+
+        with self.assertRaisesRegex(lexer.TokenMatchingError, r'within 16 characters at index 11 \(line 2, column 1\)'):
+            list(stream.StreamLexer('var x = 1;\nvar s = "a; b; c; d; e; f";', chunk_size=3, max_buffer_size=16))
+
+    def test_from_path(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.apl', delete=False) as file:
+            file.write(CODE)
+        try:
+            for use_mmap in (True, False):
+                token_list = list(stream.StreamLexer.from_path(file.name, use_mmap=use_mmap, chunk_size=8))
+
+                self.assertListEqual([(token.typename, token.value) for token in token_list], self.get_expected(CODE))
+        finally:
+            os.remove(file.name)
+
+    def test_parser(self):
+        code = CODE.split('var s')[0]
+        tree = parser.Parser(stream.StreamLexer(code, chunk_size=3)).parse()
+
+        self.assertEqual(str(tree), str(parser.Parser(lexer.Lexer(code)).parse()))
+
+    def test_parser_error_position(self):
+        with self.assertRaisesRegex(parser.ParsingError, 'line 2 column 7'):
+            parser.Parser(stream.StreamLexer('var x = 1;\nx = 1 ( 1;')).parse()
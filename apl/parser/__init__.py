@@ -1,2 +1,6 @@
 from . import ast
 from . import parser
+from . import serialize
+from . import parallel
+from . import flat
+from . import image
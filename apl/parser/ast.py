@@ -2,29 +2,105 @@ import re
 
 
 class AST:
-    pass
+    """
+    Base class of the AST nodes. Nodes define __slots__, and attributes derived from their token
+    are properties, so that large programs are stored compactly.
+    """
+    __slots__ = ()
 
 
 class BinaryOperator(AST):
+    """
+    'code' is the operation code set when the tree is compiled for the tree engine, None until then
+    """
+    __slots__ = ('operator', 'left', 'right', 'code')
+
     def __init__(self, operator, left, right):
-        self.token = self.operator = operator
+        self.operator = operator
         self.left = left
         self.right = right
+        self.code = None
+
+    @property
+    def token(self):
+        return self.operator
 
     def __str__(self):
         return 'ast.binary.operator<%s, %s, %s>' % (self.left, self.operator, self.right)
 
 
 class Number(AST):
+    """
+    'constant' is the decoded value set when the tree is compiled for the tree engine, None until then
+    """
+    __slots__ = ('token', 'constant')
+
     def __init__(self, token):
         self.token = token
-        self.value = token.value
+        self.constant = None
+
+    @property
+    def value(self):
+        return self.token.value
 
     def __str__(self):
         return 'ast.number<%s>' % self.value
 
 
+class Vector(AST):
+    """
+    'constant' is the decoded vector set when the tree is compiled, None until then
+    """
+    __slots__ = ('tokens', 'constant')
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.constant = None
+
+    @property
+    def values(self):
+        return [token.value for token in self.tokens]
+
+    def __str__(self):
+        return 'ast.vector<%s>' % ', '.join(self.values)
+
+
+class ArrayOperator(AST):
+    """
+    Operator applying a scalar function ('+', '-', '*' or '/') along a vector
+    """
+    __slots__ = ('operator', 'expr')
+
+    def __init__(self, operator, expr):
+        self.operator = operator
+        self.expr = expr
+
+    @property
+    def token(self):
+        return self.operator
+
+    @property
+    def function(self):
+        return self.operator.value[0]
+
+
+class Reduce(ArrayOperator):
+    __slots__ = ()
+
+    def __str__(self):
+        return 'ast.reduce<%s, %s>' % (self.function, self.expr)
+
+
+class Scan(ArrayOperator):
+    __slots__ = ()
+
+    def __str__(self):
+        return 'ast.scan<%s, %s>' % (self.function, self.expr)
+
+
 class Program(AST):
+    __slots__ = ('instructions',)
+
     def __init__(self, instructions):
         self.instructions = instructions
 
@@ -33,10 +109,12 @@ class Program(AST):
 
 
 class Instruction(AST):
-    pass
+    __slots__ = ()
 
 
 class Assignation(Instruction):
+    __slots__ = ('left_op', 'right_op')
+
     def __init__(self, left_op, right_op):
         self.left_op = left_op
         self.right_op = right_op
@@ -46,30 +124,130 @@ class Assignation(Instruction):
 
 
 class Var(AST):
+    """
+    'slot' is the frame index set by the resolver
+    """
+    __slots__ = ('token', 'slot')
+
     def __init__(self, token):
         self.token = token
-        self.var_name = token.value
+
+    @property
+    def var_name(self):
+        return self.token.value
 
     def __str__(self):
         return 'ast.var<%s>' % self.var_name
 
 
 class VarInit(Var):
+    __slots__ = ()
+
     def __str__(self):
         return 'ast.var.init<%s>' % self.var_name
 
 
 class VarEval(Var):
+    __slots__ = ()
+
     def __str__(self):
         return 'ast.var.eval<%s>' % self.var_name
 
 
+class SharedExpr(AST):
+    """
+    Subexpression occurring several times in an instruction: the same SharedExpr node is referenced
+    by every occurrence and its expression is evaluated once per instruction evaluation.
+    """
+    __slots__ = ('expr',)
+
+    def __init__(self, expr):
+        self.expr = expr
+
+    def __str__(self):
+        return 'ast.shared.expr<%s>' % self.expr
+
+
+def iter_children(node):
+    """
+    :param node: AST node
+    :return: tuple of the child nodes of 'node', in evaluation order
+    """
+    if isinstance(node, BinaryOperator):
+        return node.left, node.right
+    if isinstance(node, Assignation):
+        return node.right_op, node.left_op
+    if isinstance(node, Program):
+        return tuple(node.instructions)
+    if isinstance(node, (SharedExpr, ArrayOperator)):
+        return node.expr,
+    return ()
+
+
+def walk(tree):
+    """
+    Iterate over the nodes of an AST in evaluation order (pre-order), without recursion.
+    A SharedExpr node and its expression are only generated once.
+
+    :param tree: AST root node
+    :return: generator of AST nodes
+    """
+    seen_shared = set()
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, SharedExpr):
+            if node in seen_shared:
+                continue
+            seen_shared.add(node)
+        yield node
+        stack.extend(reversed(iter_children(node)))
+
+
+def get_visitor_method_name(node_class):
+    """
+    Build the visitor method name of the given AST node class, e.g. BinaryOperator -> visit_binary_operator
+
+    :param node_class: AST node class
+    :return: visitor method name
+    """
+    camel_case_split = re.sub('(?!^)([A-Z][a-z]+)', r' \1', node_class.__name__).split()
+    return 'visit_%s' % '_'.join(camel_case_split).lower()
+
+
 class ASTNodeVisitor:
+    """
+    Dispatch AST nodes to the visitor `visit_<node_class>` methods.
+    The method of each node class is resolved once per visitor class and stored in its dispatch table.
+    If the visitor class has no method for a node class, the methods of its base classes are searched,
+    then `default_visit` is used.
+    """
+    dispatch_table = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.dispatch_table = {}
+
+    @classmethod
+    def resolve_visitor(cls, node_class):
+        """
+        Find the visitor function of the given AST node class
+
+        :param node_class: AST node class
+        :return: unbound visitor function
+        """
+        for klass in node_class.__mro__[:-1]:
+            visitor = getattr(cls, get_visitor_method_name(klass), None)
+            if visitor is not None:
+                return visitor
+        return cls.default_visit
+
     def visit(self, node):
-        camel_case_split = re.sub('(?!^)([A-Z][a-z]+)', r' \1', type(node).__name__).split()
-        method_name = 'visit_%s' % '_'.join(camel_case_split).lower()
-        visitor = getattr(self, method_name, self.default_visit)
-        return visitor(node)
+        try:
+            visitor = self.dispatch_table[node.__class__]
+        except KeyError:
+            visitor = self.dispatch_table[node.__class__] = self.resolve_visitor(node.__class__)
+        return visitor(self, node)
 
     def default_visit(self, node):
         raise Exception('No existing visitor method for %s' % type(node).__name__)
@@ -0,0 +1,397 @@
+"""
+Flat AST encoding
+
+An AST is encoded in post-order into parallel arrays, one entry per node:
+    - opcodes: node type, binary operators having one opcode per operator
+    - first, second: indexes of the child nodes, or of the node literal or variable name in the pools
+Number literals and vector literals are stored once in the literal pool, variable names once in the name
+pool, and the instructions of a program in the `extra` array. The tokens are not stored: nodes take
+9 bytes, instead of an object with its Token.
+
+A FlatTree is walked through proxy nodes, created on access, which are subclasses of the AST node
+classes: AST visitors handle them like the nodes they stand for. Variable slots are the indexes of the
+name pool, so that a FlatTree can be given to Interpreter.execute like a resolver.ResolvedTree, with
+the tree engine: it is then evaluated from its arrays (see apl.interpreter.flat_evaluator), without
+proxy nodes. The proxy tree can also be given to Interpreter.compile, for any engine: the slots the
+resolver sets on variable proxies are kept in the FlatTree.
+"""
+from array import array
+
+from . import ast
+from apl.tokens.tokens import Token
+from apl.tokens import token_type
+
+
+NUMBER = 0
+VAR_EVAL = 1
+VAR = 2
+VAR_INIT = 3
+PLUS = 4
+MINUS = 5
+MULT = 6
+DIV = 7
+ASSIGNATION = 8
+PROGRAM = 9
+SHARED_EXPR = 10
+VECTOR = 11
+REDUCE = 12
+SCAN = 13
+
+OPERATOR_OPCODES = {token_type.PLUS: PLUS, token_type.MINUS: MINUS, token_type.MULT: MULT, token_type.DIV: DIV}
+VARIABLE_OPCODES = {ast.VarEval: VAR_EVAL, ast.VarInit: VAR_INIT, ast.Var: VAR}
+FUNCTIONS = ('+', '-', '*', '/')
+# tokens shared by the operator nodes, decoded or proxies
+OPERATOR_TOKENS = {
+    PLUS: Token(token_type.PLUS, '+'),
+    MINUS: Token(token_type.MINUS, '-'),
+    MULT: Token(token_type.MULT, '*'),
+    DIV: Token(token_type.DIV, '/'),
+}
+REDUCE_TOKENS = [Token(token_type.REDUCE, function + '/') for function in FUNCTIONS]
+SCAN_TOKENS = [Token(token_type.SCAN, function + '\\') for function in FUNCTIONS]
+
+
+class FlatEncodingError(Exception):
+    pass
+
+
+class FlatTree:
+    """
+    AST encoded into parallel arrays, defined by:
+        - opcodes: array of node opcodes
+        - first, second: arrays of child or pool indexes
+        - extra: array of the instruction indexes of programs
+        - literals: pool of number literals (str) and vector literals (tuple of str)
+        - names: pool of variable names, indexed by slot
+        - root: index of the root node
+        - constants: literals decoded by the evaluator, None until the tree is evaluated
+        - slots: dict variable node index -> slot set on its proxy nodes, e.g. by resolver.resolve
+    """
+    __slots__ = ('opcodes', 'first', 'second', 'extra', 'literals', 'names', 'root', 'constants', 'slots')
+
+    def __init__(self):
+        self.opcodes = array('B')
+        self.first = array('i')
+        self.second = array('i')
+        self.extra = array('i')
+        self.literals = []
+        self.names = []
+        self.root = -1
+        self.constants = None
+        self.slots = {}
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    @property
+    def nbytes(self):
+        """
+        :return: size in bytes of the node arrays, pools excluded
+        """
+        return sum(len(values) * values.itemsize for values in (self.opcodes, self.first, self.second, self.extra))
+
+    @property
+    def tree(self):
+        """
+        :return: proxy node of the root node
+        """
+        return self.node(self.root)
+
+    def node(self, index):
+        """
+        :param index: node index
+        :return: proxy node of the node at 'index'
+        """
+        return PROXY_CLASSES[self.opcodes[index]](self, index)
+
+    def decode(self):
+        """
+        Build the AST encoded in the arrays, without recursion
+
+        :return: AST root node
+        """
+        opcodes, first, second, extra = self.opcodes, self.first, self.second, self.extra
+        literals, names = self.literals, self.names
+        nodes = []
+        append = nodes.append
+        for index, opcode in enumerate(opcodes):
+            a = first[index]
+            b = second[index]
+            if PLUS <= opcode <= DIV:
+                append(ast.BinaryOperator(OPERATOR_TOKENS[opcode], nodes[a], nodes[b]))
+            elif opcode == NUMBER:
+                append(ast.Number(Token(token_type.NUMBER, literals[a])))
+            elif opcode == VAR_EVAL:
+                append(ast.VarEval(Token(token_type.IDENTIFIER, names[a])))
+            elif opcode == ASSIGNATION:
+                append(ast.Assignation(nodes[a], nodes[b]))
+            elif opcode == VAR:
+                append(ast.Var(Token(token_type.IDENTIFIER, names[a])))
+            elif opcode == VAR_INIT:
+                append(ast.VarInit(Token(token_type.IDENTIFIER, names[a])))
+            elif opcode == PROGRAM:
+                append(ast.Program([nodes[instruction] for instruction in extra[a:a + b]]))
+            elif opcode == SHARED_EXPR:
+                append(ast.SharedExpr(nodes[a]))
+            elif opcode == VECTOR:
+                append(ast.Vector([Token(token_type.NUMBER, value) for value in literals[a]]))
+            elif opcode == REDUCE:
+                append(ast.Reduce(REDUCE_TOKENS[b], nodes[a]))
+            elif opcode == SCAN:
+                append(ast.Scan(SCAN_TOKENS[b], nodes[a]))
+            else:
+                raise FlatEncodingError('Unknown opcode %s' % opcode)
+        return nodes[self.root]
+
+
+def encode(tree):
+    """
+    Encode an AST into a FlatTree, without recursion
+
+    :param tree: AST root node
+    :return: FlatTree
+    """
+    flat = FlatTree()
+    add_opcode, add_first, add_second = flat.opcodes.append, flat.first.append, flat.second.append
+    literal_indexes = {}
+    name_indexes = {}
+    shared_indexes = {}
+    # indexes of the encoded children of the nodes in progress
+    encoded = []
+    stack = [(tree, False)]
+    while stack:
+        node, children_done = stack.pop()
+        node_class = node.__class__
+        if node_class is ast.BinaryOperator:
+            if not children_done:
+                stack.extend(((node, True), (node.right, False), (node.left, False)))
+                continue
+            right = encoded.pop()
+            opcode, a, b = OPERATOR_OPCODES[node.operator.typename], encoded.pop(), right
+        elif node_class is ast.Number or node_class is ast.Vector:
+            literal = node.value if node_class is ast.Number else tuple(node.values)
+            if literal not in literal_indexes:
+                literal_indexes[literal] = len(flat.literals)
+                flat.literals.append(literal)
+            opcode, a, b = NUMBER if node_class is ast.Number else VECTOR, literal_indexes[literal], 0
+        elif node_class in VARIABLE_OPCODES:
+            name = node.var_name
+            if name not in name_indexes:
+                name_indexes[name] = len(flat.names)
+                flat.names.append(name)
+            opcode, a, b = VARIABLE_OPCODES[node_class], name_indexes[name], 0
+        elif node_class is ast.Assignation:
+            if not children_done:
+                stack.extend(((node, True), (node.right_op, False), (node.left_op, False)))
+                continue
+            right_op = encoded.pop()
+            opcode, a, b = ASSIGNATION, encoded.pop(), right_op
+        elif node_class is ast.Program:
+            if not children_done:
+                stack.append((node, True))
+                stack.extend((instruction, False) for instruction in reversed(node.instructions))
+                continue
+            count = len(node.instructions)
+            opcode, a, b = PROGRAM, len(flat.extra), count
+            flat.extra.extend(encoded[len(encoded) - count:])
+            del encoded[len(encoded) - count:]
+        elif node_class is ast.SharedExpr:
+            if node in shared_indexes:
+                encoded.append(shared_indexes[node])
+                continue
+            if not children_done:
+                stack.extend(((node, True), (node.expr, False)))
+                continue
+            opcode, a, b = SHARED_EXPR, encoded.pop(), 0
+            shared_indexes[node] = len(flat.opcodes)
+        elif node_class is ast.Reduce or node_class is ast.Scan:
+            if not children_done:
+                stack.extend(((node, True), (node.expr, False)))
+                continue
+            opcode = REDUCE if node_class is ast.Reduce else SCAN
+            a, b = encoded.pop(), FUNCTIONS.index(node.function)
+        else:
+            raise FlatEncodingError('Can\'t encode %s node' % node_class.__name__)
+        encoded.append(len(flat.opcodes))
+        add_opcode(opcode)
+        add_first(a)
+        add_second(b)
+    flat.root = encoded.pop()
+    return flat
+
+
+class FlatNumber(ast.Number):
+    __slots__ = ('flat', 'index')
+
+    def __init__(self, flat, index):
+        self.flat = flat
+        self.index = index
+
+    @property
+    def token(self):
+        return Token(token_type.NUMBER, self.flat.literals[self.flat.first[self.index]])
+
+    @property
+    def constant(self):
+        return None
+
+
+class FlatVarMixin:
+    """
+    Variable proxy node properties, the slot of a variable being its index in the name pool unless
+    another slot is set, which is kept in FlatTree.slots for the proxies of the same node
+    """
+    __slots__ = ()
+
+    def __init__(self, flat, index):
+        self.flat = flat
+        self.index = index
+
+    @property
+    def token(self):
+        return Token(token_type.IDENTIFIER, self.flat.names[self.flat.first[self.index]])
+
+    @property
+    def slot(self):
+        try:
+            return self.flat.slots[self.index]
+        except KeyError:
+            return self.flat.first[self.index]
+
+    @slot.setter
+    def slot(self, slot):
+        self.flat.slots[self.index] = slot
+
+
+class FlatVar(FlatVarMixin, ast.Var):
+    __slots__ = ('flat', 'index')
+
+
+class FlatVarInit(FlatVarMixin, ast.VarInit):
+    __slots__ = ('flat', 'index')
+
+
+class FlatVarEval(FlatVarMixin, ast.VarEval):
+    __slots__ = ('flat', 'index')
+
+
+class FlatBinaryOperator(ast.BinaryOperator):
+    __slots__ = ('flat', 'index')
+
+    def __init__(self, flat, index):
+        self.flat = flat
+        self.index = index
+
+    @property
+    def operator(self):
+        return OPERATOR_TOKENS[self.flat.opcodes[self.index]]
+
+    @property
+    def left(self):
+        return self.flat.node(self.flat.first[self.index])
+
+    @property
+    def right(self):
+        return self.flat.node(self.flat.second[self.index])
+
+
+class FlatAssignation(ast.Assignation):
+    __slots__ = ('flat', 'index')
+
+    def __init__(self, flat, index):
+        self.flat = flat
+        self.index = index
+
+    @property
+    def left_op(self):
+        return self.flat.node(self.flat.first[self.index])
+
+    @property
+    def right_op(self):
+        return self.flat.node(self.flat.second[self.index])
+
+
+class FlatProgram(ast.Program):
+    __slots__ = ('flat', 'index')
+
+    def __init__(self, flat, index):
+        self.flat = flat
+        self.index = index
+
+    @property
+    def instructions(self):
+        start = self.flat.first[self.index]
+        return [self.flat.node(index) for index in self.flat.extra[start:start + self.flat.second[self.index]]]
+
+
+class FlatSharedExpr(ast.SharedExpr):
+    """
+    Proxies of the same shared expression are equal, so that its value is computed once
+    """
+    __slots__ = ('flat', 'index')
+
+    def __init__(self, flat, index):
+        self.flat = flat
+        self.index = index
+
+    @property
+    def expr(self):
+        return self.flat.node(self.flat.first[self.index])
+
+    def __eq__(self, other):
+        return isinstance(other, FlatSharedExpr) and other.flat is self.flat and other.index == self.index
+
+    def __hash__(self):
+        return hash((id(self.flat), self.index))
+
+
+class FlatVector(ast.Vector):
+    __slots__ = ('flat', 'index')
+
+    def __init__(self, flat, index):
+        self.flat = flat
+        self.index = index
+
+    @property
+    def tokens(self):
+        return [Token(token_type.NUMBER, value) for value in self.flat.literals[self.flat.first[self.index]]]
+
+    @property
+    def constant(self):
+        return None
+
+
+class FlatArrayOperatorMixin:
+    __slots__ = ()
+
+    def __init__(self, flat, index):
+        self.flat = flat
+        self.index = index
+
+    @property
+    def expr(self):
+        return self.flat.node(self.flat.first[self.index])
+
+
+class FlatReduce(FlatArrayOperatorMixin, ast.Reduce):
+    __slots__ = ('flat', 'index')
+
+    @property
+    def operator(self):
+        return REDUCE_TOKENS[self.flat.second[self.index]]
+
+
+class FlatScan(FlatArrayOperatorMixin, ast.Scan):
+    __slots__ = ('flat', 'index')
+
+    @property
+    def operator(self):
+        return SCAN_TOKENS[self.flat.second[self.index]]
+
+
+# opcode -> proxy node class
+PROXY_CLASSES = (
+    FlatNumber, FlatVarEval, FlatVar, FlatVarInit,
+    FlatBinaryOperator, FlatBinaryOperator, FlatBinaryOperator, FlatBinaryOperator,
+    FlatAssignation, FlatProgram, FlatSharedExpr, FlatVector, FlatReduce, FlatScan,
+)
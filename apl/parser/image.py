@@ -0,0 +1,378 @@
+"""
+Binary program images
+
+A program image is a flat encoding of an AST (see flat.FlatTree) laid out so that it can be memory-mapped
+and evaluated in place, made of a fixed size header followed by a payload:
+    - header: magic, format version, flags, root node index, node, extra, literal and name counts,
+              payload size and crc32
+    - payload: sections, each starting on an 8 bytes boundary:
+        - opcodes (u8), first and second (i32), extra (i32)
+        - literal kinds (u8), literal offsets (u32, one more than the literals), literal utf-8 bytes,
+          the values of vector literals being separated by spaces
+        - name offsets (u32, one more than the names), name utf-8 bytes
+
+All the numbers are little-endian. `loads` and `load` return a FlatTree whose node arrays are views of
+the image buffer: the nodes are read from the buffer when it is walked, and a pool string is decoded on
+first access. The arrays are checked once on load, so that the nodes of a loaded image only reference
+earlier nodes of the expected types and existing pool strings. An image file loaded by several
+processes is mapped read-only, so that the processes share its pages instead of holding their own copy of
+the program.
+"""
+from array import array
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+
+from .flat import (
+    NUMBER, VAR_EVAL, VAR, VAR_INIT, PLUS, MINUS, MULT, DIV, ASSIGNATION, PROGRAM, SHARED_EXPR, VECTOR, REDUCE,
+    SCAN, FUNCTIONS, PROXY_CLASSES, FlatTree, encode,
+)
+
+
+MAGIC = b'APLI'
+FORMAT_VERSION = 1
+IMAGE_SUFFIX = '.apli'
+
+HEADER = struct.Struct('<4sHHiIIIIQI')
+ALIGNMENT = 8
+
+NUMBER_LITERAL = 0
+VECTOR_LITERAL = 1
+
+EXPRESSION_OPCODES = frozenset((NUMBER, VAR_EVAL, PLUS, MINUS, MULT, DIV, SHARED_EXPR, VECTOR, REDUCE, SCAN))
+
+IS_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+class ImageError(Exception):
+    pass
+
+
+class StringPool:
+    """
+    Read-only sequence of the strings stored in an image, decoded on first access
+    """
+    __slots__ = ('offsets', 'data', 'kinds', 'values')
+
+    def __init__(self, offsets, data, kinds=None):
+        """
+        :param offsets: sequence of the string offsets in 'data', followed by the end offset
+        :param data: buffer of the utf-8 encoded strings
+        :param kinds: sequence of the literal kinds, VECTOR_LITERAL strings being decoded as tuples,
+                      None for a pool of plain strings
+        """
+        self.offsets = offsets
+        self.data = data
+        self.kinds = kinds
+        self.values = {}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        try:
+            return self.values[index]
+        except KeyError:
+            pass
+        if not 0 <= index < len(self):
+            raise IndexError('string pool index out of range')
+        value = str(self.data[self.offsets[index]:self.offsets[index + 1]], 'utf-8')
+        if self.kinds is not None and self.kinds[index] == VECTOR_LITERAL:
+            value = tuple(value.split(' '))
+        self.values[index] = value
+        return value
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+def align(size):
+    return -size % ALIGNMENT
+
+
+def to_bytes(values, typecode):
+    """
+    :return: little-endian bytes of a sequence of numbers
+    """
+    values = array(typecode, values)
+    if not IS_LITTLE_ENDIAN:
+        values.byteswap()
+    return values.tobytes()
+
+
+def dumps(tree):
+    """
+    :param tree: AST root node or FlatTree
+    :return: bytes of the image of 'tree'
+    :raise: FlatEncodingError if 'tree' holds nodes which can't be encoded
+    """
+    flat = tree if isinstance(tree, FlatTree) else encode(tree)
+    literal_kinds = []
+    literal_data = []
+    for literal in flat.literals:
+        is_vector = isinstance(literal, tuple)
+        literal_kinds.append(VECTOR_LITERAL if is_vector else NUMBER_LITERAL)
+        literal_data.append((' '.join(literal) if is_vector else literal).encode('utf-8'))
+    name_data = [name.encode('utf-8') for name in flat.names]
+
+    sections = [
+        flat.opcodes.tobytes(),
+        to_bytes(flat.first, 'i'),
+        to_bytes(flat.second, 'i'),
+        to_bytes(flat.extra, 'i'),
+        bytes(literal_kinds),
+        to_bytes(get_offsets(literal_data), 'I'),
+        b''.join(literal_data),
+        to_bytes(get_offsets(name_data), 'I'),
+        b''.join(name_data),
+    ]
+    payload = bytearray()
+    for section in sections:
+        payload += section
+        payload += bytes(align(len(payload)))
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, 0, flat.root, len(flat.opcodes), len(flat.extra), len(flat.literals),
+        len(flat.names), len(payload), zlib.crc32(payload)
+    )
+    return header + payload
+
+
+def get_offsets(strings):
+    offsets = [0]
+    for string in strings:
+        offsets.append(offsets[-1] + len(string))
+    return offsets
+
+
+def dump(tree, path):
+    """
+    Write the image of a tree to a file atomically
+
+    :param tree: AST root node or FlatTree
+    :param path: image file path
+    :return: None
+    """
+    data = dumps(tree)
+    file_descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, 'wb') as file:
+            file.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class Reader:
+    """
+    Cursor over the sections of an image payload, keeping the views it creates
+    """
+
+    def __init__(self, payload, views):
+        self.payload = payload
+        self.position = 0
+        self.views = views
+
+    def read(self, count, typecode):
+        """
+        :param count: number of items of the section
+        :param typecode: array typecode of the items
+        :return: view of the section, or array copy on big-endian hosts
+        """
+        size = count * array(typecode).itemsize
+        end = self.position + size
+        if end > len(self.payload):
+            raise ImageError('Truncated image')
+        view = self.payload[self.position:end]
+        self.views.append(view)
+        self.position = end + align(end)
+        if typecode == 'B':
+            return view
+        if not IS_LITTLE_ENDIAN:
+            values = array(typecode, view.tobytes())
+            values.byteswap()
+            return values
+        view = view.cast(typecode)
+        self.views.append(view)
+        return view
+
+
+def loads(buffer, verify=True, views=None):
+    """
+    Load an image without copying its node arrays
+
+    :param buffer: bytes-like object holding the image: bytes, mmap...
+    :param verify: check the payload crc32
+    :param views: list extended with the memoryviews of 'buffer' held by the returned FlatTree, so that
+                  they can be released before 'buffer' is closed
+    :return: FlatTree viewing 'buffer'
+    :raise: ImageError on a buffer which is not a valid image of the supported format version
+    """
+    if views is None:
+        views = []
+    view = memoryview(buffer)
+    views.append(view)
+    if view.ndim != 1 or view.itemsize != 1:
+        view = view.cast('B')
+        views.append(view)
+    if len(view) < HEADER.size:
+        raise ImageError('Truncated image header')
+    (magic, version, flags, root, node_count, extra_count, literal_count, name_count,
+     payload_size, payload_crc) = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise ImageError('Not a program image')
+    if version != FORMAT_VERSION:
+        raise ImageError('Unsupported image format version %s, expecting %s' % (version, FORMAT_VERSION))
+    if len(view) - HEADER.size != payload_size:
+        raise ImageError('Image payload size is %s bytes, expecting %s' % (len(view) - HEADER.size, payload_size))
+    payload = view[HEADER.size:]
+    views.append(payload)
+    if verify and zlib.crc32(payload) != payload_crc:
+        raise ImageError('Image checksum mismatch')
+
+    reader = Reader(payload, views)
+    flat = FlatTree()
+    flat.opcodes = reader.read(node_count, 'B')
+    flat.first = reader.read(node_count, 'i')
+    flat.second = reader.read(node_count, 'i')
+    flat.extra = reader.read(extra_count, 'i')
+    literal_kinds = reader.read(literal_count, 'B')
+    literal_offsets = reader.read(literal_count + 1, 'I')
+    flat.literals = StringPool(literal_offsets, reader.read(literal_offsets[-1], 'B'), literal_kinds)
+    name_offsets = reader.read(name_count + 1, 'I')
+    flat.names = StringPool(name_offsets, reader.read(name_offsets[-1], 'B'))
+    if not 0 <= root < node_count:
+        raise ImageError('Invalid image root node %s' % root)
+    flat.root = root
+    check_pool(flat.literals, 'literal')
+    check_pool(flat.names, 'name')
+    check_nodes(flat, literal_kinds)
+    return flat
+
+
+def check_pool(pool, description):
+    """
+    :param pool: StringPool of an image
+    :param description: pool description for error messages
+    :return: None
+    :raise: ImageError if a string of 'pool' isn't within its data
+    """
+    offsets = pool.offsets
+    previous = 0
+    for index, offset in enumerate(offsets):
+        if offset < previous:
+            raise ImageError('Invalid %s offset %s at index %s' % (description, offset, index))
+        previous = offset
+    if previous > len(pool.data):
+        raise ImageError('Invalid %s offset %s at index %s' % (description, previous, len(offsets) - 1))
+
+
+def check_nodes(flat, literal_kinds):
+    """
+    Check the node arrays of an image, in one pass
+
+    :param flat: FlatTree of an image
+    :param literal_kinds: sequence of the literal kinds
+    :return: None
+    :raise: ImageError on an unknown opcode or function, a literal of the wrong kind, an index which isn't
+            an earlier node, a program instruction or a pool string, or a child node of the wrong type
+    """
+    opcodes, first, second, extra = flat.opcodes, flat.first, flat.second, flat.extra
+    literal_count = len(flat.literals)
+    name_count = len(flat.names)
+    extra_count = len(extra)
+    opcode_count = len(PROXY_CLASSES)
+    for index, opcode in enumerate(opcodes):
+        a = first[index]
+        b = second[index]
+        if opcode >= opcode_count:
+            raise ImageError('Unknown opcode %s of node %s' % (opcode, index))
+        if PLUS <= opcode <= DIV:
+            valid = is_expression(opcodes, a, index) and is_expression(opcodes, b, index)
+        elif opcode == NUMBER or opcode == VECTOR:
+            valid = 0 <= a < literal_count and literal_kinds[a] == (
+                VECTOR_LITERAL if opcode == VECTOR else NUMBER_LITERAL
+            )
+        elif VAR_EVAL <= opcode <= VAR_INIT:
+            valid = 0 <= a < name_count
+        elif opcode == ASSIGNATION:
+            valid = (0 <= a < index and (opcodes[a] == VAR or opcodes[a] == VAR_INIT)
+                     and is_expression(opcodes, b, index))
+        elif opcode == PROGRAM:
+            valid = 0 <= a and 0 <= b and a + b <= extra_count
+            if valid:
+                for instruction in extra[a:a + b]:
+                    if not (0 <= instruction < index and opcodes[instruction] == ASSIGNATION):
+                        valid = False
+                        break
+        elif opcode == SHARED_EXPR:
+            valid = is_expression(opcodes, a, index)
+        else:
+            valid = is_expression(opcodes, a, index) and 0 <= b < len(FUNCTIONS)
+        if not valid:
+            raise ImageError('Invalid operand of node %s of opcode %s' % (index, opcode))
+    root_opcode = opcodes[flat.root]
+    if root_opcode != PROGRAM and root_opcode != ASSIGNATION and root_opcode not in EXPRESSION_OPCODES:
+        raise ImageError('Invalid image root node %s of opcode %s' % (flat.root, root_opcode))
+
+
+def is_expression(opcodes, child, index):
+    """
+    :return: True if 'child' is the index of an expression node before node 'index'
+    """
+    return 0 <= child < index and opcodes[child] in EXPRESSION_OPCODES
+
+
+class ProgramImage:
+    """
+    Image file mapped read-only, holding:
+        - flat: FlatTree of the image, evaluated in place with Interpreter.execute (tree engine)
+    The FlatTree and its nodes must not be used once the image is closed.
+    """
+
+    def __init__(self, path, verify=True):
+        """
+        :param path: image file path
+        :param verify: check the payload crc32
+        :raise: OSError if the file can't be read, ImageError on an invalid image
+        """
+        self.path = path
+        self.views = []
+        with open(path, 'rb') as file:
+            try:
+                self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ImageError('Empty image file') from None
+        try:
+            self.flat = loads(self.map, verify, self.views)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        for view in reversed(self.views):
+            view.release()
+        self.views = []
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def load(path, verify=True):
+    """
+    Map an image file
+
+    :param path: image file path
+    :param verify: check the payload crc32
+    :return: ProgramImage, to be closed once its tree is no longer used
+    :raise: OSError if the file can't be read, ImageError on an invalid image
+    """
+    return ProgramImage(path, verify)
@@ -0,0 +1,123 @@
+"""
+Parallel parsing of large programs
+
+The source is split into chunks of whole instructions, right after TERMINATORs which are not inside a
+string literal, and the chunks are lexed and parsed by a pool of worker processes. Each worker sends
+back its instructions encoded by apl.parser.serialize, and the instructions are generated in source
+order. Chunks are lexed by a StreamLexer positioned at their start in the source, so that token
+matching and parsing errors give their line and column in the whole source.
+
+Decoded nodes have no token position, and the first error of the source is raised, once the
+instructions preceding it have been generated.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from apl.lexer.stream import StreamLexer, LINE_BREAK, TERMINATOR, STRING_DELIMITER
+from . import ast
+from . import serialize
+from .parser import Parser
+
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+# chunks in flight per worker
+DEFAULT_PREFETCH = 2
+
+
+def find_split(source, start):
+    """
+    Find the first index from 'start' following a TERMINATOR token
+
+    As in `apl.lexer.stream.find_safe_limit`, a TERMINATOR can only be part of a STRING token when a
+    string delimiter precedes it on its line.
+
+    :param source: program source text
+    :param start: index from which to search
+    :return: index following the TERMINATOR, len(source) if there is none
+    """
+    index = source.find(TERMINATOR, start)
+    while index >= 0:
+        line_start = source.rfind(LINE_BREAK, 0, index) + 1
+        if source.find(STRING_DELIMITER, line_start, index) < 0:
+            return index + 1
+        # any other TERMINATOR of the line may be inside a string too
+        line_end = source.find(LINE_BREAK, index)
+        if line_end < 0:
+            break
+        index = source.find(TERMINATOR, line_end)
+    return len(source)
+
+
+def iter_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Split a program source into chunks of whole instructions
+
+    :param source: program source text
+    :param chunk_size: minimum number of characters of a chunk, except the last one
+    :return: generator of tuples (chunk text, index, line number, index of the line start)
+    """
+    start = 0
+    line = 1
+    line_start = 0
+    length = len(source)
+    while start < length:
+        end = find_split(source, min(start + chunk_size, length) - 1)
+        yield source[start:end], start, line, line_start
+        line += source.count(LINE_BREAK, start, end)
+        last_break = source.rfind(LINE_BREAK, start, end)
+        if last_break >= 0:
+            line_start = last_break + 1
+        start = end
+
+
+def parse_chunk(text, index, line, line_start):
+    """
+    Worker task: parse a chunk of instructions
+
+    :param text: chunk text
+    :param index: index of the chunk in the source
+    :param line: line number of the chunk start
+    :param line_start: index of the start of that line
+    :return: encoded ast.Program of the chunk instructions
+    :raise: TokenMatchingError or ParsingError, positioned in the source
+    """
+    lexer = StreamLexer(text, chunk_size=max(len(text), 1), index=index, line=line, line_start=line_start,
+                        max_buffer_size=None)
+    return serialize.encode(Parser(lexer).program())
+
+
+def iter_instructions(source, executor, chunk_size=DEFAULT_CHUNK_SIZE, max_pending=None):
+    """
+    Parse a program over a pool of workers
+
+    :param source: program source text
+    :param executor: concurrent.futures.Executor running the workers
+    :param chunk_size: minimum number of characters of a chunk, except the last one
+    :param max_pending: maximum number of chunks in flight, unbounded by default
+    :return: generator of instruction AST nodes, in source order
+    :raise: TokenMatchingError or ParsingError of the first invalid chunk
+    """
+    pending = deque()
+    for chunk in iter_chunks(source, chunk_size):
+        pending.append(executor.submit(parse_chunk, *chunk))
+        if max_pending is not None and len(pending) >= max_pending:
+            yield from serialize.decode(pending.popleft().result()).instructions
+    while pending:
+        yield from serialize.decode(pending.popleft().result()).instructions
+
+
+def parse(source, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Parse a program over a pool of worker processes, started and shut down by the call.
+    Sources made of a single chunk are parsed in the calling process.
+
+    :param source: program source text
+    :param workers: number of worker processes, os.cpu_count() by default
+    :param chunk_size: minimum number of characters of a chunk, except the last one
+    :return: ast.Program
+    :raise: TokenMatchingError or ParsingError of the first invalid instruction
+    """
+    if len(source) <= chunk_size:
+        return Parser(StreamLexer(source, chunk_size=max(len(source), 1), max_buffer_size=None)).program()
+    with ProcessPoolExecutor(workers) as executor:
+        return ast.Program(list(iter_instructions(source, executor, chunk_size)))
@@ -1,5 +1,22 @@
 from . import ast
 from apl.tokens import token_type
+from apl.tokens.token_type import NUMBER_KIND, IDENTIFIER_KIND, OPEN_PAR_KIND
+
+
+# binary operator token kind -> precedence, higher binding tighter
+BINARY_PRECEDENCE = {
+    token_type.PLUS_KIND: 1,
+    token_type.MINUS_KIND: 1,
+    token_type.MULT_KIND: 2,
+    token_type.DIV_KIND: 2,
+}
+# precedence above every binary operator, making an expression a single factor
+FACTOR_PRECEDENCE = 3
+# prefix operator token kind -> AST node class
+PREFIX_OPERATORS = {
+    token_type.REDUCE_KIND: ast.Reduce,
+    token_type.SCAN_KIND: ast.Scan,
+}
 
 
 class ParsingError(Exception):
@@ -15,6 +32,7 @@ class Parser:
     A Parser instance is defined by:
         - Lexer: a lexer instance that will generate token stream
         - Token: current token that the parser process
+    Tokens are matched by their integer kind (see token_type.KINDS).
     """
     def __init__(self, lexer):
         self.lexer = lexer
@@ -24,56 +42,48 @@ class Parser:
         """
         Method raising error when the parser instance find an unexpected token
 
-        :param expected: Token expected
-        :type expected: apl.tokens.Tokens
+        :param expected: kind code of the expected token
         :return: None
         :raise ParsingError
         """
-        raise ParsingError('Syntax error: expecting {} and found {} {}'.format(
-            expected,
+        message = 'Syntax error: expecting {} and found {} {}'.format(
+            token_type.KINDS[expected],
             self.current_token.typename,
             self.current_token.value
-        ))
+        )
+        if self.current_token.line is not None:
+            message += ' at line {} column {}'.format(self.current_token.line, self.current_token.column)
+        raise ParsingError(message)
 
-    def consume(self, t_type):
+    def consume(self, kind):
         """
-        Consume a token of the given `t_type` from the lexer token stream
+        Consume a token of the given `kind` from the lexer token stream
 
-        :param t_type: token type
-        :type t_type: str()
+        :param kind: token kind code
+        :type kind: int()
         :return: None
         :rtype: None
-        :raise: ParsingError() if the consumed token type does not match the given `t_type`
+        :raise: ParsingError() if the consumed token kind does not match the given `kind`
         """
-        if self.current_token.typename == t_type:
+        if self.current_token.kind == kind:
             self.current_token = self.lexer.get_next_token()
         else:
-            self.error(token_type)
+            self.error(kind)
 
     def factor(self):
         """
         Generate a `factor` from the Lexer token stream.
         A factor is defined by the following rule:
 
-        factor := NUMBER | OPEN_PAR expr CLOSING_PAR | IDENTIFIER
+        factor := NUMBER (NUMBER)* | (REDUCE | SCAN) expr | OPEN_PAR expr CLOSING_PAR | IDENTIFIER
+
+        Several space-separated NUMBERs make a vector literal.
+        Like in APL, a reduction or a scan applies to the whole expression on its right.
 
         :return: `factor` AST Node
         :raise: ParsingError when token stream was not able to generate a `factor`
         """
-        token = self.current_token
-        if token.typename == token_type.NUMBER:
-            self.consume(token_type.NUMBER)
-            return ast.Number(token)
-        elif token.typename == token_type.OPEN_PAR:
-            self.consume(token_type.OPEN_PAR)
-            expr_node = self.expr()
-            self.consume(token_type.CLOSING_PAR)
-            return expr_node
-        elif token.typename == token_type.IDENTIFIER:
-            self.consume(token_type.IDENTIFIER)
-            return ast.VarEval(token)
-        else:
-            self.error(token_type.NUMBER)
+        return self.expression(FACTOR_PRECEDENCE)
 
     def term(self):
         """
@@ -85,16 +95,7 @@ class Parser:
         :return: `term` AST Node
         :raise: ParsingError if the token stream does not contains a `term`
         """
-        node = self.factor()
-        while self.current_token.typename in (token_type.MULT, token_type.DIV):
-            operator_token = self.current_token
-            if operator_token.typename == token_type.MULT:
-                self.consume(token_type.MULT)
-            elif operator_token.typename == token_type.DIV:
-                self.consume(token_type.DIV)
-
-            node = ast.BinaryOperator(operator=operator_token, left=node, right=self.factor())
-        return node
+        return self.expression(BINARY_PRECEDENCE[token_type.MULT_KIND])
 
     def expr(self):
         """
@@ -102,16 +103,79 @@ class Parser:
 
         :return: expr AST node
         """
-        node = self.term()
-        while self.current_token.typename in (token_type.PLUS, token_type.MINUS):
-            operator_token = self.current_token
-            if operator_token.typename == token_type.PLUS:
-                self.consume(token_type.PLUS)
-            elif operator_token.typename == token_type.MINUS:
-                self.consume(token_type.MINUS)
+        return self.expression()
+
+    def expression(self, min_precedence=0):
+        """
+        Generate an expression AST node by precedence climbing over explicit stacks, so that the
+        nesting depth of expressions is not limited by recursion:
+            - operands: AST nodes of the operands parsed so far
+            - operators: tokens of the binary operators waiting for their right operand, and of the
+              OPEN_PAR, REDUCE and SCAN opening the groups being parsed
+        The expression ends at the first token which is not a binary operator, or is a binary operator
+        of lower precedence than 'min_precedence' outside of any group.
 
-            node = ast.BinaryOperator(operator=operator_token, left=node, right=self.term())
-        return node
+        :param min_precedence: lowest precedence of the binary operators of the expression
+        :return: expression AST node
+        :raise: ParsingError if the token stream does not contain an expression
+        """
+        operands = []
+        operators = []
+        groups = 0
+        next_token = self.lexer.get_next_token
+        precedences = BINARY_PRECEDENCE
+        token = self.current_token
+        # tokens are checked before being consumed, the current token is kept in `token` and only
+        # written back to `current_token` before returning or raising
+        while True:
+            kind = token.kind
+            if kind == NUMBER_KIND:
+                number_token = token
+                token = next_token()
+                if token.kind != NUMBER_KIND:
+                    operands.append(ast.Number(number_token))
+                else:
+                    tokens = [number_token]
+                    while token.kind == NUMBER_KIND:
+                        tokens.append(token)
+                        token = next_token()
+                    operands.append(ast.Vector(tokens))
+            elif kind == IDENTIFIER_KIND:
+                operands.append(ast.VarEval(token))
+                token = next_token()
+            elif kind == OPEN_PAR_KIND or kind in PREFIX_OPERATORS:
+                operators.append(token)
+                groups += 1
+                token = next_token()
+                continue
+            else:
+                self.current_token = token
+                self.error(NUMBER_KIND)
+
+            # an operand was parsed: apply the operators it ends, until a binary operator follows
+            while True:
+                precedence = precedences.get(token.kind)
+                if precedence is not None and (groups or precedence >= min_precedence):
+                    while operators and precedences.get(operators[-1].kind, 0) >= precedence:
+                        right = operands.pop()
+                        operands[-1] = ast.BinaryOperator(operators.pop(), operands[-1], right)
+                    operators.append(token)
+                    token = next_token()
+                    break
+                while operators and operators[-1].kind in precedences:
+                    right = operands.pop()
+                    operands[-1] = ast.BinaryOperator(operators.pop(), operands[-1], right)
+                if not operators:
+                    self.current_token = token
+                    return operands.pop()
+                group = operators.pop()
+                groups -= 1
+                if group.kind == OPEN_PAR_KIND:
+                    self.current_token = token
+                    self.consume(token_type.CLOSING_PAR_KIND)
+                    token = self.current_token
+                else:
+                    operands[-1] = PREFIX_OPERATORS[group.kind](group, operands[-1])
 
     def right_op(self):
         """
@@ -127,14 +191,14 @@ class Parser:
 
         :return:
         """
-        if self.current_token.typename == token_type.WORD_VAR:
-            self.consume(token_type.WORD_VAR)
+        if self.current_token.kind == token_type.WORD_VAR_KIND:
+            self.consume(token_type.WORD_VAR_KIND)
             var_name_token = self.current_token
-            self.consume(token_type.IDENTIFIER)
+            self.consume(token_type.IDENTIFIER_KIND)
             return ast.VarInit(var_name_token)
         else:
             var_name_token = self.current_token
-            self.consume(token_type.IDENTIFIER)
+            self.consume(token_type.IDENTIFIER_KIND)
             return ast.Var(var_name_token)
 
     def assign(self):
@@ -144,7 +208,7 @@ class Parser:
         :return:
         """
         left_op = self.left_op()
-        self.consume(token_type.EQUAL)
+        self.consume(token_type.EQUAL_KIND)
         right_opt = self.right_op()
         return ast.Assignation(left_op, right_opt)
 
@@ -155,7 +219,7 @@ class Parser:
         :return:
         """
         instruction = self.assign()
-        self.consume(token_type.TERMINATOR)
+        self.consume(token_type.TERMINATOR_KIND)
         return instruction
 
     def program(self):
@@ -164,13 +228,20 @@ class Parser:
 
         :return:
         """
-        instructions = []
-        while self.current_token.typename != token_type.EOF:
-            instructions.append(self.instruction())
-        return ast.Program(instructions)
+        return ast.Program(list(self.iter_instructions()))
+
+    def iter_instructions(self):
+        """
+        Generate the instructions of a program one at a time, each one being parsed when requested
+
+        :return: generator of instruction AST nodes
+        :raise: ParsingError when reaching an invalid instruction
+        """
+        while self.current_token.kind != token_type.EOF_KIND:
+            yield self.instruction()
 
     def parse(self):
         tree = self.program()
-        if self.current_token.typename != token_type.EOF:
-            self.error(token_type.EOF)
+        if self.current_token.kind != token_type.EOF_KIND:
+            self.error(token_type.EOF_KIND)
         return tree
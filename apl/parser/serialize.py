@@ -0,0 +1,167 @@
+"""
+AST serialization
+
+An AST is encoded as the list of its nodes in post-order, each node being a tuple made of a node code
+followed by its attributes. Children are found on a stack while decoding, so that encoding and decoding
+do not recurse and the encoded form only contains lists, tuples, ints and strings (it can be given
+to marshal or pickle, or sent between processes).
+"""
+import gc
+import marshal
+
+from . import ast
+from apl.tokens.tokens import Token
+from apl.tokens import token_type
+
+
+NUMBER_NODE = 0
+VAR_EVAL_NODE = 1
+VAR_NODE = 2
+VAR_INIT_NODE = 3
+BINARY_OPERATOR_NODE = 4
+ASSIGNATION_NODE = 5
+PROGRAM_NODE = 6
+SHARED_EXPR_NODE = 7
+SHARED_REF_NODE = 8
+VECTOR_NODE = 9
+REDUCE_NODE = 10
+SCAN_NODE = 11
+
+
+class SerializationError(Exception):
+    pass
+
+
+def encode(tree):
+    """
+    Encode an AST
+
+    :param tree: AST root node
+    :return: list of node tuples in post-order
+    """
+    encoded = []
+    shared_ids = {}
+    stack = [(tree, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if isinstance(node, ast.BinaryOperator):
+            if children_done:
+                encoded.append((BINARY_OPERATOR_NODE, node.operator.typename, node.operator.value))
+            else:
+                stack.extend(((node, True), (node.right, False), (node.left, False)))
+        elif isinstance(node, ast.ArrayOperator):
+            if children_done:
+                code = REDUCE_NODE if isinstance(node, ast.Reduce) else SCAN_NODE
+                encoded.append((code, node.operator.typename, node.operator.value))
+            else:
+                stack.extend(((node, True), (node.expr, False)))
+        elif isinstance(node, ast.Number):
+            encoded.append((NUMBER_NODE, node.value))
+        elif isinstance(node, ast.VarEval):
+            encoded.append((VAR_EVAL_NODE, node.var_name))
+        elif isinstance(node, ast.Vector):
+            encoded.append((VECTOR_NODE, tuple(node.values)))
+        elif isinstance(node, ast.VarInit):
+            encoded.append((VAR_INIT_NODE, node.var_name))
+        elif isinstance(node, ast.Var):
+            encoded.append((VAR_NODE, node.var_name))
+        elif isinstance(node, ast.SharedExpr):
+            if children_done:
+                shared_ids[node] = len(shared_ids)
+                encoded.append((SHARED_EXPR_NODE, shared_ids[node]))
+            elif node in shared_ids:
+                encoded.append((SHARED_REF_NODE, shared_ids[node]))
+            else:
+                stack.extend(((node, True), (node.expr, False)))
+        elif isinstance(node, ast.Assignation):
+            if children_done:
+                encoded.append((ASSIGNATION_NODE,))
+            else:
+                stack.extend(((node, True), (node.right_op, False), (node.left_op, False)))
+        elif isinstance(node, ast.Program):
+            if children_done:
+                encoded.append((PROGRAM_NODE, len(node.instructions)))
+            else:
+                stack.append((node, True))
+                stack.extend((instr, False) for instr in reversed(node.instructions))
+        else:
+            raise SerializationError('Can\'t encode %s node' % type(node).__name__)
+    return encoded
+
+
+def decode(encoded):
+    """
+    Decode an AST encoded by `encode`
+
+    :param encoded: list of node tuples in post-order
+    :return: AST root node
+    """
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    shared = {}
+    # decoded nodes can't form reference cycles, collecting while allocating them is pure overhead
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for entry in encoded:
+            code = entry[0]
+            if code == NUMBER_NODE:
+                push(ast.Number(Token(token_type.NUMBER, entry[1])))
+            elif code == VAR_EVAL_NODE:
+                push(ast.VarEval(Token(token_type.IDENTIFIER, entry[1])))
+            elif code == BINARY_OPERATOR_NODE:
+                right = pop()
+                stack[-1] = ast.BinaryOperator(Token(entry[1], entry[2]), stack[-1], right)
+            elif code == ASSIGNATION_NODE:
+                right_op = pop()
+                stack[-1] = ast.Assignation(stack[-1], right_op)
+            elif code == VAR_NODE:
+                push(ast.Var(Token(token_type.IDENTIFIER, entry[1])))
+            elif code == VAR_INIT_NODE:
+                push(ast.VarInit(Token(token_type.IDENTIFIER, entry[1])))
+            elif code == VECTOR_NODE:
+                push(ast.Vector([Token(token_type.NUMBER, value) for value in entry[1]]))
+            elif code == REDUCE_NODE:
+                stack[-1] = ast.Reduce(Token(entry[1], entry[2]), stack[-1])
+            elif code == SCAN_NODE:
+                stack[-1] = ast.Scan(Token(entry[1], entry[2]), stack[-1])
+            elif code == PROGRAM_NODE:
+                count = entry[1]
+                instructions = stack[len(stack) - count:]
+                del stack[len(stack) - count:]
+                push(ast.Program(instructions))
+            elif code == SHARED_EXPR_NODE:
+                stack[-1] = shared[entry[1]] = ast.SharedExpr(stack[-1])
+            elif code == SHARED_REF_NODE:
+                push(shared[entry[1]])
+            else:
+                raise SerializationError('Unknown node code %s' % code)
+    except (IndexError, KeyError, TypeError) as ex:
+        raise SerializationError('Invalid encoded AST: %s' % ex)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    if len(stack) != 1:
+        raise SerializationError('Invalid encoded AST: %d root nodes' % len(stack))
+    return stack[0]
+
+
+def dumps(tree):
+    """
+    :param tree: AST root node
+    :return: bytes encoding of 'tree'
+    """
+    return marshal.dumps(encode(tree))
+
+
+def loads(data):
+    """
+    :param data: bytes returned by `dumps`
+    :return: AST root node
+    """
+    try:
+        encoded = marshal.loads(data)
+    except (EOFError, ValueError, TypeError) as ex:
+        raise SerializationError('Invalid encoded AST: %s' % ex)
+    return decode(encoded)
@@ -0,0 +1,48 @@
+from unittest import TestCase
+
+from apl.tokens.tokens import Token
+from apl.tokens.token_type import *
+from apl.parser import ast
+
+
+class VarVisitor(ast.ASTNodeVisitor):
+
+    def visit_var(self, node):
+        return 'var', node.var_name
+
+    def visit_var_eval(self, node):
+        return 'eval', node.var_name
+
+
+class NumberVisitor(ast.ASTNodeVisitor):
+
+    def visit_number(self, node):
+        return node.value
+
+
+class TestASTNodeVisitor(TestCase):
+
+    def test_dispatch(self):
+        visitor = VarVisitor()
+
+        self.assertEqual(visitor.visit(ast.VarEval(Token(IDENTIFIER, 'a'))), ('eval', 'a'))
+        self.assertEqual(visitor.visit(ast.Var(Token(IDENTIFIER, 'a'))), ('var', 'a'))
+
+    def test_subclass_fallback(self):
+        visitor = VarVisitor()
+
+        self.assertEqual(visitor.visit(ast.VarInit(Token(IDENTIFIER, 'a'))), ('var', 'a'))
+
+    def test_default_visit(self):
+        visitor = VarVisitor()
+
+        with self.assertRaisesRegex(Exception, 'No existing visitor method for Number'):
+            visitor.visit(ast.Number(Token(NUMBER, '1')))
+
+    def test_dispatch_table_per_visitor_class(self):
+        node = ast.Number(Token(NUMBER, '1'))
+        NumberVisitor().visit(node)
+
+        self.assertIs(NumberVisitor.dispatch_table[ast.Number], NumberVisitor.visit_number)
+        with self.assertRaises(Exception):
+            VarVisitor().visit(node)
@@ -0,0 +1,92 @@
+from unittest import TestCase
+
+from apl.lexer import lexer
+from apl.parser import ast
+from apl.parser import flat
+from apl.parser import parser
+from apl.interpreter import interpreter
+from apl.interpreter import optimizer
+
+
+CODE = 'var a = 2; var b = a * 3 + 1.5 / (a - 4); a = +/1 2 3 * a; var c = -\\ 1 2 3; b = b - 1.5;'
+
+
+def parse(code):
+    return parser.Parser(lexer.Lexer(code)).parse()
+
+
+class TestFlat(TestCase):
+
+    def test_encoding(self):
+        tree = parse(CODE)
+        flat_tree = flat.encode(tree)
+
+        self.assertEqual(len(flat_tree), sum(1 for _ in ast.walk(tree)))
+        self.assertEqual(flat_tree.literals, ['2', '3', '1.5', '4', ('1', '2', '3')])
+        self.assertEqual(flat_tree.names, ['a', 'b', 'c'])
+        self.assertEqual(flat_tree.nbytes, 9 * len(flat_tree) + 4 * 5)
+        self.assertEqual(str(flat_tree.decode()), str(tree))
+        self.assertEqual(str(flat_tree.tree), str(tree))
+
+    def test_shared_expressions(self):
+        tree = optimizer.Optimizer().optimize(parse('var x = (y + 1) * (y + 1);'))
+        flat_tree = flat.encode(tree)
+
+        self.assertEqual(len(flat_tree), 8)
+        decoded = flat_tree.decode().instructions[0].right_op
+        self.assertIs(decoded.left, decoded.right)
+        proxy = flat_tree.tree.instructions[0].right_op
+        self.assertEqual(proxy.left, proxy.right)
+
+    def test_interpreter_adapter(self):
+        tree = parse(CODE)
+        expected = interpreter.Interpreter(None)
+        expected.execute(expected.compile(tree))
+
+        apl_interpreter = interpreter.Interpreter(None)
+        self.assertTrue(apl_interpreter.execute(flat.encode(tree)))
+        self.assertEqual(str(apl_interpreter.symbol_table), str(expected.symbol_table))
+
+    def test_slotted_nodes(self):
+        for node in ast.walk(parse(CODE)):
+            self.assertFalse(hasattr(node, '__dict__'), type(node).__name__)
+
+    def test_deep_expressions(self):
+        depth = 20000
+        code = 'var x = 2; var y = %sx%s; var z = %s;' % ('(1 + ' * depth, ')' * depth, ' - '.join(['1'] * depth))
+        apl_interpreter = interpreter.Interpreter(None)
+
+        self.assertTrue(apl_interpreter.execute(flat.encode(parse(code))))
+        self.assertDictEqual(apl_interpreter.symbol_table, {'x': 2, 'y': depth + 2, 'z': 2 - depth})
+
+    def test_shared_expressions_and_errors(self):
+        tree = optimizer.Optimizer().optimize(parse('var y = 3; var x = (y + 1) * (y + 1) - +/1 2 * y;'))
+        apl_interpreter = interpreter.Interpreter(None)
+        self.assertTrue(apl_interpreter.execute(flat.encode(tree)))
+        self.assertEqual(apl_interpreter.symbol_table['x'], 7)
+
+        apl_interpreter.report_error = lambda ex: messages.append(str(ex))
+        messages = []
+        self.assertFalse(apl_interpreter.execute(flat.encode(parse('var a = 1; b = a;'))))
+        self.assertFalse(apl_interpreter.execute(flat.encode(parse('var c = d;'))))
+        self.assertListEqual(
+            messages, ['Can\'t assign value to undeclared \'b\' variable', 'Variable d doesn\'t exist']
+        )
+
+    def test_compile_proxy_tree(self):
+        expected = interpreter.Interpreter(None)
+        expected.execute(expected.compile(parse(CODE)))
+        for engine in interpreter.ENGINES:
+            for optimize in (False, True):
+                with self.subTest(engine=engine, optimize=optimize):
+                    flat_tree = flat.encode(parse(CODE))
+                    apl_interpreter = interpreter.Interpreter(None, engine=engine, optimize=optimize)
+
+                    self.assertTrue(apl_interpreter.execute(apl_interpreter.compile(flat_tree.tree)))
+                    self.assertEqual(str(apl_interpreter.symbol_table), str(expected.symbol_table))
+
+    def test_execute_with_compiling_engines(self):
+        for engine in (interpreter.VM_ENGINE, interpreter.PYTHON_ENGINE):
+            with self.subTest(engine=engine):
+                with self.assertRaisesRegex(ValueError, 'executed by the tree engine'):
+                    interpreter.Interpreter(None, engine=engine).execute(flat.encode(parse(CODE)))
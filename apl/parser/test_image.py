@@ -0,0 +1,139 @@
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+from unittest import TestCase
+
+from apl.lexer import lexer
+from apl.parser import flat
+from apl.parser import image
+from apl.parser import parser
+from apl.interpreter import interpreter
+
+
+CODE = 'var a = 2; var b = a * 3 + 1.5 / (a - 4); a = +/1 2 3 * a; var c = -\\ 1 2 3; b = b - 1.5;'
+
+
+def parse(code):
+    return parser.Parser(lexer.Lexer(code)).parse()
+
+
+def patch_payload(data, offset, values):
+    """
+    :return: copy of the image 'data' with 'values' written at 'offset' in its payload, with a valid crc32
+    """
+    data = bytearray(data)
+    data[image.HEADER.size + offset:image.HEADER.size + offset + len(values)] = values
+    header = list(image.HEADER.unpack_from(data))
+    header[-1] = zlib.crc32(data[image.HEADER.size:])
+    return bytes(image.HEADER.pack(*header)) + bytes(data[image.HEADER.size:])
+
+
+def execute(compiled):
+    apl_interpreter = interpreter.Interpreter(None)
+    apl_interpreter.execute(compiled)
+    return apl_interpreter.symbol_table
+
+
+class TestImage(TestCase):
+
+    def test_round_trip(self):
+        tree = parse(CODE)
+        flat_tree = image.loads(image.dumps(tree))
+
+        self.assertIsInstance(flat_tree.opcodes, memoryview)
+        self.assertEqual(list(flat_tree.literals), ['2', '3', '1.5', '4', ('1', '2', '3')])
+        self.assertEqual(list(flat_tree.names), ['a', 'b', 'c'])
+        self.assertEqual(str(flat_tree.decode()), str(tree))
+        self.assertEqual(str(execute(flat_tree)), str(execute(interpreter.Interpreter(None).compile(parse(CODE)))))
+
+    def test_invalid_images(self):
+        data = bytearray(image.dumps(parse(CODE)))
+        self.assertIsInstance(image.loads(data), flat.FlatTree)
+
+        with self.assertRaisesRegex(image.ImageError, 'Not a program image'):
+            image.loads(b'APLC' + data[4:])
+        with self.assertRaisesRegex(image.ImageError, 'Unsupported image format version 2'):
+            image.loads(data[:4] + b'\x02' + data[5:])
+        with self.assertRaisesRegex(image.ImageError, 'payload size'):
+            image.loads(data[:-1])
+        data[-20] ^= 1
+        with self.assertRaisesRegex(image.ImageError, 'checksum'):
+            image.loads(data)
+        self.assertIsInstance(image.loads(data, verify=False), flat.FlatTree)
+
+    def test_mapped_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'program' + image.IMAGE_SUFFIX)
+            image.dump(parse(CODE), path)
+
+            with image.load(path) as program_image:
+                self.assertIsInstance(program_image.map, mmap.mmap)
+                symbol_table = execute(program_image.flat)
+            self.assertEqual(str(symbol_table), str(execute(interpreter.Interpreter(None).compile(parse(CODE)))))
+            self.assertTrue(program_image.map.closed)
+
+    def test_malformed_arrays(self):
+        flat_tree = flat.encode(parse(CODE))
+        data = image.dumps(flat_tree)
+        node_count = len(flat_tree)
+        first_offset = node_count + image.align(node_count)
+        binary = next(index for index, opcode in enumerate(flat_tree.opcodes) if opcode == flat.PLUS)
+        literals = flat_tree.literals
+
+        with self.assertRaisesRegex(image.ImageError, 'Unknown opcode 200 of node 0'):
+            image.loads(patch_payload(data, 0, b'\xc8'))
+        with self.assertRaisesRegex(image.ImageError, 'Invalid operand of node %s' % binary):
+            image.loads(patch_payload(data, first_offset + 4 * binary, struct.pack('<i', binary)))
+        with self.assertRaisesRegex(image.ImageError, 'Invalid operand of node 0'):
+            image.loads(patch_payload(data, first_offset, struct.pack('<i', len(literals))))
+        with self.assertRaisesRegex(image.ImageError, 'Invalid operand of node 0'):
+            image.loads(patch_payload(data, 0, bytes([flat.VECTOR])))
+        with self.assertRaisesRegex(image.ImageError, 'Invalid operand of node 1'):
+            image.loads(patch_payload(data, first_offset + 4, struct.pack('<i', -1)))
+
+        node_section = first_offset + 8 * node_count + 4 * len(flat_tree.extra)
+        kinds_offset = node_section + image.align(node_section)
+        offsets_offset = kinds_offset + len(literals) + image.align(kinds_offset + len(literals))
+        with self.assertRaisesRegex(image.ImageError, 'Invalid literal offset 0 at index 2'):
+            image.loads(patch_payload(data, offsets_offset + 8, struct.pack('<I', 0)))
+
+    def test_node_types(self):
+        flat_tree = flat.encode(parse('var a = 1; var b = a + 2;'))
+        data = image.dumps(flat_tree)
+        self.assertEqual(list(flat_tree.opcodes), [
+            flat.VAR_INIT, flat.NUMBER, flat.ASSIGNATION, flat.VAR_INIT, flat.VAR_EVAL, flat.NUMBER, flat.PLUS,
+            flat.ASSIGNATION, flat.PROGRAM,
+        ])
+        first_offset = 16
+        second_offset = first_offset + 4 * 9 + 4
+        extra_offset = second_offset + 4 * 9 + 4
+
+        invalid_nodes = [
+            # program instruction which isn't an assignation
+            (8, extra_offset, struct.pack('<i', 6)),
+            # operator operand which isn't an expression
+            (6, first_offset + 4 * 6, struct.pack('<i', 3)),
+            # assigned value which isn't an expression
+            (7, second_offset + 4 * 7, struct.pack('<i', 3)),
+            # shared expression, reduction and scan of a variable declaration
+            (4, 4, bytes([flat.SHARED_EXPR])),
+            (4, 4, bytes([flat.REDUCE])),
+            (4, 4, bytes([flat.SCAN])),
+        ]
+        for index, offset, values in invalid_nodes:
+            with self.subTest(index=index, values=values):
+                with self.assertRaisesRegex(image.ImageError, 'Invalid operand of node %s' % index):
+                    image.loads(patch_payload(data, offset, values))
+
+        header = list(image.HEADER.unpack_from(data))
+        header[3] = 3
+        with self.assertRaisesRegex(image.ImageError, 'Invalid image root node 3'):
+            image.loads(image.HEADER.pack(*header) + data[image.HEADER.size:])
+
+    def test_deep_expressions(self):
+        depth = 5000
+        code = 'var x = %s;' % ' + '.join(['1'] * depth)
+
+        self.assertEqual(execute(image.loads(image.dumps(parse(code)))), {'x': depth})
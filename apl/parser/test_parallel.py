@@ -0,0 +1,47 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest import TestCase
+
+from apl.lexer import lexer
+from apl.parser import ast
+from apl.parser import parallel
+from apl.parser import parser
+
+
+SOURCE = '\n'.join(
+    ['var x = 1;', 'var z = 3; var y = x + 2;'] +
+    ['x = x * %d - y / 2; y = x + +/1 2 %d;' % (index, index) for index in range(50)]
+)
+
+
+class TestParallel(TestCase):
+
+    def test_chunks(self):
+        source = SOURCE + '\n"a;b"; x = 1;\n;'
+        chunks = list(parallel.iter_chunks(source, chunk_size=16))
+
+        self.assertEqual(''.join(text for text, _, _, _ in chunks), source)
+        self.assertGreater(len(chunks), 50)
+        for text, index, line, line_start in chunks:
+            self.assertTrue(text.endswith(';'))
+            self.assertEqual(line, source.count('\n', 0, index) + 1)
+            self.assertEqual(line_start, source.rfind('\n', 0, index) + 1)
+        # terminators following a string delimiter on their line are never split points
+        self.assertEqual(chunks[-1][0], '\n"a;b"; x = 1;\n;')
+
+    def test_same_tree(self):
+        expected = str(parser.Parser(lexer.Lexer(SOURCE)).parse())
+
+        with ThreadPoolExecutor(2) as executor:
+            instructions = list(parallel.iter_instructions(SOURCE, executor, chunk_size=32, max_pending=3))
+        self.assertEqual(str(ast.Program(instructions)), expected)
+        self.assertEqual(str(parallel.parse(SOURCE, workers=2, chunk_size=64)), expected)
+        self.assertEqual(str(parallel.parse(SOURCE)), expected)
+
+    def test_error_position(self):
+        source = SOURCE + '\nx = 1 ( 2;\ny = ?;'
+
+        with ProcessPoolExecutor(2) as executor:
+            with self.assertRaisesRegex(parser.ParsingError, 'at line 53 column 7'):
+                list(parallel.iter_instructions(source, executor, chunk_size=32))
+        with self.assertRaisesRegex(lexer.TokenMatchingError, r'index 34 \(line 2, column 24\)'):
+            parallel.parse(source.replace('x + 2;', 'x + ?;'), workers=2, chunk_size=32)
@@ -0,0 +1,49 @@
+from unittest import TestCase
+
+from apl.lexer import lexer
+from apl.parser import ast
+from apl.parser import parser
+
+
+def parse(code):
+    return parser.Parser(lexer.Lexer(code)).parse()
+
+
+class TestParser(TestCase):
+
+    def test_precedence(self):
+        tree = parser.Parser(lexer.Lexer('1 - 2 - 3 * 4 / x + (5 - 6)')).expr()
+
+        self.assertEqual(
+            str(tree),
+            "ast.binary.operator<ast.binary.operator<ast.binary.operator<ast.number<1>, Token(MINUS, '-'), "
+            "ast.number<2>>, Token(MINUS, '-'), ast.binary.operator<ast.binary.operator<ast.number<3>, "
+            "Token(MULT, '*'), ast.number<4>>, Token(DIV, '/'), ast.var.eval<x>>>, Token(PLUS, '+'), "
+            "ast.binary.operator<ast.number<5>, Token(MINUS, '-'), ast.number<6>>>"
+        )
+
+    def test_term_and_factor(self):
+        term_parser = parser.Parser(lexer.Lexer('2 * 3 + 4'))
+        factor_parser = parser.Parser(lexer.Lexer('(1 + 2) * 3'))
+
+        self.assertEqual(str(term_parser.term()), "ast.binary.operator<ast.number<2>, Token(MULT, '*'), ast.number<3>>")
+        self.assertEqual(term_parser.current_token.value, '+')
+        self.assertIsInstance(factor_parser.factor(), ast.BinaryOperator)
+        self.assertEqual(factor_parser.current_token.value, '*')
+
+    def test_errors(self):
+        with self.assertRaisesRegex(parser.ParsingError, 'expecting CLOSING_PAR and found TERMINATOR'):
+            parse('var x = (1 + 2;')
+        with self.assertRaisesRegex(parser.ParsingError, 'expecting NUMBER and found TERMINATOR'):
+            parse('var x = 1 + ;')
+        with self.assertRaisesRegex(parser.ParsingError, 'expecting TERMINATOR and found CLOSING_PAR'):
+            parse('var x = 1);')
+
+    def test_deep_nesting(self):
+        depth = 20000
+        tree = parse('var x = %s1%s;' % ('(1 + ' * depth, ')' * depth))
+
+        node = tree.instructions[0].right_op
+        for _ in range(depth):
+            node = node.right
+        self.assertIsInstance(node, ast.Number)
@@ -0,0 +1,200 @@
+"""
+Profiling and per-phase instrumentation
+
+Profile a program through its phases:
+    - lex: time spent in Lexer.get_next_token, and token count per token type
+    - parse: time spent in Parser.parse, lexing excluded
+    - compile: optimizer passes and engine compilation
+    - execute: program evaluation
+With the tree engine, node visits are also counted and timed per node type, and each instruction of a
+program is timed with the line it starts on. Other engines don't visit nodes: their profile only holds
+the phases and token counts, and a warning saying so.
+
+Instrumentation wraps the methods of a Lexer or Interpreter instance by binding timed versions on the
+instance itself: classes are left unchanged, so uninstrumented instances run without any overhead.
+An instrumented interpreter visits every node recursively instead of evaluating expressions over an
+explicit stack, so that each visit can be timed.
+"""
+import json
+import time
+
+from apl.lexer.stream import StreamLexer
+from apl.parser import ast
+from apl.parser.parser import Parser
+from apl.interpreter.interpreter import Interpreter, TREE_ENGINE
+
+
+LEX = 'lex'
+PARSE = 'parse'
+COMPILE = 'compile'
+EXECUTE = 'execute'
+PHASES = (LEX, PARSE, COMPILE, EXECUTE)
+
+NO_NODE_STATS = 'node_stats and instructions are only collected with the tree engine, not the %s engine'
+
+
+class NodeStats:
+    """
+    Visits of a node type:
+        - count: number of visits
+        - total_seconds: time spent visiting nodes of the type, children included.
+          The visit of a node nested in a node of the same type is only counted once.
+        - self_seconds: time spent visiting nodes of the type, children excluded
+    """
+    __slots__ = ('count', 'total_seconds', 'self_seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.self_seconds = 0.0
+
+    def to_dict(self):
+        return {'count': self.count, 'total_seconds': self.total_seconds, 'self_seconds': self.self_seconds}
+
+
+class Profile:
+    """
+    Measures collected by the instrumented phases of a program:
+        - phases: dict phase -> wall time in seconds
+        - token_counts: dict token typename -> number of tokens
+        - node_stats: dict AST node class name -> NodeStats
+        - instructions: list of dict (index, line, seconds) of each instruction evaluated by a program
+        - warnings: list of messages about the measures which couldn't be collected
+        - result: evaluation result
+    """
+
+    def __init__(self):
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.token_counts = {}
+        self.node_stats = {}
+        self.instructions = []
+        self.warnings = []
+        self.result = None
+
+    @property
+    def token_count(self):
+        return sum(self.token_counts.values())
+
+    def to_dict(self):
+        return {
+            'phases': dict(self.phases),
+            'token_count': self.token_count,
+            'token_counts': dict(self.token_counts),
+            'node_stats': {name: stats.to_dict() for name, stats in self.node_stats.items()},
+            'instructions': list(self.instructions),
+            'warnings': list(self.warnings),
+        }
+
+    def to_json(self, **kwargs):
+        """
+        :param kwargs: json.dumps arguments
+        :return: JSON encoding of `to_dict`
+        """
+        return json.dumps(self.to_dict(), **kwargs)
+
+
+def instrument_lexer(lexer, profile):
+    """
+    Time and count the tokens generated by a lexer instance
+
+    :param lexer: Lexer or StreamLexer instance
+    :param profile: Profile collecting the measures
+    :return: 'lexer'
+    """
+    get_next_token = lexer.get_next_token
+    phases = profile.phases
+    token_counts = profile.token_counts
+    perf_counter = time.perf_counter
+
+    def timed_get_next_token():
+        start = perf_counter()
+        token = get_next_token()
+        phases[LEX] += perf_counter() - start
+        token_counts[token.typename] = token_counts.get(token.typename, 0) + 1
+        return token
+
+    lexer.get_next_token = timed_get_next_token
+    return lexer
+
+
+def instrument_interpreter(interpreter, profile):
+    """
+    Count and time the node visits of an interpreter instance, and the instructions of programs
+
+    :param interpreter: Interpreter instance
+    :param profile: Profile collecting the measures
+    :return: 'interpreter'
+    """
+    visit = interpreter.visit
+    node_stats = profile.node_stats
+    instructions = profile.instructions
+    perf_counter = time.perf_counter
+    # (visited node, time spent in its child visits) of the visits in progress
+    stack = [(None, 0.0)]
+    active = {}
+
+    def timed_visit(node):
+        parent = stack[-1][0]
+        name = node.__class__.__name__
+        stats = node_stats.get(name)
+        if stats is None:
+            stats = node_stats[name] = NodeStats()
+        active[name] = active.get(name, 0) + 1
+        stack.append((node, 0.0))
+        start = perf_counter()
+        try:
+            return visit(node)
+        finally:
+            elapsed = perf_counter() - start
+            _, children_seconds = stack.pop()
+            parent_node, parent_children_seconds = stack[-1]
+            stack[-1] = (parent_node, parent_children_seconds + elapsed)
+            active[name] -= 1
+            stats.count += 1
+            stats.self_seconds += elapsed - children_seconds
+            if not active[name]:
+                stats.total_seconds += elapsed
+            if isinstance(parent, ast.Program):
+                token = getattr(getattr(node, 'left_op', None), 'token', None)
+                instructions.append({
+                    'index': len(instructions),
+                    'line': getattr(token, 'line', None),
+                    'seconds': elapsed,
+                })
+
+    interpreter.visit = interpreter.evaluate = timed_visit
+    return interpreter
+
+
+def profile_source(source, engine=TREE_ENGINE, optimize=False, interpreter=None):
+    """
+    Lex, parse, compile and execute a program, measuring each phase.
+    The program is lexed by a StreamLexer, so that the instructions are reported with their line.
+
+    :param source: program source text
+    :param engine: interpreter engine
+    :param optimize: run the optimizer passes
+    :param interpreter: Interpreter instance executing the program, a new one by default
+    :return: Profile, its `result` being the execution result
+    """
+    profile = Profile()
+    perf_counter = time.perf_counter
+    if interpreter is None:
+        interpreter = Interpreter(None, engine=engine, optimize=optimize)
+    if interpreter.engine == TREE_ENGINE:
+        instrument_interpreter(interpreter, profile)
+    else:
+        profile.warnings.append(NO_NODE_STATS % interpreter.engine)
+
+    start = perf_counter()
+    tree = Parser(instrument_lexer(StreamLexer(source), profile)).parse()
+    profile.phases[PARSE] = perf_counter() - start - profile.phases[LEX]
+
+    start = perf_counter()
+    compiled = interpreter.compile(tree)
+    profile.phases[COMPILE] = perf_counter() - start
+
+    start = perf_counter()
+    profile.result = interpreter.execute(compiled)
+    profile.phases[EXECUTE] = perf_counter() - start
+    return profile
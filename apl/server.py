@@ -0,0 +1,223 @@
+"""
+asyncio evaluation server
+
+Serve evaluation requests on a TCP or Unix socket. The protocol is line-delimited JSON:
+    - request: {"id": <any>, "source": "<program>"}
+      response: {"id": <any>, "success": <bool>, "symbol_table": {...}, "error": <str or null>}
+    - request: {"command": "stats"}
+      response: {"latency": {"count", "p50", "p90", "p99", "max"}, "pending", "completed", "timeouts", ...}
+
+Requests of a connection are evaluated concurrently and their responses are written as soon as they are
+ready, so clients pipelining requests must match responses by id.
+Programs are evaluated by a bounded pool of workers (see apl.batch), each request with a fresh symbol table.
+Once `max_pending` evaluations are in flight, connections are no longer read until one of them is over:
+clients are slowed down by the socket buffers instead of queueing unbounded work.
+A request running longer than `timeout` seconds gets a timeout error response; its evaluation can't be
+interrupted and keeps its worker (and its pending slot) until it is over.
+A request line longer than `line_limit` bytes gets an invalid request response and its connection is
+closed, once the responses of its other requests are written.
+"""
+import asyncio
+from collections import deque
+import json
+import math
+import os
+import time
+
+from apl import batch
+from apl.interpreter.arrays import json_default
+from apl.interpreter.interpreter import TREE_ENGINE
+
+
+DEFAULT_MAX_PENDING = 64
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_LINE_LIMIT = 1 << 20
+LATENCY_WINDOW = 10000
+STATS_COMMAND = 'stats'
+
+
+class LatencyRecorder:
+    """
+    Keep the latencies of the last `window` requests and compute their percentiles
+    """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+
+    def record(self, latency):
+        self.samples.append(latency)
+        self.count += 1
+
+    @staticmethod
+    def percentile(sorted_samples, percent):
+        # nearest-rank percentile
+        if not sorted_samples:
+            return None
+        return sorted_samples[max(0, math.ceil(percent / 100 * len(sorted_samples)) - 1)]
+
+    def summary(self):
+        """
+        :return: dict of the request count and of the latency percentiles, in milliseconds
+        """
+        sorted_samples = sorted(self.samples)
+        summary = {'count': self.count}
+        for name, percent in (('p50', 50), ('p90', 90), ('p99', 99), ('max', 100)):
+            value = self.percentile(sorted_samples, percent)
+            summary[name] = None if value is None else round(value * 1000, 3)
+        return summary
+
+
+class EvaluationServer:
+    """
+    Long-lived evaluation service dispatching requests to a pool of workers
+    """
+
+    def __init__(self, workers=None, engine=TREE_ENGINE, optimize=False, max_pending=DEFAULT_MAX_PENDING,
+                 timeout=DEFAULT_TIMEOUT, executor=batch.AUTO_EXECUTOR, line_limit=DEFAULT_LINE_LIMIT):
+        """
+        :param workers: number of workers, os.cpu_count() by default
+        :param engine: interpreter engine
+        :param optimize: run the optimizer passes
+        :param max_pending: maximum number of evaluations in flight
+        :param timeout: maximum duration of a request, in seconds, None for no timeout
+        :param executor: batch.AUTO_EXECUTOR, batch.PROCESS_EXECUTOR or batch.THREAD_EXECUTOR
+        :param line_limit: maximum size of a request line, in bytes
+        """
+        self.workers = workers
+        self.engine = engine
+        self.optimize = optimize
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.executor_type = executor
+        self.line_limit = line_limit
+        self.executor = None
+        self.pending_slots = None
+        self.server = None
+        self.latency = LatencyRecorder()
+        self.pending = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.invalid_requests = 0
+
+    async def start(self, host='127.0.0.1', port=0, unix_path=None):
+        """
+        Start the worker pool and listen on a TCP address, or on a Unix socket if 'unix_path' is given
+
+        :return: asyncio.Server
+        """
+        self.executor = batch.create_executor(self.executor_type, self.workers or os.cpu_count() or 1)
+        self.pending_slots = asyncio.Semaphore(self.max_pending)
+        if unix_path is not None:
+            self.server = await asyncio.start_unix_server(self.handle_connection, path=unix_path,
+                                                          limit=self.line_limit)
+        else:
+            self.server = await asyncio.start_server(self.handle_connection, host, port, limit=self.line_limit)
+        return self.server
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def serve_forever(self, **kwargs):
+        await self.start(**kwargs)
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.close()
+
+    def stats(self):
+        return {
+            'latency': self.latency.summary(),
+            'pending': self.pending,
+            'completed': self.completed,
+            'timeouts': self.timeouts,
+            'invalid_requests': self.invalid_requests,
+        }
+
+    def release_slot(self, _):
+        self.pending -= 1
+        self.pending_slots.release()
+
+    async def evaluate(self, request_id, source, started):
+        """
+        Evaluate a program on the worker pool, its pending slot being already acquired
+
+        :return: response dict
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, batch.evaluate_in_worker, source, self.engine, self.optimize)
+        future.add_done_callback(self.release_slot)
+        try:
+            success, symbol_table, error = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            success, symbol_table, error = False, {}, 'TimeoutError: evaluation exceeded %ss' % self.timeout
+        except Exception as ex:
+            success, symbol_table, error = False, {}, '%s: %s' % (type(ex).__name__, ex)
+        self.completed += 1
+        self.latency.record(time.perf_counter() - started)
+        return {'id': request_id, 'success': success, 'symbol_table': symbol_table, 'error': error}
+
+    async def respond(self, writer, write_lock, response):
+        async with write_lock:
+            writer.write(json.dumps(response, default=json_default).encode('utf-8') + b'\n')
+            await writer.drain()
+
+    async def handle_request(self, writer, write_lock, request_id, source, started):
+        response = await self.evaluate(request_id, source, started)
+        try:
+            await self.respond(writer, write_lock, response)
+        except ConnectionError:
+            pass
+
+    async def handle_connection(self, reader, writer):
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # the rest of the oversized line can't be told apart from the next requests
+                    self.invalid_requests += 1
+                    await self.respond(writer, write_lock, {
+                        'id': None, 'success': False, 'symbol_table': {},
+                        'error': 'InvalidRequest: request line exceeds %s bytes' % self.line_limit
+                    })
+                    break
+                if not line:
+                    break
+                started = time.perf_counter()
+                request = None
+                try:
+                    request = json.loads(line)
+                    if request.get('command') == STATS_COMMAND:
+                        await self.respond(writer, write_lock, self.stats())
+                        continue
+                    request_id = request.get('id')
+                    source = request['source']
+                    if not isinstance(source, str):
+                        raise TypeError('source must be a string')
+                except (ValueError, KeyError, TypeError, AttributeError) as ex:
+                    self.invalid_requests += 1
+                    await self.respond(writer, write_lock, {
+                        'id': request.get('id') if isinstance(request, dict) else None,
+                        'success': False, 'symbol_table': {}, 'error': 'InvalidRequest: %s' % ex
+                    })
+                    continue
+                # backpressure: the connection is not read while every pending slot is taken
+                await self.pending_slots.acquire()
+                self.pending += 1
+                task = asyncio.create_task(self.handle_request(writer, write_lock, request_id, source, started))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except ConnectionError:
+            pass
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks)
+            writer.close()
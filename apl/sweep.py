@@ -0,0 +1,107 @@
+"""
+Parameter sweeps: evaluate one program over many input bindings at once
+
+Instead of interpreting a program once per row of a table of bindings, the program is evaluated once
+with each input variable holding its whole column as a NumPy vector: binary operators apply element-wise,
+so each variable of the program ends up holding its column of results.
+
+Only element-wise programs can be swept: vector literals, reductions and scans would mix the rows.
+Row values follow NumPy arithmetic instead of Python's: dividing by zero gives inf or nan for that row
+instead of failing the whole sweep, and integers are 64-bit.
+"""
+from apl.lexer.lexer import Lexer
+from apl.parser import ast
+from apl.parser.parser import Parser
+from apl.interpreter import arrays
+from apl.interpreter.interpreter import Interpreter, TREE_ENGINE
+
+
+NOT_ELEMENT_WISE = 'Programs using %s can\'t be swept, their values depend on whole columns'
+
+
+class SweepError(Exception):
+    """
+    Exception indicating bindings or a program which can't be swept
+    """
+    pass
+
+
+class SweepInterpreter(Interpreter):
+    """
+    Interpreter raising the error which stopped a program instead of printing it
+    """
+
+    def report_error(self, ex):
+        self.last_error = ex
+        raise ex
+
+
+def get_columns(bindings):
+    """
+    Convert a table of bindings to NumPy vectors of the same length
+
+    :param bindings: dict variable name -> column (sequence or vector), or NumPy structured array
+    :return: tuple (dict variable name -> read-only vector, number of rows)
+    :raise: SweepError if the columns are not vectors of the same length
+    """
+    numpy = arrays.get_numpy()
+    if arrays.is_array(bindings):
+        if bindings.dtype.names is None:
+            raise SweepError('Bindings array must be a structured array, one field per variable')
+        bindings = {field: bindings[field] for field in bindings.dtype.names}
+    columns = {}
+    for name, column in bindings.items():
+        vector = numpy.asarray(column)
+        if vector.ndim != 1:
+            raise SweepError('Column \'%s\' is not a vector, its shape is %s' % (name, vector.shape))
+        vector = vector.view()
+        vector.flags.writeable = False
+        columns[name] = vector
+    lengths = {len(vector) for vector in columns.values()}
+    if len(lengths) > 1:
+        raise SweepError('Columns must have the same length, found lengths %s' % sorted(lengths))
+    return columns, lengths.pop() if lengths else 0
+
+
+def check_element_wise(tree):
+    """
+    :param tree: AST root node
+    :raise: SweepError if evaluating 'tree' is not element-wise
+    """
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Vector):
+            raise SweepError(NOT_ELEMENT_WISE % 'vector literals')
+        if isinstance(node, ast.ArrayOperator):
+            raise SweepError(NOT_ELEMENT_WISE % 'reductions or scans')
+
+
+def sweep(program, bindings, engine=TREE_ENGINE, optimize=False, outputs=None):
+    """
+    Evaluate a program for every row of a table of bindings
+
+    :param program: program source text or ast.Program
+    :param bindings: dict variable name -> column (sequence or vector), or NumPy structured array
+    :param engine: interpreter engine
+    :param optimize: run the optimizer passes
+    :param outputs: names of the result columns, by default every variable assigned by the program
+    :return: dict variable name -> vector of its value for each row
+    :raise: SweepError if the bindings or the program can't be swept, the program error if it fails
+    """
+    columns, row_count = get_columns(bindings)
+    tree = Parser(Lexer(program)).parse() if isinstance(program, str) else program
+    check_element_wise(tree)
+
+    sweep_interpreter = SweepInterpreter(None, engine=engine, optimize=optimize)
+    sweep_interpreter.symbol_table.update(columns)
+    sweep_interpreter.execute(sweep_interpreter.compile(tree))
+
+    symbol_table = sweep_interpreter.symbol_table
+    if outputs is None:
+        outputs = [name for name, value in symbol_table.items() if value is not columns.get(name)]
+    results = {}
+    for name in outputs:
+        if name not in symbol_table:
+            raise SweepError('Unknown output variable \'%s\'' % name)
+        # values not depending on any column are the same for every row
+        results[name] = arrays.get_numpy().broadcast_to(symbol_table[name], (row_count,))
+    return results
@@ -0,0 +1,78 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from apl import batch
+from apl.lexer.lexer import Lexer
+from apl.parser.parser import Parser
+from apl.parser import image
+from apl.parser import parser
+from apl.interpreter import interpreter
+
+
+PROGRAMS = [
+    'var x = 1; x = x * 2;',
+    'var x = 1 / 0;',
+    'var y = 3; z = y;',
+    'var x = ;',
+    ('named', 'var x = 2.5 * 2;'),
+]
+
+
+class TestBatch(TestCase):
+
+    def check_results(self, results):
+        self.assertListEqual([result.index for result in results], [0, 1, 2, 3, 4])
+        self.assertEqual(results[0], batch.BatchResult(0, None, True, {'x': 2}, None))
+        self.assertEqual(results[1].error, 'ZeroDivisionError: division by zero')
+        self.assertEqual(results[2].symbol_table, {'y': 3})
+        self.assertEqual(results[2].error, 'ProgrammingError: Can\'t assign value to undeclared \'z\' variable')
+        self.assertTrue(results[3].error.startswith('ParsingError'))
+        self.assertEqual(results[4], batch.BatchResult(4, 'named', True, {'x': 5.0}, None))
+
+    def test_thread_executor(self):
+        for engine in interpreter.ENGINES:
+            results = list(batch.run_batch(PROGRAMS, workers=2, chunk_size=2, prefetch=1,
+                                           executor=batch.THREAD_EXECUTOR, engine=engine))
+
+            self.check_results(results)
+
+    def test_process_executor(self):
+        with batch.BatchRunner(workers=2, chunk_size=1, executor=batch.PROCESS_EXECUTOR) as runner:
+            self.check_results(list(runner.run(PROGRAMS)))
+            self.check_results(list(runner.run(PROGRAMS)))
+
+    def test_scripts(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache_directory = os.path.join(directory, 'cache')
+            paths = []
+            for index, program in enumerate(PROGRAMS[:4]):
+                paths.append(os.path.join(directory, 'script_%s.apl' % index))
+                with open(paths[-1], 'w') as file:
+                    file.write(program)
+
+            results = list(batch.run_scripts(batch.iter_script_paths([directory]), cache_directory, workers=2,
+                                             chunk_size=2, executor=batch.THREAD_EXECUTOR))
+            with patch.object(parser.Parser, 'parse') as parse:
+                cached_results = list(batch.run_scripts(paths[:3], cache_directory, workers=2, chunk_size=2,
+                                                        executor=batch.THREAD_EXECUTOR))
+                parse.assert_not_called()
+
+        self.assertEqual([result.name for result in results], paths)
+        self.assertEqual(results[0].symbol_table, {'x': 2})
+        self.assertEqual(results[2].error, 'ProgrammingError: Can\'t assign value to undeclared \'z\' variable')
+        self.assertTrue(results[3].error.startswith('ParsingError'))
+        self.assertEqual(cached_results, results[:3])
+
+    def test_image(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'program' + image.IMAGE_SUFFIX)
+            image.dump(Parser(Lexer('var y = x * 2; var z = +/1 2 3 * y;')).parse(), path)
+            with batch.BatchRunner(workers=2, chunk_size=2, executor=batch.PROCESS_EXECUTOR) as runner:
+                results = list(runner.run_image(path, [{'x': 1}, ('named', {'x': 0.5}), {}]))
+
+        self.assertEqual(results[0], batch.BatchResult(0, None, True, {'x': 1, 'y': 2, 'z': 12}, None))
+        self.assertEqual(results[1], batch.BatchResult(1, 'named', True, {'x': 0.5, 'y': 1.0, 'z': 6.0}, None))
+        self.assertFalse(results[2].success)
+        self.assertEqual(results[2].error, 'ProgrammingError: Variable x doesn\'t exist')
@@ -0,0 +1,50 @@
+from unittest import TestCase
+import json
+
+from apl import profiling
+from apl.lexer.lexer import Lexer
+from apl.interpreter import interpreter
+
+
+CODE = 'var x = 1;\nvar y = (x + 2) * 3; y = y / 2;'
+
+
+class TestProfiling(TestCase):
+
+    def test_tree_engine(self):
+        profile = profiling.profile_source(CODE)
+
+        self.assertTrue(profile.result)
+        self.assertEqual(profile.token_counts['IDENTIFIER'], 5)
+        self.assertEqual(profile.token_count, 23)
+        self.assertEqual(profile.node_stats['Assignation'].count, 3)
+        self.assertEqual(profile.node_stats['BinaryOperator'].count, 3)
+        self.assertEqual([instruction['index'] for instruction in profile.instructions], [0, 1, 2])
+        self.assertEqual([instruction['line'] for instruction in profile.instructions], [1, 2, 2])
+        self.assertEqual(profile.warnings, [])
+        stats = profile.node_stats['Program']
+        self.assertGreaterEqual(stats.total_seconds, stats.self_seconds)
+        self.assertGreaterEqual(stats.total_seconds, sum(instr['seconds'] for instr in profile.instructions))
+
+    def test_other_engines(self):
+        for engine in (interpreter.VM_ENGINE, interpreter.PYTHON_ENGINE):
+            with self.subTest(engine=engine):
+                profile = profiling.profile_source(CODE, engine=engine, optimize=True)
+
+                self.assertTrue(profile.result)
+                self.assertEqual(profile.node_stats, {})
+                self.assertEqual(profile.warnings, [profiling.NO_NODE_STATS % engine])
+                self.assertGreater(profile.phases[profiling.EXECUTE], 0)
+
+    def test_to_json(self):
+        profile = json.loads(profiling.profile_source('var x = 1;').to_json())
+
+        self.assertListEqual(sorted(profile['phases']), sorted(profiling.PHASES))
+        self.assertEqual(profile['node_stats']['Number']['count'], 1)
+
+    def test_instances_only(self):
+        lexer = profiling.instrument_lexer(Lexer(CODE), profiling.Profile())
+
+        self.assertIn('get_next_token', vars(lexer))
+        self.assertNotIn('get_next_token', vars(Lexer('')))
+        self.assertNotIn('visit', vars(interpreter.Interpreter(None)))
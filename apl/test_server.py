@@ -0,0 +1,83 @@
+from unittest import IsolatedAsyncioTestCase, TestCase
+import asyncio
+import json
+
+from apl import batch
+from apl import server
+
+
+class TestEvaluationServer(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = server.EvaluationServer(workers=2, max_pending=2, executor=batch.THREAD_EXECUTOR)
+        await self.server.start()
+        port = self.server.server.sockets[0].getsockname()[1]
+        self.reader, self.writer = await asyncio.open_connection('127.0.0.1', port)
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        await self.server.close()
+
+    async def request(self, *requests):
+        for request in requests:
+            self.writer.write(json.dumps(request).encode('utf-8') + b'\n')
+        await self.writer.drain()
+        return [json.loads(await self.reader.readline()) for _ in requests]
+
+    async def test_pipelined_requests(self):
+        responses = await self.request(*[{'id': index, 'source': 'var x = %d; x = x * 2;' % index}
+                                         for index in range(10)])
+
+        self.assertListEqual(sorted(response['id'] for response in responses), list(range(10)))
+        for response in responses:
+            self.assertEqual(response['symbol_table'], {'x': response['id'] * 2})
+
+    async def test_errors(self):
+        responses = await self.request({'id': 'a', 'source': 'var x = 1 / 0;'}, {'id': 'b'}, 'not a request')
+        responses = {response['id']: response for response in responses}
+
+        self.assertEqual(responses['a']['error'], 'ZeroDivisionError: division by zero')
+        self.assertTrue(responses['b']['error'].startswith('InvalidRequest'))
+        self.assertTrue(responses[None]['error'].startswith('InvalidRequest'))
+
+    async def test_stats(self):
+        await self.request({'id': 1, 'source': 'var x = 1;'})
+        stats, = await self.request({'command': server.STATS_COMMAND})
+
+        self.assertEqual(stats['latency']['count'], 1)
+        self.assertIsNotNone(stats['latency']['p99'])
+        self.assertEqual(stats['pending'], 0)
+
+    async def test_timeout(self):
+        self.server.timeout = 0
+        response, = await self.request({'id': 1, 'source': 'var x = 1;'})
+
+        self.assertTrue(response['error'].startswith('TimeoutError'))
+
+    async def test_oversized_request(self):
+        await self.server.close()
+        self.writer.close()
+        self.server = server.EvaluationServer(workers=2, executor=batch.THREAD_EXECUTOR, line_limit=100)
+        await self.server.start()
+        port = self.server.server.sockets[0].getsockname()[1]
+        self.reader, self.writer = await asyncio.open_connection('127.0.0.1', port)
+        self.writer.write(json.dumps({'id': 1, 'source': 'var x = 1;'}).encode('utf-8') + b'\n')
+        self.writer.write(json.dumps({'id': 2, 'source': 'var x = %s;' % ' + '.join(['1'] * 100)}).encode('utf-8'))
+        self.writer.write(b'\n')
+        await self.writer.drain()
+        responses = [json.loads(line) for line in (await self.reader.read()).splitlines()]
+
+        self.assertEqual(sorted(response['id'] or 0 for response in responses), [0, 1])
+        error = [response['error'] for response in responses if response['id'] is None][0]
+        self.assertEqual(error, 'InvalidRequest: request line exceeds 100 bytes')
+        self.assertEqual(self.server.stats()['invalid_requests'], 1)
+
+
+class TestLatencyRecorder(TestCase):
+
+    def test_percentiles(self):
+        recorder = server.LatencyRecorder(window=100)
+        for value in range(1, 201):
+            recorder.record(value / 1000)
+
+        self.assertEqual(recorder.summary(), {'count': 200, 'p50': 150.0, 'p90': 190.0, 'p99': 199.0, 'max': 200.0})
@@ -0,0 +1,61 @@
+from unittest import TestCase, skipIf
+
+from apl import batch
+from apl import sweep
+from apl.interpreter import arrays
+from apl.interpreter import errors
+from apl.interpreter import interpreter
+
+
+numpy = arrays.get_numpy() if arrays.has_numpy() else None
+
+PROGRAM = 'var y = x * 2 + rate; var z = (y - 1) / 2; var c = 10;'
+
+
+@skipIf(numpy is None, 'NumPy is not installed')
+class TestSweep(TestCase):
+
+    def test_same_as_batch(self):
+        xs = [1, 2, 3, 4]
+        rates = [0.5, 1.5, 2.5, 3.5]
+        for engine in interpreter.ENGINES:
+            with self.subTest(engine=engine):
+                results = sweep.sweep(PROGRAM, {'x': xs, 'rate': rates}, engine=engine, optimize=True)
+
+                self.assertListEqual(sorted(results), ['c', 'y', 'z'])
+                for row, (x, rate) in enumerate(zip(xs, rates)):
+                    success, symbol_table, _ = batch.evaluate('var x = %s; var rate = %s; %s' % (x, rate, PROGRAM))
+                    self.assertTrue(success)
+                    for name, column in results.items():
+                        self.assertEqual(column[row], symbol_table[name])
+
+    def test_structured_array(self):
+        table = numpy.zeros(3, dtype=[('x', 'int64'), ('rate', 'float64')])
+        table['x'] = [1, 2, 3]
+
+        results = sweep.sweep(PROGRAM, table, outputs=['y'])
+
+        self.assertEqual(results['y'].tolist(), [2.0, 4.0, 6.0])
+
+    def test_invalid_bindings(self):
+        with self.assertRaisesRegex(sweep.SweepError, 'same length'):
+            sweep.sweep(PROGRAM, {'x': [1, 2], 'rate': [1]})
+        with self.assertRaisesRegex(sweep.SweepError, 'is not a vector'):
+            sweep.sweep(PROGRAM, {'x': [[1]], 'rate': [1]})
+        with self.assertRaisesRegex(sweep.SweepError, 'Unknown output'):
+            sweep.sweep(PROGRAM, {'x': [1], 'rate': [1]}, outputs=['w'])
+
+    def test_not_element_wise(self):
+        with self.assertRaisesRegex(sweep.SweepError, 'reductions or scans'):
+            sweep.sweep('var y = +/ x;', {'x': [1, 2]})
+
+    def test_program_error(self):
+        with self.assertRaises(errors.ProgrammingError):
+            sweep.sweep('y = x;', {'x': [1, 2]})
+
+    def test_inputs_are_read_only(self):
+        xs = numpy.arange(3)
+
+        sweep.sweep('x = x + 1;', {'x': xs})
+
+        self.assertEqual(xs.tolist(), [0, 1, 2])
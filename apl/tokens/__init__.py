@@ -1,3 +1,4 @@
 from . import regex_type
 from . import tokens
 from . import token_type
+from . import buffer
@@ -0,0 +1,142 @@
+"""
+Compact token storage
+
+A TokenBuffer stores a token stream as parallel arrays: the token kind codes (see token_type.KINDS)
+and the start/end offsets of each token in the source. Token values are not copied into the buffer,
+they are sliced from the source only when a Token is requested.
+
+A TokenCursor gives the parser shared Token instances for the tokens whose value is known from their
+kind (operators, parentheses, keywords...): only NUMBER, IDENTIFIER and STRING tokens are built with a
+slice of the source.
+"""
+from array import array
+
+from . import token_type
+from .tokens import Token
+
+
+FIXED_VALUES = {
+    token_type.OPEN_PAR: '(',
+    token_type.CLOSING_PAR: ')',
+    token_type.PLUS: '+',
+    token_type.MINUS: '-',
+    token_type.MULT: '*',
+    token_type.DIV: '/',
+    token_type.EQUAL: '=',
+    token_type.WORD_VAR: 'var',
+    token_type.TERMINATOR: ';',
+    token_type.EOF: '',
+}
+# kind code -> shared Token, None for the kinds whose value is read from the source
+SHARED_TOKENS = tuple(
+    Token(typename, FIXED_VALUES[typename]) if typename in FIXED_VALUES else None for typename in token_type.KINDS
+)
+EOF_TOKEN = SHARED_TOKENS[token_type.EOF_KIND]
+# function character -> shared REDUCE and SCAN Tokens
+REDUCE_TOKENS = {function: Token(token_type.REDUCE, function + '/') for function in '+-*/'}
+SCAN_TOKENS = {function: Token(token_type.SCAN, function + '\\') for function in '+-*/'}
+
+
+class TokenBuffer:
+    """
+    Struct-of-arrays token stream.
+    A TokenBuffer instance is defined by:
+        - source: the tokenized string
+        - kinds: array('B') of token kind codes
+        - starts: array('I') of token start offsets in source
+        - ends: array('I') of token end offsets in source
+    """
+    __slots__ = ('source', 'kinds', 'starts', 'ends')
+
+    def __init__(self, source):
+        self.source = source
+        self.kinds = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+
+    def append(self, kind, start, end):
+        """
+        Append a token to the buffer
+
+        :param kind: token kind code
+        :param start: token start offset in source
+        :param end: token end offset in source
+        :return: None
+        """
+        self.kinds.append(kind)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def typename(self, index):
+        """
+        :param index: token index in the buffer
+        :return: typename of the token located at 'index'
+        """
+        return token_type.KINDS[self.kinds[index]]
+
+    def value(self, index):
+        """
+        :param index: token index in the buffer
+        :return: source text of the token located at 'index'
+        """
+        return self.source[self.starts[index]:self.ends[index]]
+
+    def token(self, index):
+        """
+        :param index: token index in the buffer
+        :return: Token located at 'index'
+        """
+        return Token(token_type.KINDS[self.kinds[index]], self.source[self.starts[index]:self.ends[index]])
+
+    def __iter__(self):
+        for index in range(len(self.kinds)):
+            yield self.token(index)
+
+    def cursor(self):
+        """
+        :return: TokenCursor reading the buffer from its first token
+        """
+        return TokenCursor(self)
+
+    def nbytes(self):
+        """
+        :return: memory used by the buffer arrays, in bytes
+        """
+        return sum(len(values) * values.itemsize for values in (self.kinds, self.starts, self.ends))
+
+
+class TokenCursor:
+    """
+    Read a TokenBuffer token by token.
+    A TokenCursor instance can be given to a Parser like a Lexer: Token objects are only created
+    for the NUMBER, IDENTIFIER and STRING tokens read by the parser.
+    """
+    __slots__ = ('buffer', 'position')
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.position = 0
+
+    def get_next_token(self):
+        """
+        Get next token from the buffer
+
+        :return: Next Token from buffer, EOF Token once the buffer is exhausted
+        """
+        position = self.position
+        buffer = self.buffer
+        if position == len(buffer.kinds):
+            return EOF_TOKEN
+        self.position = position + 1
+        kind = buffer.kinds[position]
+        token = SHARED_TOKENS[kind]
+        if token is not None:
+            return token
+        if kind == token_type.REDUCE_KIND:
+            return REDUCE_TOKENS[buffer.source[buffer.starts[position]]]
+        if kind == token_type.SCAN_KIND:
+            return SCAN_TOKENS[buffer.source[buffer.starts[position]]]
+        return Token(token_type.KINDS[kind], buffer.source[buffer.starts[position]:buffer.ends[position]])
@@ -3,6 +3,8 @@ TOKEN TYPES DEFINITIONS
 """
 SPACE = 'SPACE'
 TAB = 'TAB'
+NEWLINE = 'NEWLINE'
+CARRIAGE_RETURN = 'CARRIAGE_RETURN'
 OPEN_PAR = 'OPEN_PAR'
 CLOSING_PAR = 'CLOSING_PAR'
 PLUS = 'PLUS'
@@ -15,5 +17,34 @@ TERMINATOR = 'TERMINATOR'
 IDENTIFIER = 'IDENTIFIER'
 NUMBER = 'NUMBER'
 STRING = 'STRING'
+REDUCE = 'REDUCE'
+SCAN = 'SCAN'
 
 EOF = 'EOF'
+
+"""
+TOKEN KIND CODES
+Compact integer code of each token type, stored in apl.tokens.buffer.TokenBuffer and in Token.kind,
+and compared by the parser instead of the typenames
+"""
+KINDS = (
+    SPACE, TAB, NEWLINE, CARRIAGE_RETURN, OPEN_PAR, CLOSING_PAR, PLUS, MINUS, MULT, DIV, EQUAL,
+    WORD_VAR, TERMINATOR, IDENTIFIER, NUMBER, STRING, REDUCE, SCAN, EOF
+)
+KIND_CODE = {typename: code for code, typename in enumerate(KINDS)}
+
+OPEN_PAR_KIND = KIND_CODE[OPEN_PAR]
+CLOSING_PAR_KIND = KIND_CODE[CLOSING_PAR]
+PLUS_KIND = KIND_CODE[PLUS]
+MINUS_KIND = KIND_CODE[MINUS]
+MULT_KIND = KIND_CODE[MULT]
+DIV_KIND = KIND_CODE[DIV]
+EQUAL_KIND = KIND_CODE[EQUAL]
+WORD_VAR_KIND = KIND_CODE[WORD_VAR]
+TERMINATOR_KIND = KIND_CODE[TERMINATOR]
+IDENTIFIER_KIND = KIND_CODE[IDENTIFIER]
+NUMBER_KIND = KIND_CODE[NUMBER]
+STRING_KIND = KIND_CODE[STRING]
+REDUCE_KIND = KIND_CODE[REDUCE]
+SCAN_KIND = KIND_CODE[SCAN]
+EOF_KIND = KIND_CODE[EOF]
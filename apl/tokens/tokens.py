@@ -7,8 +7,12 @@ TOKEN REGULAR EXPRESSIONS
 TOKEN_REGEX = [
     (token_type.SPACE, regex.SKIP, ' '),
     (token_type.TAB, regex.SKIP, '\t'),
+    (token_type.NEWLINE, regex.SKIP, '\n'),
+    (token_type.CARRIAGE_RETURN, regex.SKIP, '\r'),
     (token_type.OPEN_PAR, regex.SINGLE_CHAR, '('),
     (token_type.CLOSING_PAR, regex.SINGLE_CHAR, ')'),
+    (token_type.REDUCE, regex.PATTERN, '[-+*/]/'),
+    (token_type.SCAN, regex.PATTERN, '[-+*/]\\\\'),
     (token_type.PLUS, regex.SINGLE_CHAR, '+'),
     (token_type.MINUS, regex.SINGLE_CHAR, '-'),
     (token_type.MULT, regex.SINGLE_CHAR, '*'),
@@ -28,13 +32,17 @@ class Token:
     Toke instance is defined by:
         - a typename: string()
         - a value: string()
+        - optionally its line and column (1-based) in the source, when the lexer tracks them
+        - kind: integer code of its typename (see token_type.KINDS)
     """
-    typename = str()
-    value = str()
+    __slots__ = ('typename', 'value', 'line', 'column', 'kind')
 
-    def __init__(self, typename, value):
+    def __init__(self, typename, value, line=None, column=None):
         self.typename = typename
         self.value = value
+        self.line = line
+        self.column = column
+        self.kind = token_type.KIND_CODE[typename]
 
     def __str__(self):
         return 'Token(%s, \'%s\')' % (self.typename, self.value)
@@ -0,0 +1,76 @@
+"""
+ASTNodeVisitor dispatch microbenchmark
+
+Measure the per-node overhead of ASTNodeVisitor.visit, before (class name converted by re.sub on
+every visit) and after (dispatch table resolved once per visitor and node class).
+
+Usage: python -m benchmarks.dispatch [--nodes N] [--repeat R]
+"""
+import argparse
+import re
+import timeit
+
+from apl.tokens.tokens import Token
+from apl.tokens import token_type
+from apl.parser import ast
+
+
+class NoopVisitor(ast.ASTNodeVisitor):
+
+    def visit_number(self, node):
+        return node
+
+    def visit_var_eval(self, node):
+        return node
+
+
+class LegacyNoopVisitor(NoopVisitor):
+
+    def visit(self, node):
+        camel_case_split = re.sub('(?!^)([A-Z][a-z]+)', r' \1', type(node).__name__).split()
+        method_name = 'visit_%s' % '_'.join(camel_case_split).lower()
+        visitor = getattr(self, method_name, self.default_visit)
+        return visitor(node)
+
+
+def direct_call(visitor, nodes):
+    for node in nodes:
+        visitor.visit_number(node)
+
+
+def dispatch(visitor, nodes):
+    for node in nodes:
+        visitor.visit(node)
+
+
+def measure(func, visitor, nodes, repeat):
+    """
+    :return: best time per node, in nanoseconds
+    """
+    timer = timeit.Timer(lambda: func(visitor, nodes))
+    return min(timer.repeat(repeat=repeat, number=1)) / len(nodes) * 1e9
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--nodes', type=int, default=100000)
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    nodes = [
+        ast.Number(Token(token_type.NUMBER, '1')) if index % 2 else ast.VarEval(Token(token_type.IDENTIFIER, 'x'))
+        for index in range(args.nodes)
+    ]
+    baseline = measure(direct_call, NoopVisitor(), [ast.Number(Token(token_type.NUMBER, '1'))] * args.nodes,
+                       args.repeat)
+    before = measure(dispatch, LegacyNoopVisitor(), nodes, args.repeat)
+    after = measure(dispatch, NoopVisitor(), nodes, args.repeat)
+
+    print('direct method call    : %8.1f ns/node' % baseline)
+    print('re.sub dispatch       : %8.1f ns/node (overhead %.1f ns)' % (before, before - baseline))
+    print('cached table dispatch : %8.1f ns/node (overhead %.1f ns)' % (after, after - baseline))
+    print('speedup               : %8.1fx' % (before / after))
+
+
+if __name__ == '__main__':
+    main()
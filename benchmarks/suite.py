@@ -0,0 +1,217 @@
+"""
+Benchmark suite
+
+Run generated workloads (see benchmarks.workloads) through each phase separately:
+    - lex: Lexer.tokenize of the program source, throughput in bytes/s
+    - parse: Parser.parse of the already tokenized program, throughput in tokens/s
+    - interpret: Interpreter execution of the already parsed program, throughput in AST nodes/s
+Each phase is timed (best of `repeat` runs) then run once more under tracemalloc for its peak memory.
+
+Usage:
+    python -m benchmarks.suite run [--output results.json] [--scale S] [--repeat R] [--engine E]
+    python -m benchmarks.suite compare baseline.json results.json [--threshold 0.1]
+
+`compare` prints the ratio of every measure and exits with status 1 if a phase got slower, or used more
+memory, by more than the threshold. A phase that took 0 s in the baseline has no time ratio.
+"""
+import argparse
+import datetime
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from apl.lexer.lexer import Lexer
+from apl.parser.parser import Parser
+from apl.interpreter.interpreter import Interpreter, ENGINES, TREE_ENGINE
+from apl.interpreter.optimizer import count_nodes
+from .workloads import WORKLOADS
+
+
+LEX = 'lex'
+PARSE = 'parse'
+INTERPRET = 'interpret'
+PHASES = (LEX, PARSE, INTERPRET)
+
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.1
+
+
+class TokenReplay:
+    """
+    Lexer replaying already matched tokens, so that parsing is measured without lexing
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.index = 0
+
+    def get_next_token(self):
+        token = self.tokens[self.index]
+        if self.index < len(self.tokens) - 1:
+            self.index += 1
+        return token
+
+
+def measure(func, repeat):
+    """
+    :param func: function without argument
+    :param repeat: number of timed runs
+    :return: tuple (best time in seconds, peak memory in bytes of an additional traced run)
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def result(seconds, peak, amount, unit):
+    return {
+        'seconds': seconds,
+        'throughput': amount / seconds if seconds else None,
+        'unit': unit,
+        'peak_bytes': peak,
+    }
+
+
+def run_workload(source, engine, repeat):
+    """
+    Measure the phases of a program
+
+    :param source: program source text
+    :param engine: interpreter engine
+    :param repeat: number of timed runs of each phase
+    :return: dict phase -> measures
+    """
+    tokens, errors = Lexer.tokenize(source)
+    if errors:
+        raise ValueError('\n'.join(errors))
+    tree = Parser(TokenReplay(tokens)).parse()
+
+    def interpret():
+        apl_interpreter = Interpreter(None, engine=engine)
+        if not apl_interpreter.execute(apl_interpreter.compile(tree)):
+            raise RuntimeError('Benchmark program failed: %s' % apl_interpreter.last_error)
+
+    return {
+        LEX: result(*measure(lambda: Lexer.tokenize(source), repeat), len(source.encode('utf-8')), 'bytes/s'),
+        PARSE: result(*measure(lambda: Parser(TokenReplay(tokens)).parse(), repeat), len(tokens), 'tokens/s'),
+        INTERPRET: result(*measure(interpret, repeat), count_nodes(tree), 'nodes/s'),
+    }
+
+
+def run(args):
+    results = {}
+    for name in args.workload or WORKLOADS:
+        generator, size = WORKLOADS[name]
+        size = max(1, int(size * args.scale))
+        with_size = results[name] = {'size': size}
+        with_size.update(run_workload(generator(size), args.engine, args.repeat))
+        print('%-16s %s' % (name, '  '.join(
+            '%s %.4fs %.1fKiB' % (phase, with_size[phase]['seconds'], with_size[phase]['peak_bytes'] / 1024)
+            for phase in PHASES
+        )), file=sys.stderr)
+
+    report = {
+        'meta': {
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'engine': args.engine,
+            'scale': args.scale,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+def compare_reports(baseline, current, threshold):
+    """
+    Compare two reports written by `run`
+
+    :param baseline: reference report
+    :param current: new report
+    :param threshold: relative increase of time or peak memory considered a regression
+    :return: list of tuples (workload, phase, time ratio, memory ratio, regression flag), the time ratio
+             being None when the baseline phase took 0 s, which can't be compared
+    """
+    comparisons = []
+    for name, phases in current['results'].items():
+        baseline_phases = baseline['results'].get(name)
+        if baseline_phases is None or baseline_phases.get('size') != phases.get('size'):
+            continue
+        for phase in PHASES:
+            if phase not in phases or phase not in baseline_phases:
+                continue
+            baseline_seconds = baseline_phases[phase]['seconds']
+            time_ratio = phases[phase]['seconds'] / baseline_seconds if baseline_seconds else None
+            memory_ratio = phases[phase]['peak_bytes'] / max(1, baseline_phases[phase]['peak_bytes'])
+            regression = (time_ratio is not None and time_ratio > 1 + threshold) or memory_ratio > 1 + threshold
+            comparisons.append((name, phase, time_ratio, memory_ratio, regression))
+    return comparisons
+
+
+def compare(args):
+    with open(args.baseline, encoding='utf-8') as file:
+        baseline = json.load(file)
+    with open(args.current, encoding='utf-8') as file:
+        current = json.load(file)
+
+    for key in ('engine', 'python'):
+        if baseline['meta'].get(key) != current['meta'].get(key):
+            print('warning: reports differ by %s (%s, %s)' % (key, baseline['meta'].get(key), current['meta'].get(key)),
+                  file=sys.stderr)
+    comparisons = compare_reports(baseline, current, args.threshold)
+    for name, phase, time_ratio, memory_ratio, regression in comparisons:
+        print('%-16s %-10s time %s  memory x%.2f%s' % (
+            name, phase, 'n/a' if time_ratio is None else 'x%.2f' % time_ratio, memory_ratio,
+            '  REGRESSION' if regression else ''
+        ))
+    if any(comparison[-1] for comparison in comparisons):
+        sys.exit(1)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='APL benchmark suite')
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the workloads and write a JSON report')
+    run_parser.add_argument('--output', help='report path (default: standard output)')
+    run_parser.add_argument('--scale', type=float, default=1.0, help='workload size factor (default: %(default)s)')
+    run_parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                            help='number of timed runs per phase (default: %(default)s)')
+    run_parser.add_argument('--engine', choices=ENGINES, default=TREE_ENGINE,
+                            help='interpreter engine (default: %(default)s)')
+    run_parser.add_argument('--workload', action='append', choices=sorted(WORKLOADS),
+                            help='workload to run (repeatable, default: all)')
+
+    compare_parser = commands.add_parser('compare', help='compare two reports, exit 1 on regression')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help='relative increase flagged as regression (default: %(default)s)')
+
+    args = arg_parser.parse_args()
+    if args.command == 'run':
+        run(args)
+    else:
+        compare(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+from unittest import TestCase
+
+from benchmarks import suite
+
+
+def report(size, **phases):
+    return {'meta': {}, 'results': {'workload': dict(size=size, **{
+        phase: {'seconds': seconds, 'peak_bytes': peak_bytes} for phase, (seconds, peak_bytes) in phases.items()
+    })}}
+
+
+class TestSuite(TestCase):
+
+    def test_compare_reports(self):
+        baseline = report(10, lex=(1.0, 1000), parse=(2.0, 1000), interpret=(1.0, 1000))
+        current = report(10, lex=(1.05, 1000), parse=(2.5, 1000), interpret=(1.0, 1200))
+
+        self.assertEqual(suite.compare_reports(baseline, current, 0.1), [
+            ('workload', suite.LEX, 1.05, 1.0, False),
+            ('workload', suite.PARSE, 1.25, 1.0, True),
+            ('workload', suite.INTERPRET, 1.0, 1.2, True),
+        ])
+        self.assertEqual([comparison[-1] for comparison in suite.compare_reports(baseline, current, 0.3)],
+                         [False, False, False])
+        self.assertEqual([comparison[-1] for comparison in suite.compare_reports(baseline, current, 0.01)],
+                         [True, True, True])
+
+    def test_zero_baseline_time(self):
+        baseline = report(10, lex=(0.0, 1000), parse=(0.0, 1000))
+        current = report(10, lex=(0.5, 1000), parse=(0.5, 2000))
+
+        self.assertEqual(suite.compare_reports(baseline, current, 0.1), [
+            ('workload', suite.LEX, None, 1.0, False),
+            ('workload', suite.PARSE, None, 2.0, True),
+        ])
+
+    def test_different_sizes(self):
+        self.assertEqual(suite.compare_reports(report(10, lex=(1.0, 1000)), report(20, lex=(2.0, 1000)), 0.1), [])
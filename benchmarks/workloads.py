@@ -0,0 +1,51 @@
+"""
+Generated benchmark workloads
+
+Each generator builds a valid program whose size is controlled by a single parameter.
+"""
+
+
+def long_program(size):
+    """
+    :param size: number of instructions
+    :return: program of 'size' short instructions updating a few variables
+    """
+    lines = ['var a = 1;', 'var b = 2.5;', 'var c = 3;']
+    for index in range(size):
+        lines.append('%s = %s * 2 + %d - b / 4;' % ('abc'[index % 3], 'abc'[(index + 1) % 3], index % 10))
+    return '\n'.join(lines)
+
+
+def deep_nesting(size):
+    """
+    :param size: parenthesis nesting depth
+    :return: program of a single instruction nesting 'size' parenthesized expressions
+    """
+    return 'var x = %s1%s;' % ('(1 + ' * size, ')' * size)
+
+
+def wide_expression(size):
+    """
+    :param size: number of terms
+    :return: program of a single instruction adding 'size' products
+    """
+    return 'var x = %s;' % ' + '.join('%d * 3' % (index % 100) for index in range(size))
+
+
+def many_variables(size):
+    """
+    :param size: number of variables
+    :return: program declaring 'size' variables, each one computed from the previous one
+    """
+    lines = ['var v0 = 1;']
+    lines.extend('var v%d = v%d + %d;' % (index, index - 1, index % 7) for index in range(1, size))
+    return '\n'.join(lines)
+
+
+# workload name -> (generator, default size)
+WORKLOADS = {
+    'long_program': (long_program, 5000),
+    'deep_nesting': (deep_nesting, 100),
+    'wide_expression': (wide_expression, 200),
+    'many_variables': (many_variables, 5000),
+}